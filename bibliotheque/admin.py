@@ -4,17 +4,21 @@ La classe Admin comprend des méthodes pour gérer les comptes des étudiants, l
 """
 from files import StudentHandler
 from bibliotheque import Bibliotheque
+from records import AdminAccount
+from service import BibliothequeErreur
 from utils import print
-import utils, datetime
+import utils
+import metrics
 
 
-class Admin:
+@metrics.instrumenter()
+class Admin(AdminAccount):
+    __slots__ = ()
     student_handler: StudentHandler = StudentHandler()
     bibliotheque: Bibliotheque = Bibliotheque()
 
     def __init__(self, attributs):
-        for attr in attributs:
-            setattr(self, attr, attributs[attr])
+        super().__init__(attributs)
 
     def gerer_comptes(self, choix: int) -> None:
         """
@@ -55,7 +59,7 @@ class Admin:
             etudiants = [etudiant for etudiant in etudiants if etudiant.get(key)]
 
         # Affichage de la liste des étudiants
-        if not utils.json_to_table(etudiants, continuer):
+        if not utils.json_to_pages(etudiants, continuer):
             return None
 
         return etudiants
@@ -66,60 +70,73 @@ class Admin:
         """
         etudiants = self.afficher_etudiants("non suspendu")
 
+        if not etudiants:
+            return
+
         # Demande à l'admin de saisir l'id de l'étudiant à suspendre
         id_a_suspendre = utils.int_input("Saisissez l'ID de l'élève à suspendre : ")
 
-        # Parcours de la liste des étudiants
-        for etudiant in etudiants:
-            # Si l'id de l'étudiant correspond à l'id à suspendre
-            if etudiant.get("id") == id_a_suspendre:
-                # Suspension de l'étudiant
-                etudiant["suspendu"] = True
-                self.student_handler.update(etudiant)
-                utils.message([("Compte suspendu avec succes.", "success")])
-                break
-        else:
-            utils.message(
-                [("Aucun étudiant n'a été trouvé avec l'identifiant donné.", "error")]
-            )
+        try:
+            self.bibliotheque.service.suspendre_etudiant(id_a_suspendre)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
+
+        utils.message([("Compte suspendu avec succes.", "success")])
 
-    def gerer_emprunts(self) -> None:
+    def gerer_emprunts(self, choix: int) -> None:
         """
         Méthode pour gérer les demandes d'emprunt.
+
+        Args:
+            choix (int): Le choix de l'admin.
+        """
+        if choix == 1:
+            self.traiter_demande()
+        elif choix == 2:
+            self.afficher_file_demandes()
+        elif choix == 3:
+            self.accepter_demandes()
+
+    def traiter_demande(self) -> None:
+        """
+        Méthode pour accepter ou refuser une demande d'emprunt d'un étudiant.
         """
         etudiants = self.afficher_etudiants("non suspendu", "demandes")
 
         if not etudiants:
             return
         
-        print("Entrez l'ID de l'étudiant dont vous voulez traiter la demande : ")
-        id_etudiant = utils.get_input(len(etudiants))
+        id_etudiant = utils.int_input("Entrez l'ID de l'étudiant dont vous voulez traiter la demande : ")
         
         utils.clear()
 
-        for etudiant in etudiants:
-            if etudiant["id"] == id_etudiant:
-                # Afficher toutes les demandes de l'étudiant choisi
-                utils.json_to_table(etudiant["demandes"], False, True)
-
-                print("Entrez le numero de la demande que vous voulez traiter : ")
-                id_demande = utils.get_input(len(etudiant["demandes"]))
-
-                print("\n",
-                    "Que souhaitez-vous faire :",
-                    "1 - Accepter la demande.",
-                    "2 - Refuser la demande.",
-                    "3 - Retourner en arrière.",
-                    sep="\n",
-                )
-                choix = utils.get_input(3)
-                utils.clear()
-
-                if choix == 1:
-                    self.accepter_demande(etudiant, id_demande)
-                elif choix == 2:
-                    self.refuser_demande(etudiant, id_demande)
-                return
+        # Les ids ne sont pas des positions dans la liste : l'étudiant est cherché par son id
+        etudiant = self.student_handler.get(id_etudiant)
+        if etudiant is None or etudiant["suspendu"] or not etudiant["demandes"]:
+            utils.message([(f"Aucune demande à traiter pour l'étudiant {id_etudiant}.", "error")])
+            return
+
+        # Afficher toutes les demandes de l'étudiant choisi
+        utils.json_to_table(etudiant["demandes"], False, True)
+
+        print("Entrez le numero de la demande que vous voulez traiter : ")
+        id_demande = utils.get_input(len(etudiant["demandes"]))
+
+        print("\n",
+            "Que souhaitez-vous faire :",
+            "1 - Accepter la demande.",
+            "2 - Refuser la demande.",
+            "3 - Retourner en arrière.",
+            sep="\n",
+        )
+        choix = utils.get_input(3)
+        utils.clear()
+
+        if choix == 1:
+            self.accepter_demande(etudiant, id_demande)
+        elif choix == 2:
+            self.refuser_demande(etudiant, id_demande)
                 
     def accepter_demande(self, etudiant, num_demande):
         """
@@ -129,15 +146,35 @@ class Admin:
             id_etudiant (int): L'étudiant dont la demande doit être acceptée.
             num_demande (int): Numero de la demande à accepter.
         """
-        livre = etudiant["demandes"].pop(num_demande - 1)
-        livre["date"] = datetime.date.today().isoformat()
-        etudiant["emprunts"].append(livre)
+        try:
+            self.bibliotheque.service.accepter_demande(etudiant["id"], num_demande)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
 
-        self.bibliotheque.ajouter_exemplaires(livre["isbn"], -1)
+        utils.message([("La demande d'emprunt a été acceptée avec succés.", "success")])
 
-        self.student_handler.update(etudiant)
+    def afficher_file_demandes(self) -> None:
+        """
+        Méthode pour afficher toutes les demandes en attente, de la plus ancienne à la plus récente.
+        """
+        utils.json_to_pages(self.bibliotheque.service.demandes_en_attente(), numeroter=True)
 
-        utils.message([("La demande d'emprunt a été acceptée avec succés.", "success")])
+    def accepter_demandes(self) -> None:
+        """
+        Méthode pour accepter en une fois toutes les demandes qui peuvent l'être.
+        """
+        resultat = self.bibliotheque.service.accepter_demandes()
+
+        if resultat["acceptees"]:
+            utils.json_to_table(resultat["acceptees"], False, True)
+
+        utils.message(
+            [
+                (f"{len(resultat['acceptees'])} demande(s) acceptée(s).", "success"),
+                (f"{resultat['en_attente']} demande(s) toujours en attente.", None),
+            ]
+        )
 
     def refuser_demande(self, etudiant, num_demande):
         """
@@ -148,11 +185,11 @@ class Admin:
             num_demande (int): Numero de la demande à refuser.
         """
         # Supprime la demande de la liste des demandes
-        etudiant["demandes"].pop(
-            num_demande - 1
-        )
-
-        self.student_handler.update(etudiant)
+        try:
+            self.bibliotheque.service.refuser_demande(etudiant["id"], num_demande)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
 
         utils.message([("La demande d'emprunt a été refusée avec succés.", "success")])
 
@@ -174,9 +211,29 @@ class Admin:
         elif choix == 5:
             self.bibliotheque.historique_emprunts()
 
+    def afficher_rapports(self) -> None:
+        """
+        Méthode pour afficher les statistiques d'emprunt.
+        """
+        try:
+            rapports = self.bibliotheque.service.rapports()
+        except ImportError:
+            utils.message([("Les statistiques nécessitent NumPy (pip install numpy).", "error")])
+            return
+
+        for titre, lignes in rapports.items():
+            print(titre, style="bold")
+            if lignes:
+                utils.json_to_table(lignes, False)
+            else:
+                print("Aucune donnée à afficher!", style="error")
+            print()
+
+        utils.clear(True)
+
     def regle_7jours(self) -> None:
         # Appel de la méthode regle_7jours de Bibliotheque
-        infractions = self.bibliotheque.regle_7jours(self.student_handler.load_data())
+        infractions = self.bibliotheque.regle_7jours()
 
         # Si des infractions ont été trouvées, affiche les infractions
         if infractions:
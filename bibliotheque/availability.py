@@ -0,0 +1,189 @@
+"""
+Ce module suit la disponibilité des exemplaires de chaque livre.
+
+Le champ "nbr_ex" d'un livre compte les exemplaires en rayon. Chaque demande d'emprunt réserve
+un de ces exemplaires jusqu'à ce qu'elle soit acceptée ou refusée, ou jusqu'à l'expiration de la
+réservation (DUREE_RESERVATION après la demande). Un exemplaire est donc disponible s'il est en
+rayon et n'est pas réservé :
+
+    disponibles = nbr_ex - réservés
+
+Les compteurs de réservations et d'emprunts sont gardés en mémoire par ISBN : savoir si un livre
+est disponible ne demande aucun parcours. Une demande dont la réservation a expiré reste en
+attente, mais ne peut être acceptée que s'il reste un exemplaire disponible.
+"""
+
+import datetime
+import heapq
+from typing import Dict, List, Optional, Tuple
+from request_queue import maintenant
+
+# Durée pendant laquelle une demande d'emprunt réserve un exemplaire
+DUREE_RESERVATION = datetime.timedelta(hours=48)
+
+
+def date_expiration(date_demande: str) -> Optional[str]:
+    """
+    Renvoie la date ISO à laquelle expire la réservation d'une demande.
+
+    Args:
+        date_demande (str): La date de la demande.
+
+    Returns:
+        Optional[str]: La date d'expiration, ou None pour une ancienne demande sans date valide
+            (sa réservation n'expire pas).
+    """
+    try:
+        debut = datetime.datetime.fromisoformat(date_demande)
+    except (TypeError, ValueError):
+        return None
+    return (debut + DUREE_RESERVATION).isoformat(timespec="microseconds")
+
+
+class Disponibilites:
+    """
+    Compteurs des exemplaires réservés et empruntés de chaque livre.
+    """
+
+    def __init__(self):
+        self.reserves: Dict[str, int] = {}  # isbn -> exemplaires réservés
+        self.empruntes: Dict[str, int] = {}  # isbn -> exemplaires empruntés
+        # (id de l'étudiant, isbn, date de la demande) -> nombre de demandes réservées. Une demande
+        # datée est seule avec sa clé, mais un étudiant peut avoir plusieurs anciennes demandes sans
+        # date du même livre : elles ont la même clé et chacune réserve un exemplaire.
+        self.reservations: Dict[Tuple[int, str, str], int] = {}
+        # Tas des réservations (date d'expiration, id de l'étudiant, isbn, date de la demande)
+        self.expirations: List[Tuple[str, int, str, str]] = []
+
+    @classmethod
+    def construire(cls, etudiants: List[Dict]) -> "Disponibilites":
+        """
+        Construit les compteurs à partir des demandes et des emprunts des étudiants.
+
+        Args:
+            etudiants (List[Dict]): Les étudiants.
+
+        Returns:
+            Disponibilites: Les compteurs construits.
+        """
+        disponibilites = cls()
+        for etudiant in etudiants:
+            for emprunt in etudiant["emprunts"]:
+                disponibilites.empruntes[emprunt["isbn"]] = disponibilites.empruntes.get(emprunt["isbn"], 0) + 1
+            for demande in etudiant["demandes"]:
+                disponibilites.reserver(etudiant["id"], demande)
+        disponibilites.expirer()
+        return disponibilites
+
+    @staticmethod
+    def _cle(id_etudiant: int, demande: Dict) -> Tuple[int, str, str]:
+        return id_etudiant, demande["isbn"], demande.get("date_demande", "")
+
+    def expirer(self, instant: str = None) -> None:
+        """
+        Libère les réservations expirées.
+
+        Args:
+            instant (str, optional): La date ISO de référence. Par défaut maintenant().
+        """
+        if not self.expirations:
+            return
+        instant = instant or maintenant()
+        while self.expirations and self.expirations[0][0] <= instant:
+            _, id_etudiant, isbn, date_demande = heapq.heappop(self.expirations)
+            self.liberer(id_etudiant, {"isbn": isbn, "date_demande": date_demande})
+
+    def reserver(self, id_etudiant: int, demande: Dict) -> None:
+        """
+        Réserve un exemplaire pour une demande.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            demande (Dict): La demande (avec "isbn" et "date_demande").
+        """
+        cle = self._cle(id_etudiant, demande)
+        expiration = date_expiration(cle[2])
+        self.reservations[cle] = self.reservations.get(cle, 0) + 1
+        self.reserves[cle[1]] = self.reserves.get(cle[1], 0) + 1
+        if expiration is not None:
+            heapq.heappush(self.expirations, (expiration, *cle))
+
+    def liberer(self, id_etudiant: int, demande: Dict) -> bool:
+        """
+        Libère la réservation d'une demande (acceptée, refusée ou expirée).
+
+        Le tas des expirations n'est pas modifié : l'entrée sera ignorée à son expiration.
+
+        Returns:
+            bool: True si la demande avait encore un exemplaire réservé.
+        """
+        cle = self._cle(id_etudiant, demande)
+        nombre = self.reservations.get(cle, 0)
+        if not nombre:
+            return False
+
+        # Pour des anciennes demandes identiques, peu importe laquelle est libérée
+        if nombre == 1:
+            del self.reservations[cle]
+        else:
+            self.reservations[cle] = nombre - 1
+        self.reserves[cle[1]] -= 1
+        if not self.reserves[cle[1]]:
+            del self.reserves[cle[1]]
+        return True
+
+    def est_reservee(self, id_etudiant: int, demande: Dict) -> bool:
+        self.expirer()
+        return self._cle(id_etudiant, demande) in self.reservations
+
+    def disponibles(self, livre: Dict) -> int:
+        """
+        Renvoie le nombre d'exemplaires en rayon qui ne sont pas réservés.
+
+        Args:
+            livre (Dict): Le livre.
+
+        Returns:
+            int: Le nombre d'exemplaires disponibles.
+        """
+        self.expirer()
+        return max(livre["nbr_ex"] - self.reserves.get(livre["isbn"], 0), 0)
+
+    def peut_emprunter(self, id_etudiant: int, demande: Dict, livre: Dict) -> bool:
+        """
+        Indique si une demande peut devenir un emprunt : il faut un exemplaire en rayon, réservé
+        par la demande ou, si sa réservation a expiré, encore disponible.
+        """
+        if livre["nbr_ex"] <= 0:
+            return False
+        return self.est_reservee(id_etudiant, demande) or self.disponibles(livre) > 0
+
+    def emprunter(self, id_etudiant: int, demande: Dict) -> None:
+        """
+        Transforme la réservation d'une demande acceptée en emprunt.
+        """
+        self.liberer(id_etudiant, demande)
+        self.empruntes[demande["isbn"]] = self.empruntes.get(demande["isbn"], 0) + 1
+
+    def rendre(self, isbn: str) -> None:
+        """
+        Enregistre le retour d'un exemplaire emprunté.
+        """
+        if self.empruntes.get(isbn, 0) > 0:
+            self.empruntes[isbn] -= 1
+
+    def etat(self, livre: Dict) -> Dict[str, int]:
+        """
+        Renvoie la répartition des exemplaires d'un livre.
+
+        Args:
+            livre (Dict): Le livre.
+
+        Returns:
+            Dict[str, int]: Les exemplaires disponibles, réservés et empruntés.
+        """
+        return {
+            "disponibles": self.disponibles(livre),
+            "reserves": self.reserves.get(livre["isbn"], 0),
+            "empruntes": self.empruntes.get(livre["isbn"], 0),
+        }
@@ -0,0 +1,370 @@
+"""
+Ce module mesure les performances des opérations principales de la bibliothèque sur des données
+générées aléatoirement.
+
+Les fichiers books.json, etudiants.json et historique.jsonl sont générés dans un dossier temporaire (la base de
+données réelle n'est jamais utilisée), puis chaque opération est chronométrée sans interface :
+les saisies et les affichages de la console sont remplacés le temps de la mesure. Les résultats
+sont écrits en JSON pour pouvoir comparer deux exécutions. L'écriture et la lecture de l'instantané
+du catalogue sont aussi mesurées dans les deux formats, JSON et binaire (voir snapshot.py).
+
+Utilisation :
+    python benchmark.py [--echelle petite|moyenne|grande] [--livres N] [--etudiants N]
+                        [--repetitions 5] [--graine 0] [--sortie resultats.json]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+from files import BACKEND, flush_all
+from history import COLONNES
+from journal import Journal, atomic_write
+
+# Nombre de livres et d'étudiants générés pour chaque échelle
+ECHELLES = {
+    "petite": (1_000, 1_000),
+    "moyenne": (100_000, 10_000),
+    "grande": (1_000_000, 100_000),
+}
+
+# Proportion des emprunts en cours qui ont plus de 7 jours
+PART_RETARDS = 0.1
+
+# Nombre de modifications par mesure de update_data et de ajouter_exemplaires
+NB_MODIFICATIONS = 100
+
+# Nombre de lignes converties par parse_data / json_to_table
+NB_LIGNES_TABLE = 1_000
+
+MOTS = (
+    "petit prince nuit jour mer vent amour guerre paix roi reine ombre lumiere histoire monde "
+    "jardin maison voyage etranger peste chute memoire temps ville riviere montagne silence"
+).split()
+NOMS = "martin bernard dubois thomas robert richard petit durand leroy moreau simon laurent".split()
+PRENOMS = "lea hugo chloe louis emma jules ines adam lina gabriel manon arthur".split()
+EDITEURS = ("Gallimard", "Flammarion", "Hachette", "Le Seuil", "Albin Michel", "Folio")
+
+
+def isbn13(numero: int) -> str:
+    """
+    Renvoie un ISBN-13 valide (préfixe 978) construit à partir d'un numéro.
+    """
+    debut = f"978{numero:09d}"
+    total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(debut))
+    return debut + str(-total % 10)
+
+
+def generer(nb_livres: int, nb_etudiants: int, graine: int = 0) -> tuple[List[Dict], List[Dict], List[List]]:
+    """
+    Génère un catalogue, des étudiants avec des emprunts et des demandes, et l'historique des emprunts rendus.
+
+    Args:
+        nb_livres (int): Le nombre de livres.
+        nb_etudiants (int): Le nombre d'étudiants.
+        graine (int, optional): La graine du générateur aléatoire. Par défaut 0.
+
+    Returns:
+        tuple[List[Dict], List[Dict], List[List]]: Les livres, les étudiants et les lignes de l'historique.
+    """
+    aleatoire = random.Random(graine)
+    aujourdhui = datetime.date.today()
+
+    def date(jours_min: int, jours_max: int) -> str:
+        return (aujourdhui - datetime.timedelta(days=aleatoire.randint(jours_min, jours_max))).isoformat()
+
+    livres = [
+        {
+            "id": i + 1,
+            "titre": " ".join(aleatoire.choices(MOTS, k=aleatoire.randint(1, 4))).capitalize(),
+            "auteur": f"{aleatoire.choice(PRENOMS).capitalize()} {aleatoire.choice(NOMS).capitalize()}",
+            "editeur": aleatoire.choice(EDITEURS),
+            "isbn": isbn13(i),
+            "nbr_ex": aleatoire.randint(0, 5),
+            "annee": str(aleatoire.randint(1900, aujourdhui.year)),
+        }
+        for i in range(nb_livres)
+    ]
+
+    etudiants, historique = [], []
+    for i in range(1, nb_etudiants + 1):
+        nom, prenom = aleatoire.choice(NOMS), aleatoire.choice(PRENOMS)
+        etudiant = {
+            "id": i,
+            "nom": nom,
+            "prenom": prenom,
+            "login": f"{prenom}{nom.capitalize()}{i}",
+            "mdp": f"mdp{i}",
+            "email": f"{prenom}.{nom}{i}@exemple.fr",
+            "suspendu": aleatoire.random() < 0.02,
+            "emprunts": [],
+            "demandes": [],
+        }
+
+        # Emprunts en cours, dont une partie en retard
+        for livre in aleatoire.sample(livres, min(aleatoire.randint(0, 3), nb_livres)):
+            en_retard = aleatoire.random() < PART_RETARDS
+            emprunt = {"titre": livre["titre"], "isbn": livre["isbn"], "date": date(8, 30) if en_retard else date(0, 7)}
+            etudiant["emprunts"].append(emprunt)
+
+        # Emprunts déjà rendus
+        for livre in aleatoire.sample(livres, min(aleatoire.randint(0, 5), nb_livres)):
+            entree = {
+                "isbn": livre["isbn"],
+                "titre": livre["titre"],
+                "id_etudiant": i,
+                "login": etudiant["login"],
+                "nom": nom,
+                "prenom": prenom,
+                "date": date(30, 365),
+                "date_rendu": date(0, 29),
+            }
+            historique.append([entree[colonne] for colonne in COLONNES])
+
+        for livre in aleatoire.sample(livres, min(aleatoire.randint(0, 2), nb_livres)):
+            etudiant["demandes"].append({"titre": livre["titre"], "isbn": livre["isbn"]})
+
+        etudiants.append(etudiant)
+
+    return livres, etudiants, historique
+
+
+def mesurer(operation: Callable, repetitions: int, preparer: Callable = None, operations: int = 1) -> Dict:
+    """
+    Chronomètre une opération plusieurs fois.
+
+    Args:
+        operation (Callable): L'opération à chronométrer.
+        repetitions (int): Le nombre de mesures.
+        preparer (Callable, optional): Appelée avant chaque mesure, hors chronométrage.
+        operations (int, optional): Le nombre d'opérations faites par un appel, pour le débit.
+
+    Returns:
+        Dict: Les durées en secondes (min, médiane, moyenne, max) et le débit.
+    """
+    durees = []
+    for _ in range(repetitions):
+        if preparer is not None:
+            preparer()
+        debut = time.perf_counter()
+        operation()
+        durees.append(time.perf_counter() - debut)
+
+    return {
+        "repetitions": repetitions,
+        "operations": operations,
+        "min": min(durees),
+        "mediane": statistics.median(durees),
+        "moyenne": statistics.fmean(durees),
+        "max": max(durees),
+        "operations_par_seconde": operations / min(durees) if min(durees) else None,
+    }
+
+
+@contextlib.contextmanager
+def sans_console(utils, reponses: Dict = None):
+    """
+    Remplace les saisies et les affichages de utils le temps d'une mesure.
+
+    Args:
+        utils: Le module utils.
+        reponses (Dict, optional): Les valeurs renvoyées par box_input.
+    """
+    remplaces = {
+        "console": utils.console,
+        "message": utils.message,
+        "box_input": utils.box_input,
+        "json_to_pages": utils.json_to_pages,
+    }
+    utils.console = type(utils.console)(file=io.StringIO(), width=200)
+    utils.message = lambda *args, **kwargs: None
+    utils.box_input = lambda *args, **kwargs: dict(reponses or {})
+    # Parcourt toutes les lignes au lieu de les afficher page par page
+    utils.json_to_pages = lambda data, *args, **kwargs: sum(1 for _ in data) > 0
+    try:
+        yield
+    finally:
+        for nom, valeur in remplaces.items():
+            setattr(utils, nom, valeur)
+
+
+def executer(repetitions: int, graine: int) -> Dict[str, Dict]:
+    """
+    Chronomètre les opérations sur la base de données du dossier courant.
+
+    Args:
+        repetitions (int): Le nombre de mesures par opération.
+        graine (int): La graine du choix des livres et des étudiants.
+
+    Returns:
+        Dict[str, Dict]: Les mesures de chaque opération.
+    """
+    # Importés ici : les handlers ouvrent database/ relativement au dossier courant
+    import utils
+    from bibliotheque import Bibliotheque
+    from files import BookHandler, StudentHandler
+    from service import BibliothequeService
+    from utilisateur import Authentification
+
+    aleatoire = random.Random(graine)
+    resultats = {}
+    book_handler, student_handler = BookHandler(), StudentHandler()
+
+    def decharger():
+        # Oublie les collections chargées et les index pour mesurer un démarrage à froid
+        book_handler.repository.unload()
+        student_handler.repository.unload()
+        BibliothequeService._index = None
+        BibliothequeService.retards = None
+        BibliothequeService._disponibilites = None
+
+    resultats["load_data"] = mesurer(
+        lambda: (book_handler.load_data(), student_handler.load_data()), repetitions, decharger
+    )
+
+    livres = book_handler.load_data()
+    etudiants = student_handler.load_data()
+    bibliotheque = Bibliotheque()
+
+    def modifier_livres():
+        for livre in aleatoire.choices(livres, k=NB_MODIFICATIONS):
+            book_handler.update_data(livre, "isbn")
+
+    resultats["update_data"] = mesurer(modifier_livres, repetitions, operations=NB_MODIFICATIONS)
+
+    resultats["regle_7jours (index à construire)"] = mesurer(
+        bibliotheque.regle_7jours, repetitions, lambda: setattr(BibliothequeService, "retards", None)
+    )
+    resultats["regle_7jours"] = mesurer(bibliotheque.regle_7jours, repetitions)
+
+    with sans_console(utils):
+        resultats["afficher_livres (etudiant)"] = mesurer(lambda: bibliotheque.afficher_livres("Etudiant"), repetitions)
+        resultats["afficher_livres (admin)"] = mesurer(lambda: bibliotheque.afficher_livres("Admin"), repetitions)
+        resultats["historique_emprunts"] = mesurer(bibliotheque.historique_emprunts, repetitions)
+
+    def ajouter_exemplaires():
+        for livre in aleatoire.choices(livres, k=NB_MODIFICATIONS):
+            bibliotheque.ajouter_exemplaires(livre["isbn"], 1)
+
+    resultats["ajouter_exemplaires"] = mesurer(ajouter_exemplaires, repetitions, operations=NB_MODIFICATIONS)
+
+    # Le dernier étudiant est le pire cas d'une recherche linéaire
+    if etudiants:
+        dernier = etudiants[-1]
+        with sans_console(utils, {"Login": dernier["login"], "Mot de passe": dernier["mdp"]}):
+            resultats["connexion"] = mesurer(Authentification().connexion, repetitions)
+    with sans_console(utils, {"Login": "inconnu", "Mot de passe": "inconnu"}):
+        resultats["connexion (login inconnu)"] = mesurer(Authentification().connexion, repetitions)
+
+    lignes = livres[:NB_LIGNES_TABLE]
+    resultats["parse_data"] = mesurer(
+        lambda: [utils.parse_data(livre) for livre in lignes], repetitions, operations=len(lignes)
+    )
+    with sans_console(utils):
+        resultats["json_to_table"] = mesurer(
+            lambda: utils.json_to_table(lignes, False), repetitions, operations=len(lignes)
+        )
+
+    return resultats
+
+
+def comparer_formats(repetitions: int) -> Dict[str, Dict]:
+    """
+    Chronomètre l'écriture et la lecture de l'instantané du catalogue au format JSON et au
+    format binaire, et note la taille du fichier écrit.
+
+    Args:
+        repetitions (int): Le nombre de mesures par opération.
+
+    Returns:
+        Dict[str, Dict]: Les mesures de chaque format.
+    """
+    from files import Repository
+
+    livres = Repository("database/books.json", "isbn").read()
+    resultats = {}
+    for nom, binary in (("json", False), ("binaire", True)):
+        repository = Repository(f"database/formats-{nom}.json", "isbn", binary=binary)
+        resultats[f"instantané {nom} (écriture)"] = mesurer(
+            lambda: repository.write(livres), repetitions, operations=len(livres)
+        )
+        resultats[f"instantané {nom} (lecture)"] = mesurer(repository.read, repetitions, operations=len(livres))
+        resultats[f"instantané {nom} (lecture)"]["octets"] = os.path.getsize(repository.data_file)
+    return resultats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mesure les performances de la bibliothèque.")
+    parser.add_argument("--echelle", choices=ECHELLES, default="petite")
+    parser.add_argument("--livres", type=int, help="nombre de livres (remplace l'échelle)")
+    parser.add_argument("--etudiants", type=int, help="nombre d'étudiants (remplace l'échelle)")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sortie", help="fichier JSON des résultats (par défaut la sortie standard)")
+    args = parser.parse_args()
+
+    nb_livres, nb_etudiants = ECHELLES[args.echelle]
+    nb_livres = nb_livres if args.livres is None else args.livres
+    nb_etudiants = nb_etudiants if args.etudiants is None else args.etudiants
+
+    dossier = tempfile.mkdtemp(prefix="bibliotheque-benchmark-")
+    dossier_initial = os.getcwd()
+    sortie = os.path.abspath(args.sortie) if args.sortie else None
+    try:
+        debut = time.perf_counter()
+        livres, etudiants, historique = generer(nb_livres, nb_etudiants, args.graine)
+        os.mkdir(os.path.join(dossier, "database"))
+        atomic_write(os.path.join(dossier, "database", "books.json"), livres)
+        atomic_write(os.path.join(dossier, "database", "etudiants.json"), etudiants)
+        atomic_write(os.path.join(dossier, "database", "admins.json"), [])
+        Journal(os.path.join(dossier, "database", "historique.jsonl")).append(historique)
+        generation = time.perf_counter() - debut
+        del livres, etudiants, historique
+
+        os.chdir(dossier)
+        if BACKEND == "sqlite":
+            from sqlite_backend import migrer
+
+            # Les messages de la migration ne doivent pas se mêler au rapport JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                migrer()
+        resultats = executer(args.repetitions, args.graine)
+        resultats.update(comparer_formats(args.repetitions))
+        # Écrit les modifications en attente tant que le dossier temporaire existe
+        flush_all()
+    finally:
+        os.chdir(dossier_initial)
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    rapport = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plateforme": platform.platform(),
+        "backend": BACKEND,
+        "livres": nb_livres,
+        "etudiants": nb_etudiants,
+        "graine": args.graine,
+        "generation": generation,
+        "resultats": resultats,
+    }
+
+    texte = json.dumps(rapport, ensure_ascii=False, indent=2)
+    if sortie:
+        with open(sortie, "w", encoding="utf-8") as file:
+            file.write(texte + "\n")
+    else:
+        print(texte)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,71 +4,104 @@ La classe Bibliotheque comprend des méthodes pour l'enregistrement des utilisat
 la connexion des utilisateurs, l'affichage des livres, etc.
 """
 
-from files import BookHandler
+from records import Book
+from service import BibliothequeService, BibliothequeErreur
 from utils import print
 import utils
-import datetime
+import metrics
 
+# Nombre de livres par page dans les résultats de recherche
+PAR_PAGE = 10
+
+@metrics.instrumenter()
 class Bibliotheque:
-    book_handler = BookHandler()
-    livres = book_handler.load_data()
+    service = BibliothequeService()
+
+    @property
+    def livres(self) -> list[Book]:
+        # Le catalogue n'est chargé qu'à la première utilisation
+        return self.service.livres
 
-    def afficher_livres(self, user_type="Etudiant", effacer = False) -> list[dict] | None:
+    def afficher_livres(self, user_type="Etudiant", effacer = False) -> bool:
         """
-        Méthode pour afficher les livres disponibles.
+        Méthode pour afficher les livres disponibles, page par page.
 
         Returns:
-            List[Dict[str, [str | int]]]: Liste des livres disponibles.
+            bool: True si des livres ont été affichés, False sinon.
         """
         # Si l'utilisateur est un administrateur, tous les livres sont affichés
         if user_type == "Admin":
-            livres_disponibles = self.livres
+            livres_disponibles = self.service.book_handler.iter_data()
         else:
-            # Si l'utilisateur est un étudiant, seuls les livres qui ont un nombre d'exemplaires supérieur à 0 sont affichés
-            livres_disponibles = list(
-                filter(
-                    lambda row: {
-                        "id": row["id"],
-                        "titre": row["titre"],
-                        "auteur": row["auteur"],
-                        "isbn": row["isbn"],
-                        "emprunter_par": row["emprunter_par"],
-                    }
-                    if (row["nbr_ex"]) > 0
-                    else None,
-                    self.livres,
-                )
+            # Si l'utilisateur est un étudiant, seuls les livres qui ont un exemplaire ni emprunté ni réservé sont affichés
+            livres_disponibles = (
+                livre for livre in self.service.book_handler.iter_data() if self.service.est_disponible(livre)
             )
 
-            # Et si aucun livre n'est disponible, affiche un message d'erreur
-            if not len(livres_disponibles):
-                utils.message([("Aucun livre disponible!", "error")])
-                return None
-
         # Affiche la liste des livres disponibles
-        print("La liste des livres :")
-        utils.json_to_table(livres_disponibles, effacer)
+        return utils.json_to_pages(livres_disponibles, effacer)
+
+    def chercher_livre(self, user_type="Etudiant") -> Book | None:
+        """
+        Méthode pour rechercher un livre et le choisir dans les résultats, page par page.
+
+        Args:
+            user_type (str, optional): Le type de l'utilisateur. Par défaut "Etudiant".
 
-        return livres_disponibles
+        Returns:
+            Book | None: Le livre choisi, ou None si l'utilisateur abandonne.
+        """
+        requete = utils.input("Rechercher un livre (titre, auteur, éditeur ou début d'ISBN) : ")
+        page = 1
+
+        while True:
+            livres, total = self.service.rechercher(
+                requete, page, PAR_PAGE, disponibles=user_type != "Admin"
+            )
+
+            if not total:
+                utils.message([(f"Aucun livre trouvé pour : {requete}", "error")])
+                return None
+
+            nb_pages = -(-total // PAR_PAGE)
+            utils.clear()
+            print(f"{total} livre(s) trouvé(s) pour « {requete} » - page {page}/{nb_pages}")
+            utils.json_to_table(livres, False, True)
+
+            choix = utils.input(
+                "Numéro du livre, (s)uivante, (p)récédente, (r)echercher, (q)uitter : "
+            ).lower()
+
+            if choix.isdigit() and 1 <= int(choix) <= len(livres):
+                return livres[int(choix) - 1]
+            elif choix == "s" and page < nb_pages:
+                page += 1
+            elif choix == "p" and page > 1:
+                page -= 1
+            elif choix == "r":
+                requete = utils.input("Rechercher un livre : ")
+                page = 1
+            elif choix == "q":
+                utils.clear()
+                return None
 
     def ajouter_exemplaires(self, isbn, nbr_ex=None) -> bool:
-        for livre in self.livres:
-            if livre.get("isbn") == isbn:
-                if not nbr_ex:
-                    print(
-                        f"\nLe livre {livre['titre']} est deja dans la bibliotheque.\n"
-                    )
-                    # Demander combien d'exemplaires faut il ajouter
-                    nbr_ex = utils.int_input(
-                        "Combien d'exemplaires voulez vous ajouter : "
-                    )
+        livre = self.service.book_handler.get(isbn)
+        if livre is None:
+            return False
 
-                livre["nbr_ex"] += nbr_ex
-                self.update_book(livre)
+        if not nbr_ex:
+            print(
+                f"\nLe livre {livre['titre']} est deja dans la bibliotheque.\n"
+            )
+            # Demander combien d'exemplaires faut il ajouter
+            nbr_ex = utils.int_input(
+                "Combien d'exemplaires voulez vous ajouter : "
+            )
 
-                return nbr_ex
+        self.service.ajouter_exemplaires(isbn, nbr_ex)
 
-        return False
+        return nbr_ex
 
     def ajouter_livre(self) -> None:
         isbn = input("Entrez l'ISBN du livre : ")
@@ -78,143 +111,80 @@ class Bibliotheque:
             return
 
         # Si l'ISBN saisi ne correspond à aucun livre, demande à l'admin de saisir les informations du nouveau livre
-        idLivre = len(self.livres) + 1
         titre = input("Entrez le titre du livre : ")
         auteur = input("Entrez le nom de l'auteur : ")
         editeur = input("Entrez le nom de l'éditeur : ")
         nbr_ex = utils.int_input("Entrez le nombre d'exemplaires : ")
         annee = input("Entrez l'année de publication : ")
 
-        # Création du nouveau livre
-        livre = {
-            "id": idLivre,
-            "titre": titre,
-            "auteur": auteur,
-            "editeur": editeur,
-            "isbn": isbn,
-            "nbr_ex": nbr_ex,
-            "annee": annee,
-            "emprunter_par": [],
-        }
-
-        # Ajout du nouveau livre à la liste des livres
-        self.livres.append(livre)
-        # Sauvegarde de la liste des livres
-        self.book_handler.save_data(self.livres)
+        self.service.ajouter_livre(isbn, titre, auteur, editeur, nbr_ex, annee)
 
         utils.message([(f"Le livre {titre} a été ajouté avec succès.", "success")])
 
     def supprimer_livre(self):
-        self.afficher_livres("Admin")
-        
-        isbn = input("Entrez l'ISBN du livre à supprimer : ")
-
-        # Parcours de la liste des livres
-        for i, livre in enumerate(self.livres):
-            # Si l'ISBN du livre correspond à l'ISBN saisi
-            if livre["isbn"] == isbn:
-                utils.message(
-                    [(f"Livre {livre['titre']} supprimé avec succès.", "success")]
-                )
+        livre = self.chercher_livre("Admin")
 
-                # Suppression du livre de la liste des livres
-                del self.livres[i]
+        if livre is None:
+            return
 
-                # Sauvegarde de la liste des livres
-                self.book_handler.save_data(self.livres)
-                return
+        try:
+            self.service.supprimer_livre(livre["isbn"])
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
 
-        utils.message([(f"Aucun livre trouvé avec l'ISBN: {isbn}.", "error")])
+        utils.message(
+            [(f"Livre {livre['titre']} supprimé avec succès.", "success")]
+        )
 
     def modifier_livre(self):
-        self.afficher_livres("Admin")
-                
-        choix = utils.int_input("Entrez l'id du livre que vous voulez modifier : ")
+        livre = self.chercher_livre("Admin")
+
+        if livre is None:
+            return
+
         utils.clear()
         
-        livre = [self.livres[choix - 1]]        
+        livre = [livre]
         
         utils.json_to_table(livre, False)
         
+        # L'id vient de la séquence et les attributs internes (comme "_version") ne sont pas affichés
+        modifiables = [attr for attr in livre[0].keys() if attr != "id" and not attr.startswith("_")]
+
         while True:
             attr_a_modifier = utils.input("Quel attribut voulez-vous modifier ?\n->").lower()
-            if attr_a_modifier not in livre[0].keys():
+            if attr_a_modifier not in modifiables:
                 print("Attribut non valide veuilez recommencer.")
             else:
                 break
         
-        if attr_a_modifier in ["id", "nbr_ex"]:
+        if attr_a_modifier == "nbr_ex":
             nouvelle_val = utils.int_input(f"Entrez la nouvelle valeur de {attr_a_modifier} : ")
         else:
             nouvelle_val = utils.input(f"Entrez la nouvelle valeur de {attr_a_modifier} : ")
         
-        livre[0][attr_a_modifier] = nouvelle_val
-        
-        self.update_book(livre[0])
+        try:
+            self.service.modifier_livre(livre[0]["isbn"], attr_a_modifier, nouvelle_val)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
         
         utils.message([("Attribut modfifier avec succés", "success")])
         
-
-    def retourner_livre(self, livre_rendu) -> None:
-        for livre in self.livres:
-            if livre.get("isbn") == livre_rendu["isbn"]:
-                livre["nbr_ex"] += 1
-                livre["emprunter_par"].append(
-                    {
-                        key: livre_rendu[key]
-                        for key in ["login", "nom", "prenom", "date"]
-                        if key in livre_rendu
-                    }
-                )
-                livre["emprunter_par"][0].update(
-                    {"date_rendu": datetime.date.today().isoformat()}
-                )
-                self.update_book(livre)
-                break
-
-        utils.message([("Livre retourné avec succès.", "success")])
-        
     def historique_emprunts(self):
-        livres_empruntes = [livre for livre in self.livres if livre['emprunter_par']]
-        
-        utils.json_to_table(livres_empruntes)
+        # L'historique est lu dans son propre fichier, le catalogue n'est pas chargé
+        utils.json_to_pages(self.service.historique_emprunts())
 
-    def regle_7jours(self, etudiant_s) -> list[dict]:
+    def regle_7jours(self, etudiant_s=None) -> list[dict]:
         """
         Méthode pour vérifier la règle des 7 jours.
 
         Args:
-            id_etudiant (Optional[int], optional): ID de l'étudiant. Par défaut None.
+            etudiant_s (Optional[list[dict]], optional): Les étudiants à vérifier.
+                Par défaut None : tous les étudiants, en utilisant l'index des emprunts.
 
         Returns:
             List[Dict[str, str]]: Liste des infractions.
         """
-        infractions = []
-
-        # Pour chaque étudiant, vérifie si la date de l'emprunt est supérieure à 7 jours
-        for etudiant in etudiant_s:
-            for emprunt in etudiant["emprunts"]:
-                if (
-                    datetime.date.today()
-                    - datetime.datetime.strptime(emprunt["date"], "%Y-%m-%d").date()
-                ).days > 7:
-                    for livre in self.livres:
-                        if livre["isbn"] == emprunt["isbn"]:
-                            infractions.append(
-                                {
-                                    "id": etudiant["id"],
-                                    "nom": etudiant["nom"],
-                                    "prenom": etudiant["prenom"],
-                                    "titre": livre["titre"],
-                                }
-                            )
-        return infractions
-
-    def update_book(self, book=None) -> None:
-        """
-        Met à jour un livre spécifique dans la base de données.
-
-        Args:
-            student (dict): Le livre à mettre à jour.
-        """
-        self.book_handler.update(book)
+        return self.service.regle_7jours(etudiant_s)
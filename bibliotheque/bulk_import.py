@@ -0,0 +1,209 @@
+"""
+Ce module importe un lot de livres dans le catalogue à partir d'un fichier CSV ou JSON Lines.
+
+Le fichier est lu ligne par ligne : chaque ligne est validée (ISBN-10/13 avec sa clé de contrôle,
+titre obligatoire, nombre d'exemplaires entier positif), puis tous les livres valides sont
+enregistrés en une seule écriture par BibliothequeService.importer_livres. Les lignes rejetées
+sont comptées et les premières erreurs sont affichées à la fin.
+
+Utilisation :
+    python bulk_import.py livres.csv
+    python bulk_import.py livres.jsonl [--format jsonl]
+
+Colonnes (CSV) ou clés (JSON) :
+    isbn, titre, auteur, editeur, nbr_ex (1 par défaut), annee
+"""
+
+import argparse
+import csv
+import json
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+from service import BibliothequeService
+
+# Nombre d'erreurs détaillées dans le rapport final
+MAX_ERREURS = 10
+
+# Nombre de lignes lues entre deux lignes de progression
+PROGRESSION = 10000
+
+
+def normaliser_isbn(isbn) -> Optional[str]:
+    """
+    Retire les tirets et les espaces d'un ISBN et vérifie sa clé de contrôle.
+
+    Args:
+        isbn: L'ISBN à vérifier.
+
+    Returns:
+        Optional[str]: L'ISBN normalisé, ou None s'il n'est pas valide.
+    """
+    isbn = re.sub(r"[\- ]", "", str(isbn or "")).upper()
+
+    if re.fullmatch(r"\d{9}[\dX]", isbn):
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(isbn))
+        return isbn if total % 11 == 0 else None
+
+    if re.fullmatch(r"\d{13}", isbn):
+        total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(isbn))
+        return isbn if total % 10 == 0 else None
+
+    return None
+
+
+def valider(ligne: Dict) -> Dict:
+    """
+    Valide une ligne du fichier et la convertit en livre.
+
+    Args:
+        ligne (Dict): La ligne lue.
+
+    Raises:
+        ValueError: Si la ligne n'est pas valide.
+
+    Returns:
+        Dict: Le livre (isbn, titre, auteur, editeur, nbr_ex, annee).
+    """
+    isbn = normaliser_isbn(ligne.get("isbn"))
+    if isbn is None:
+        raise ValueError(f"ISBN invalide : {ligne.get('isbn')!r}")
+
+    titre = str(ligne.get("titre") or "").strip()
+    if not titre:
+        raise ValueError(f"titre manquant pour l'ISBN {isbn}")
+
+    nbr_ex = ligne.get("nbr_ex")
+    try:
+        nbr_ex = 1 if nbr_ex in (None, "") else int(nbr_ex)
+    except (TypeError, ValueError):
+        raise ValueError(f"nombre d'exemplaires invalide pour l'ISBN {isbn} : {nbr_ex!r}")
+    if nbr_ex < 1:
+        raise ValueError(f"nombre d'exemplaires invalide pour l'ISBN {isbn} : {nbr_ex}")
+
+    return {
+        "isbn": isbn,
+        "titre": titre,
+        "auteur": str(ligne.get("auteur") or "").strip(),
+        "editeur": str(ligne.get("editeur") or "").strip(),
+        "nbr_ex": nbr_ex,
+        "annee": str(ligne.get("annee") or "").strip(),
+    }
+
+
+def lire_lignes(fichier: str, format: str) -> Iterable[Dict]:
+    """
+    Parcourt les lignes d'un fichier CSV ou JSON Lines sans le charger entièrement.
+
+    Args:
+        fichier (str): Le chemin du fichier.
+        format (str): "csv" ou "jsonl".
+
+    Yields:
+        Dict: Les lignes lues (None pour une ligne JSON illisible).
+    """
+    with open(fichier, "r", encoding="utf-8", newline="") as f:
+        if format == "csv":
+            yield from csv.DictReader(f)
+            return
+
+        for ligne in f:
+            if not ligne.strip():
+                continue
+            try:
+                yield json.loads(ligne)
+            except json.JSONDecodeError:
+                yield None
+
+
+class Import:
+    """
+    Valide les lignes d'un fichier au fil de la lecture et tient les statistiques de l'import.
+    """
+
+    def __init__(self, progression: int = PROGRESSION):
+        self.lues = 0
+        self.rejetees = 0
+        self.erreurs: List[str] = []
+        self.progression = progression
+        self.debut = time.perf_counter()
+
+    def valides(self, lignes: Iterable[Dict]) -> Iterable[Dict]:
+        """
+        Filtre les lignes valides et compte les lignes rejetées.
+
+        Args:
+            lignes (Iterable[Dict]): Les lignes lues.
+
+        Yields:
+            Dict: Les livres valides.
+        """
+        for ligne in lignes:
+            self.lues += 1
+            try:
+                if not isinstance(ligne, dict):
+                    raise ValueError("ligne illisible")
+                yield valider(ligne)
+            except ValueError as erreur:
+                self.rejetees += 1
+                if len(self.erreurs) < MAX_ERREURS:
+                    self.erreurs.append(f"ligne {self.lues} : {erreur}")
+
+            if self.progression and self.lues % self.progression == 0:
+                print(f"{self.lues} lignes lues ({self.debit():.0f} lignes/s)")
+
+    def debit(self) -> float:
+        duree = time.perf_counter() - self.debut
+        return self.lues / duree if duree else 0.0
+
+
+def importer(fichier: str, format: str = None, service: BibliothequeService = None) -> Dict:
+    """
+    Importe les livres d'un fichier dans le catalogue.
+
+    Args:
+        fichier (str): Le chemin du fichier.
+        format (str, optional): "csv" ou "jsonl". Par défaut, déduit de l'extension du fichier.
+        service (BibliothequeService, optional): Le service à utiliser.
+
+    Returns:
+        Dict: Les statistiques de l'import.
+    """
+    format = format or ("csv" if fichier.lower().endswith(".csv") else "jsonl")
+    service = service or BibliothequeService()
+
+    suivi = Import()
+    resultat = service.importer_livres(suivi.valides(lire_lignes(fichier, format)))
+
+    resultat.update(
+        {
+            "lues": suivi.lues,
+            "rejetees": suivi.rejetees,
+            "erreurs": suivi.erreurs,
+            "duree": round(time.perf_counter() - suivi.debut, 3),
+            "lignes_par_seconde": round(suivi.debit()),
+        }
+    )
+    return resultat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Importe un lot de livres dans le catalogue.")
+    parser.add_argument("fichier", help="fichier CSV ou JSON Lines")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="format du fichier (déduit de l'extension)")
+    args = parser.parse_args()
+
+    resultat = importer(args.fichier, args.format)
+
+    print(
+        f"{resultat['lues']} ligne(s) lue(s) en {resultat['duree']} s "
+        f"({resultat['lignes_par_seconde']} lignes/s)"
+    )
+    print(f"{resultat['ajoutes']} livre(s) ajouté(s), {resultat['fusionnes']} livre(s) existant(s) complété(s)")
+    print(f"{resultat['exemplaires']} exemplaire(s) ajouté(s), {resultat['rejetees']} ligne(s) rejetée(s)")
+    for erreur in resultat["erreurs"]:
+        print(f"  {erreur}")
+
+
+if __name__ == "__main__":
+    main()
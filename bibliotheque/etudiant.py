@@ -1,55 +1,49 @@
 """
 Ce module définit la classe Etudiant qui représente un utilisateur étudiant dans le système de gestion de la bibliothèque. 
 La classe Etudiant comprend des méthodes pour emprunter des livres, les rendre, etc.
+
+Un Etudiant est un enregistrement Student (voir records.py) : ses attributs (id, emprunts, ...)
+sont ceux de l'étudiant enregistré, et il se passe tel quel aux méthodes du service.
 """
 from bibliotheque import Bibliotheque
 from files import StudentHandler
+from records import Student
+from service import BibliothequeErreur
 from utils import print
 import utils
+import metrics
+
+
+class CompteSupprime(Exception):
+    pass
 
 
-class Etudiant:
+@metrics.instrumenter()
+class Etudiant(Student):
+    __slots__ = ()
     bibliotheque = Bibliotheque()
     student_handler: StudentHandler = StudentHandler()
 
     def __init__(self, attributs):
-        for attr in attributs:
-            setattr(self, attr, attributs[attr])
-
-        self.update_student()
+        # Les attributs sont ceux de l'étudiant enregistré : rien à écrire à la connexion
+        super().__init__(attributs)
 
     def choisir_livre(self) -> None:
         """
         Méthode pour choisir un livre à emprunter.
         """
-        # Si l'étudiant a déjà emprunté 3 livres, affiche un message d'erreur
-        if len(self.emprunts) >= 3:
-            utils.message([("Vous avez déjà emprunté 3 livres!", "error")])
-            return
-        # Si l'étudiant a emprunté un livre depuis plus de 7 jours, affiche un message d'erreur
-        if self.regle_7jours():
-            utils.message([("Vous avez emprunter un livre plus de 7 jours.", "error")])
+        # Vérifie la limite de 3 emprunts et la règle des 7 jours avant la recherche
+        try:
+            self.bibliotheque.service.verifier_emprunteur(self)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
             return
 
-        # Affiche les livres disponibles
-        livres_disponibles = self.bibliotheque.afficher_livres()
+        # Recherche parmi les livres disponibles
+        livre = self.bibliotheque.chercher_livre()
 
-        if not livres_disponibles:
-            return
-
-        # Récupération de la liste des ids des livres disponibles
-        ids = [livre["id"] for livre in livres_disponibles]
-
-        # Vérfier l'entrée de l'utilisateur
-        while True:
-            choix = utils.int_input(
-                "Entrez l'ID du livre que vous souhaitez emprunter : "
-            )
-            if choix in ids:
-                self.demande_emprunt_livre(livres_disponibles[choix - 1])
-                return
-            else:
-                print("Veuillez entrez un ID valide.")
+        if livre:
+            self.demande_emprunt_livre(livre)
 
     def demande_emprunt_livre(self, livre: list) -> None:
         """
@@ -58,9 +52,13 @@ class Etudiant:
         Args:
             livre_id (int): ID du livre à emprunter.
         """
-        self.demandes.append({"titre": livre["titre"], "isbn": livre["isbn"]})
-
-        self.update_student()
+        try:
+            self.bibliotheque.service.demander_emprunt(self.id, livre["isbn"])
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
+        finally:
+            self.actualiser()
 
         utils.message(
             [("Votre demande d'emprunts a été envoyé avec succès.", "success")]
@@ -87,17 +85,17 @@ class Etudiant:
         utils.json_to_table(livres_a_rendre, False)
 
         print("Entrez le numéro du livre que vous souhaitez rendre: ")
-        choix = utils.get_input(len(self.emprunts)) - 1
-
-        livre_a_rendre = self.emprunts.pop(choix)
-
-        livre_a_rendre.update(
-            {"login": self.login, "nom": self.nom, "prenom": self.prenom}
-        )
+        choix = utils.get_input(len(self.emprunts))
 
-        self.bibliotheque.retourner_livre(livre_a_rendre)
+        try:
+            self.bibliotheque.service.retourner_livre(self.id, choix)
+        except BibliothequeErreur as erreur:
+            utils.message([(str(erreur), "error")])
+            return
+        finally:
+            self.actualiser()
 
-        self.update_student()
+        utils.message([("Livre retourné avec succès.", "success")])
 
     def regle_7jours(self) -> bool:
         """
@@ -108,19 +106,16 @@ class Etudiant:
         """
         # Appel de la méthode regle_7jours de la classe Bibliotheque avec l'id de l'étudiant
         # Si des infractions ont été trouvées, renvoie True, sinon renvoie False
-        return bool(self.bibliotheque.regle_7jours([self.to_dict()]))
+        return bool(self.bibliotheque.regle_7jours([self]))
 
-    def update_student(self, student=None) -> None:
+    def actualiser(self) -> None:
         """
-        Met à jour un étudiant spécifique dans la base de données.
+        Recopie les attributs de l'étudiant depuis la base de données après une opération du service.
 
-        Args:
-            student (dict): L'étudiant à mettre à jour.
+        Raises:
+            CompteSupprime: Si l'étudiant a été supprimé entre-temps (par un admin ou un autre processus).
         """
-        if not student:
-            student = self.to_dict()
-
-        self.student_handler.update(student)
-
-    def to_dict(self):
-        return {attr: getattr(self, attr) for attr in vars(self)}
+        enregistre = self.student_handler.get(self.id)
+        if enregistre is None:
+            raise CompteSupprime("Votre compte n'existe plus, vous êtes déconnecté.")
+        self.update(enregistre)
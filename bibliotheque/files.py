@@ -1,81 +1,1132 @@
 """
-Ce module gère toutes les opérations sur les fichiers pour le système de gestion de bibliothèque. 
+Ce module gère toutes les opérations sur les fichiers pour le système de gestion de bibliothèque.
 Il comprend des fonctions de chargement et d'enregistrement de données dans des fichiers JSON.
+
+Chaque fichier est chargé une seule fois dans un Repository partagé par tous les handlers
+qui pointent sur le même fichier. Le Repository garde un index sur la clé primaire de la
+collection, ce qui rend les recherches et les mises à jour en O(1). Des index secondaires
+peuvent être ajoutés sur d'autres attributs (le login et l'email des étudiants).
+
+En mode journal, chaque modification est ajoutée au journal de la collection (voir journal.py)
+au lieu de réécrire tout le fichier JSON.
+
+Les ids des nouveaux éléments viennent d'une séquence propre à chaque collection (next_ids),
+enregistrée dans le journal puis dans database/<name>.seq : un id n'est jamais réattribué. Une
+suppression laisse une pierre tombale à la place de l'élément, qui n'est retiré de la liste qu'à
+la prochaine lecture complète (load) ou compaction : supprimer ne décale aucun élément.
+
+Une collection chargée reste en mémoire tant que son fichier JSON et son journal ne changent
+pas : leur date de modification, leur taille et leur inode sont comparés (au plus une fois par
+CHECK_INTERVAL) avant chaque accès. Si un autre processus les a modifiés, la collection est
+relue ; nos propres écritures mettent seulement cette signature à jour.
+
+Plusieurs processus peuvent écrire dans la même collection. Chaque écriture tient le verrou
+d'écriture de la collection (locked), qui verrouille aussi le fichier database/<name>.lock, et
+applique d'abord les enregistrements ajoutés au journal par les autres processus. Chaque élément
+porte un numéro de version (VERSION) augmenté à chaque mise à jour : update refuse (ConflictError)
+un élément lu dans une version qui n'est plus la dernière, au lieu d'écraser la modification d'un
+autre processus, et modify réapplique une modification à la dernière version. Pour les opérations
+qui lisent puis modifient plusieurs éléments, transaction garde les collections verrouillées du
+début à la fin.
+
+Les éléments chargés sont des enregistrements (voir records.py) plutôt que des dictionnaires :
+chaque handler donne le type de ses éléments (`record`), qui s'utilise comme le dictionnaire lu
+dans le fichier et prend beaucoup moins de mémoire.
+
+Une grande collection peut être répartie entre plusieurs fichiers JSON (voir shards.py), et son
+instantané peut être enregistré au format binaire plutôt qu'en JSON (voir snapshot.py).
+
+Le stockage est choisi avec la variable d'environnement BIBLIOTHEQUE_BACKEND : "json" (par défaut)
+ou "sqlite" (voir sqlite_backend.py). Tout Repository expose les mêmes méthodes
+(load, get, update, delete, replace, flush), les handlers ne dépendent donc pas du stockage.
 """
 
+import atexit
+import contextlib
+import copy
+import functools
+import gc
+import itertools
 import json
-from typing import List, Dict
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+from journal import Journal, atomic_write, file_lock
+import metrics
+from records import AdminAccount, Book, Student
+import snapshot
 
 
-class FileHandler:
-    def __init__(self, file_name: str):
-        self.file_name = f"database/{file_name}.json"
+# Taille des blocs lus par iter_json_array
+CHUNK_SIZE = 64 * 1024
 
-    def load_data(self) -> List[Dict]:
+# Délai minimal (en secondes) entre deux vérifications des fichiers d'une collection chargée
+CHECK_INTERVAL = 0.1
+
+# Attribut portant le numéro de version de chaque élément (0 pour un élément jamais mis à jour)
+VERSION = "_version"
+
+# Collections dont l'instantané est enregistré au format binaire (voir snapshot.py)
+BINARY_COLLECTIONS = {name for name in os.environ.get("BIBLIOTHEQUE_BINAIRE", "").split(",") if name}
+
+# Nombre d'essais de modify : le dernier se fait sous le verrou d'écriture
+MAX_RETRIES = 5
+
+
+class ConflictError(Exception):
+    """
+    Levée quand un élément a été modifié (par un autre processus) depuis qu'il a été lu.
+    """
+
+
+def iter_json_array(file_name: str) -> Iterator[Dict]:
+    """
+    Parcourt les éléments d'un tableau JSON sans charger tout le fichier en mémoire.
+
+    Le fichier est lu par blocs et chaque élément est décodé dès qu'il est complet. Comme pour
+    Repository.read, un fichier absent, vide ou invalide ne donne aucun élément (un fichier
+    invalide s'arrête au premier élément illisible).
+
+    Args:
+        file_name (str): Le fichier JSON contenant un tableau.
+
+    Yields:
+        Dict: Les éléments du tableau, dans l'ordre du fichier.
+    """
+    try:
+        file = open(file_name, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+
+    with file:
+        try:
+            yield from _iter_json_items(file)
+        finally:
+            if metrics.ACTIF:
+                metrics.octets(lus=file.buffer.tell())
+
+
+def _iter_json_items(file) -> Iterator[Dict]:
+    # Décode les éléments du tableau JSON d'un fichier ouvert (voir iter_json_array)
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE)
+    pos = 0
+    started = False
+    eof = not buffer
+
+    while True:
+        # Saute les blancs et les séparateurs entre les éléments
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer = file.read(CHUNK_SIZE)
+            pos = 0
+            eof = not buffer
+            continue
+
+        if not started:
+            if buffer[pos] != "[":
+                return
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # L'élément est peut-être coupé par la fin du bloc
+            if eof:
+                return
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+
+def field_values(items: List[Dict], field: str, record: Optional[type] = None) -> Iterator:
+    """
+    Renvoie les valeurs d'un attribut des éléments, dans l'ordre (None si absent).
+
+    Args:
+        items (List[Dict]): Les éléments.
+        field (str): L'attribut.
+        record (Optional[type]): Le type d'enregistrement de tous les éléments, s'il est connu.
+    """
+    if record is not None and field in record._fields:
+        # getattr est appelé par map sans passer par Record.get, bien plus lent sur une grande collection
+        return map(getattr, items, itertools.repeat(field), itertools.repeat(None))
+    return (item.get(field) for item in items)
+
+
+def max_id(items: List[Dict], record: Optional[type] = None) -> int:
+    """
+    Renvoie le plus grand id entier des éléments, ou 0.
+    """
+    return max((id_ for id_ in field_values(items, "id", record) if type(id_) is int), default=0)
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Suspend le ramasse-miettes pendant un chargement.
+
+    Les enregistrements (voir records.py) sont suivis par le ramasse-miettes, contrairement aux
+    dictionnaires de valeurs simples lus dans le JSON : pendant le chargement d'une grande
+    collection, chaque lot d'objets créés relancerait un parcours de tous les enregistrements
+    déjà créés, sans aucun cycle à trouver.
+    """
+    actif = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if actif:
+            gc.enable()
+
+
+def synchronise(methode):
+    """
+    Décorateur qui exécute une méthode du Repository en tenant son verrou, pour que plusieurs
+    threads puissent lire et modifier la même collection.
+    """
+    @functools.wraps(methode)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return methode(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Repository:
+    """
+    Collection chargée en mémoire et indexée sur sa clé primaire.
+
+    Les modifications sont faites en mémoire et les clés modifiées sont notées dans `dirty`.
+    Elles ne sont écrites sur le disque qu'au moment de flush().
+
+    Si un journal est fourni, chaque modification y est ajoutée immédiatement et le fichier
+    JSON n'est réécrit que lors de la compaction du journal.
+
+    Un élément supprimé reste dans `items` (sa position est notée dans `deleted`) jusqu'à la
+    purge suivante : il n'est plus dans les index, get et find ne le trouvent donc plus.
+
+    Les écritures sur le disque se font sous le verrou d'écriture (locked), pris avant le verrou
+    `lock` des données en mémoire.
+
+    Si `binary` est vrai, l'instantané est enregistré dans data_file au format binaire (voir
+    snapshot.py) au lieu du fichier JSON `file_name`. Si `record` est donné, les éléments lus
+    ou ajoutés sont convertis en enregistrements de ce type (voir records.py).
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        key: str,
+        journal: Optional[Journal] = None,
+        binary: bool = False,
+        record: Optional[type] = None,
+    ):
+        self.file_name = file_name
+        self.key = key
+        self.journal = journal
+        self.binary = binary
+        self.record = record
+        self.items: Optional[List[Dict]] = None
+        self.index: Dict = {}  # clé primaire -> position dans items
+        self.keys: List = []  # position -> clé primaire indexée
+        self.positions: Dict[int, int] = {}  # id(item) -> position dans items
+        self.secondary: Dict[str, Dict] = {}  # attribut -> (valeur -> clé primaire)
+        self.deleted: set = set()  # positions des éléments supprimés (pierres tombales)
+        self.sequence = 0  # dernier id attribué
+        self.dirty: set = set()
+        # (date de modification, taille, inode) du fichier et du journal lors du dernier chargement
+        self.signature: Optional[tuple] = None
+        self.checked = 0.0  # instant de la dernière vérification de la signature
+        self.listeners: List[Callable[[], None]] = []  # appelés quand la collection est relue
+        self.lock = threading.RLock()
+        self.write_lock = threading.RLock()
+        self.lock_depth = 0  # niveaux de locked() tenus par le thread qui a write_lock
+
+    @property
+    def data_file(self) -> str:
+        """
+        Le fichier de l'instantané : le fichier JSON, ou l'instantané binaire si `binary`.
         """
-        Charge les données à partir d'un fichier JSON.
+        return snapshot.snapshot_file(self.file_name) if self.binary else self.file_name
+
+    def read(self) -> List[Dict]:
+        """
+        Lit l'instantané de la collection sur le disque.
+
+        S'il n'existe pas encore dans le format choisi, l'instantané de l'autre format est lu :
+        la collection est convertie à la prochaine écriture de son instantané (compact).
 
         Returns:
-            List[Dict]: Les données chargées.
+            List[Dict]: Les données lues, ou une liste vide si le fichier est absent ou invalide.
+
+        Raises:
+            SnapshotError: Si l'instantané binaire est abîmé (le JSON invalide donne une liste vide).
+        """
+        for binary in (self.binary, not self.binary):
+            try:
+                return snapshot.load(snapshot.snapshot_file(self.file_name)) if binary else self.read_json()
+            except FileNotFoundError:
+                pass
+        return []
+
+    def read_json(self) -> List[Dict]:
+        """
+        Lit le fichier JSON sur le disque.
+
+        Returns:
+            List[Dict]: Les données lues, ou une liste vide si le fichier est invalide.
+
+        Raises:
+            FileNotFoundError: Si le fichier n'existe pas.
         """
         data = []
         try:
             with open(self.file_name, "r", encoding="utf-8") as file:
                 data = json.load(file)
-        except FileNotFoundError:
-            # print(f"No file found at {self.file_name}")
-            pass
+                if metrics.ACTIF:
+                    metrics.octets(lus=os.fstat(file.fileno()).st_size)
         except json.JSONDecodeError:
             # print(f"Error decoding JSON from {self.file_name}")
             pass
 
         return data
 
+    def stream(self) -> Iterator[Dict]:
+        """
+        Parcourt les éléments du fichier JSON sans le charger entièrement. Un instantané binaire
+        se lit d'un bloc.
+
+        Yields:
+            Dict: Les éléments lus sur le disque.
+        """
+        if self.binary or not os.path.exists(self.file_name):
+            return iter(self.read())
+        return iter_json_array(self.file_name)
+
+    def iter(self) -> Iterator[Dict]:
+        """
+        Parcourt les éléments de la collection en lecture seule.
+
+        Si la collection n'est pas encore chargée et que le journal est vide, les éléments sont
+        lus au fil de l'eau sur le disque et ne restent pas en mémoire. Sinon, la liste en
+        mémoire est parcourue.
+
+        Yields:
+            Dict: Les éléments de la collection.
+        """
+        with self.lock:
+            loaded = self.items is not None or (self.journal is not None and self.journal.size > 0)
+            items = list(self.load()) if loaded else None
+
+        if items is None:
+            yield from self.stream()
+        else:
+            yield from items
+
+    def write(self, data: List[Dict]) -> None:
+        """
+        Écrit les données dans data_file via un fichier temporaire et un renommage atomique.
+
+        Args:
+            data (List[Dict]): Les données à écrire.
+        """
+        if self.binary:
+            snapshot.dump(self.data_file, data)
+        else:
+            atomic_write(self.file_name, data)
+
+    @property
+    def sequence_file(self) -> str:
+        return f"{os.path.splitext(self.file_name)[0]}.seq"
+
+    @property
+    def lock_file(self) -> str:
+        return f"{os.path.splitext(self.file_name)[0]}.lock"
+
+    def read_sequence(self) -> int:
+        """
+        Lit le dernier id attribué, enregistré lors de la dernière compaction.
+
+        Returns:
+            int: Le dernier id attribué, ou 0 si la séquence n'a jamais été enregistrée.
+        """
+        try:
+            with open(self.sequence_file, "r", encoding="utf-8") as file:
+                return int(json.load(file))
+        except (FileNotFoundError, ValueError, TypeError):
+            return 0
+
+    def write_sequence(self) -> None:
+        if self.sequence:
+            atomic_write(self.sequence_file, self.sequence)
+
+    @synchronise
+    def load(self) -> List[Dict]:
+        """
+        Charge la collection si ce n'est pas déjà fait, puis rejoue le journal.
+
+        Les éléments supprimés depuis le dernier appel sont retirés de la liste à ce moment-là.
+
+        Returns:
+            List[Dict]: La liste partagée des éléments de la collection.
+        """
+        self._load()
+        if self.deleted:
+            self.purge()
+        return self.items
+
+    def _load(self) -> None:
+        # Comme load, sans purger les pierres tombales : les accès par clé n'en ont pas besoin
+        if self.items is None:
+            self._read()
+        elif time.monotonic() - self.checked >= CHECK_INTERVAL:
+            self.refresh()
+
+    def _read(self) -> None:
+        # Signature prise avant la lecture : une écriture pendant la lecture sera vue ensuite
+        self.signature = self.stat()
+        self.checked = time.monotonic()
+        with gc_paused():
+            self.items = self._records(self.read())
+            self.deleted = set()
+            self.reindex()
+            # Une collection sans séquence enregistrée reprend après son plus grand id
+            self.sequence = max(
+                self.sequence,
+                self.read_sequence(),
+                max_id(self.items, self.record),
+            )
+            if self.journal is not None:
+                self.journal.refresh()
+                self.replay()
+
+    def _record(self, item: Dict) -> Dict:
+        # Un dictionnaire devient un enregistrement du type de la collection
+        return item if self.record is None else self.record.coerce(item)
+
+    def _records(self, data: List[Dict]) -> List[Dict]:
+        # Conversion sur place : chaque dictionnaire est libéré dès que son enregistrement existe
+        if self.record is not None:
+            from_dict = self.record.from_dict
+            for i, item in enumerate(data):
+                if type(item) is dict:
+                    data[i] = from_dict(item)
+                else:
+                    data[i] = self.record.coerce(item)
+        return data
+
+    @synchronise
+    def unload(self) -> None:
+        """
+        Oublie la collection chargée : elle sera relue sur le disque au prochain accès.
+        """
+        self.items = None
+
+    def stat(self) -> tuple:
+        """
+        Renvoie la signature des fichiers de la collection : (date de modification, taille, inode)
+        des instantanés (JSON et binaire) et du journal, ou None pour un fichier absent.
+        """
+        signature = []
+        for file_name in (self.file_name, snapshot.snapshot_file(self.file_name),
+                          self.journal.file_name if self.journal is not None else None):
+            try:
+                info = os.stat(file_name) if file_name else None
+            except FileNotFoundError:
+                info = None
+            signature.append(info and (info.st_mtime_ns, info.st_size, info.st_ino))
+        return tuple(signature[:2]), signature[2]
+
+    def refresh(self) -> None:
+        """
+        Applique les modifications faites par d'autres processus depuis le dernier chargement.
+
+        Si seul le journal a grandi, les enregistrements ajoutés sont appliqués ; sinon (fichier
+        JSON réécrit par une compaction, autre stockage) toute la collection est relue. Les
+        modifications pas encore écrites (dirty) sont prioritaires : la collection n'est alors
+        pas relue.
+        """
+        if self.items is None or self.dirty:
+            return
+        self.checked = time.monotonic()
+        signature = self.stat()
+        if signature == self.signature:
+            return
+
+        if self.journal is not None and signature[0] == self.signature[0] and self._appended(signature[1]):
+            for record in self.journal.follow():
+                self._apply(record)
+            self.signature = signature
+        else:
+            self._read()
+
+        for listener in self.listeners:
+            listener()
+
+    def _appended(self, journal_signature: Optional[tuple]) -> bool:
+        # Vrai si le journal a seulement grandi depuis la dernière lecture (même inode, pas vidé)
+        old = self.signature[1]
+        if journal_signature is None:
+            return False
+        return (old is None or old[2] == journal_signature[2]) and journal_signature[1] >= self.journal.size
+
+    def on_reload(self, listener: Callable[[], None]) -> None:
+        """
+        Enregistre une fonction appelée quand la collection est relue après une modification
+        par un autre processus (pour invalider les index construits à partir de ses éléments).
+        """
+        self.listeners.append(listener)
+
+    def purge(self) -> None:
+        """
+        Retire de la liste les éléments supprimés et reconstruit les index.
+
+        La liste est modifiée sur place : celle renvoyée par load() reste la liste partagée.
+        """
+        self.items[:] = [item for pos, item in enumerate(self.items) if pos not in self.deleted]
+        self.deleted.clear()
+        self.reindex()
+
+    def next_ids(self, count: int = 1) -> range:
+        """
+        Réserve des ids pour de nouveaux éléments.
+
+        Args:
+            count (int, optional): Le nombre d'ids à réserver. Par défaut 1.
+
+        Returns:
+            range: Les ids réservés, jamais attribués auparavant.
+        """
+        with self.locked():
+            self._load()
+            first = self.sequence + 1
+            self.sequence += count
+            self.log([{"op": "seq", "value": self.sequence}])
+        return range(first, self.sequence + 1)
+
+    def replay(self) -> None:
+        """
+        Applique les enregistrements du journal à la collection en mémoire.
+        """
+        for record in self.journal.replay():
+            self._apply(record)
+
+    def _apply(self, record: Dict) -> None:
+        if record.get("op") == "put":
+            self._put(record["item"])
+        elif record.get("op") == "del":
+            self._tombstone(record["key"])
+        elif record.get("op") == "seq":
+            self.sequence = max(self.sequence, record["value"])
+
+    def reindex(self) -> None:
+        """
+        Reconstruit les index à partir de la liste des éléments.
+        """
+        self.index = {}
+        self.keys = list(field_values(self.items, self.key, self.record))
+        self.positions = {}
+        for i, (item, value) in enumerate(zip(self.items, self.keys)):
+            if i in self.deleted:
+                continue
+            self.index[value] = i
+            self.positions[id(item)] = i
+
+        for field, values in self.secondary.items():
+            values.clear()
+            for i, value in enumerate(field_values(self.items, field, self.record)):
+                if i not in self.deleted:
+                    values[value] = self.keys[i]
+
+    @synchronise
+    def add_index(self, field: str) -> None:
+        """
+        Ajoute un index secondaire sur un attribut (par exemple le login des étudiants).
+
+        Args:
+            field (str): L'attribut à indexer.
+        """
+        if field in self.secondary:
+            return
+        self.secondary[field] = {}
+        if self.items is not None:
+            self.reindex()
+
+    @synchronise
+    def find(self, field: str, value) -> Optional[Dict]:
+        """
+        Renvoie l'élément dont l'attribut `field` vaut `value`, à l'aide d'un index secondaire.
+
+        Un attribut modifié sur place laisse son ancienne valeur dans l'index : l'élément trouvé
+        est donc revérifié avant d'être renvoyé.
+
+        Args:
+            field (str): L'attribut indexé (voir add_index).
+            value: La valeur cherchée.
+
+        Returns:
+            Optional[Dict]: L'élément trouvé, ou None.
+        """
+        self._load()
+        key = self.secondary[field].get(value)
+        item = None if key is None else self.get(key)
+        return item if item is not None and item.get(field) == value else None
+
+    @synchronise
+    def get(self, value) -> Optional[Dict]:
+        """
+        Renvoie l'élément dont la clé primaire vaut `value`.
+
+        Args:
+            value: La valeur de la clé primaire.
+
+        Returns:
+            Optional[Dict]: L'élément trouvé, ou None.
+        """
+        self._load()
+        pos = self.index.get(value)
+        return None if pos is None else self.items[pos]
+
+    def update(self, item: Dict) -> None:
+        """
+        Remplace l'élément ayant la même clé primaire que `item`, ou l'ajoute s'il n'existe pas.
+
+        Raises:
+            ConflictError: Si l'élément enregistré a changé depuis que `item` a été lu.
+
+        Args:
+            item (Dict): Le nouvel élément.
+        """
+        self.update_many([item])
+
+    def update_many(self, items: List[Dict]) -> None:
+        """
+        Met à jour plusieurs éléments et enregistre toutes les modifications en une seule écriture.
+
+        Les versions de tous les éléments sont vérifiées avant la première modification : en cas
+        de conflit, rien n'est modifié.
+
+        Raises:
+            ConflictError: Si l'un des éléments enregistrés a changé depuis qu'il a été lu.
+
+        Args:
+            items (List[Dict]): Les nouveaux éléments.
+        """
+        with self.locked(), self.lock:
+            self._load()
+            versions = [self._check(item) for item in items]
+            records = []
+            for item, version in zip(items, versions):
+                item[VERSION] = version + 1
+                records.extend(self._put(item))
+            if records:
+                self.log(records)
+
+    def _check(self, item: Dict) -> int:
+        """
+        Vérifie que `item` est l'élément enregistré, ou une copie de sa dernière version.
+
+        Raises:
+            ConflictError: Si l'élément enregistré a changé (ou a été supprimé) depuis.
+
+        Returns:
+            int: La version de l'élément enregistré (0 s'il n'existe pas).
+        """
+        value = item.get(self.key)
+        pos = self.index.get(value)
+        if pos is None:
+            # L'élément est peut-être déjà dans la liste mais sa clé a été modifiée sur place
+            pos = self.positions.get(id(item))
+            if pos is not None and self.items[pos] is not item:
+                pos = None
+        current = None if pos is None else self.items[pos]
+        if current is item:
+            return item.get(VERSION, 0)
+
+        version = 0 if current is None else current.get(VERSION, 0)
+        if item.get(VERSION, 0) != version:
+            raise ConflictError(
+                f"{self.file_name} : l'élément {value!r} a été modifié depuis sa lecture "
+                f"(version {item.get(VERSION, 0)}, enregistrée {version})."
+            )
+        return version
+
+    def modify(self, value, change: Callable[[Dict], None]) -> Dict:
+        """
+        Modifie l'élément dont la clé primaire vaut `value` sans écraser les modifications des
+        autres processus.
+
+        `change` modifie sur place une copie de la dernière version de l'élément, qui est ensuite
+        enregistrée avec update. En cas de conflit, la copie est refaite à partir de la nouvelle
+        version et `change` y est appliquée de nouveau : les deux modifications sont gardées.
+        Le dernier des MAX_RETRIES essais se fait sous le verrou d'écriture et ne peut plus échouer.
+
+        Args:
+            value: La valeur de la clé primaire.
+            change (Callable[[Dict], None]): La modification à appliquer.
+
+        Raises:
+            KeyError: Si aucun élément n'a cette clé.
+            ConflictError: Si le dernier essai échoue quand même (par exemple si `change` modifie
+                la version de l'élément).
+
+        Returns:
+            Dict: L'élément enregistré.
+        """
+        for attempt in range(1, MAX_RETRIES + 1):
+            with self.locked() if attempt == MAX_RETRIES else contextlib.nullcontext():
+                current = self.get(value)
+                if current is None:
+                    raise KeyError(value)
+                item = copy.deepcopy(current)
+                change(item)
+                try:
+                    self.update(item)
+                    return item
+                except ConflictError:
+                    # Jamais None : après le dernier essai, le conflit est transmis à l'appelant
+                    if attempt == MAX_RETRIES:
+                        raise
+
+    def _put(self, item: Dict) -> List[Dict]:
+        """
+        Remplace ou ajoute un élément en mémoire.
+
+        Returns:
+            List[Dict]: Les modifications à enregistrer.
+        """
+        item = self._record(item)
+        value = item.get(self.key)
+        pos = self.index.get(value)
+        records = []
+
+        if pos is None:
+            # L'élément est peut-être déjà dans la liste mais sa clé a été modifiée sur place
+            pos = self.positions.get(id(item))
+            if pos is not None and self.items[pos] is item:
+                old_value = self.keys[pos]
+                del self.index[old_value]
+                records.append({"op": "del", "key": old_value})
+            else:
+                pos = len(self.items)
+                self.items.append(item)
+                self.keys.append(value)
+            self.index[value] = pos
+            self.keys[pos] = value
+        else:
+            del self.positions[id(self.items[pos])]
+            self.items[pos] = item
+
+        self.positions[id(item)] = pos
+        for field, values in self.secondary.items():
+            values[item.get(field)] = value
+
+        records.append({"op": "put", "item": item})
+        return records
+
+    def delete(self, value) -> bool:
+        """
+        Supprime l'élément dont la clé primaire vaut `value`.
+
+        Args:
+            value: La valeur de la clé primaire.
+
+        Returns:
+            bool: True si un élément a été supprimé, False sinon.
+        """
+        with self.locked(), self.lock:
+            self._load()
+            if not self._tombstone(value):
+                return False
+
+            self.log([{"op": "del", "key": value}])
+            return True
+
+    def _tombstone(self, value) -> bool:
+        # Pierre tombale : l'élément reste à sa place jusqu'à la prochaine purge
+        pos = self.index.pop(value, None)
+        if pos is None:
+            return False
+        self.positions.pop(id(self.items[pos]), None)
+        self.deleted.add(pos)
+        return True
+
+    def log(self, records: List[Dict]) -> None:
+        """
+        Enregistre des modifications déjà appliquées à la collection en mémoire.
+
+        En mode journal, les enregistrements sont ajoutés au journal. Sinon les clés
+        concernées sont marquées comme modifiées jusqu'au prochain flush().
+
+        Args:
+            records (List[Dict]): Les modifications ({"op": "put", "item": ...} ou {"op": "del", "key": ...}).
+        """
+        if self.journal is not None:
+            self.journal.append(records)
+            self.compact_if_needed()
+            self.signature = self.stat()
+        else:
+            for record in records:
+                if record["op"] == "del":
+                    self.dirty.add(record["key"])
+                elif record["op"] == "put":
+                    self.dirty.add(record["item"].get(self.key))
+                else:
+                    # La séquence est enregistrée avec le fichier, au prochain flush()
+                    self.dirty.add(None)
+
+    @synchronise
+    def replace(self, data: List[Dict]) -> None:
+        """
+        Remplace toute la collection.
+
+        Args:
+            data (List[Dict]): Les nouveaux éléments.
+        """
+        old_keys = set(self.keys)
+        self.items = self._records(data)
+        self.deleted = set()
+        self.reindex()
+        self.sequence = max(self.sequence, max_id(data))
+        self.dirty.update(old_keys | set(self.keys))
+
+    def compact_if_needed(self) -> None:
+        if self.journal is not None and self.journal.is_full():
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Fusionne le journal dans un nouvel instantané du fichier JSON puis vide le journal.
+
+        L'instantané est écrit avant de vider le journal : en cas d'interruption entre les deux,
+        le journal est simplement rejoué une seconde fois au prochain chargement.
+        Les pierres tombales sont purgées avant l'écriture, et l'instantané de l'autre format
+        (JSON ou binaire) est supprimé après.
+        """
+        if self.deleted:
+            self.purge()
+        self.write(self.items)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.file_name if self.binary else snapshot.snapshot_file(self.file_name))
+        self.write_sequence()
+        if self.journal is not None:
+            self.journal.clear()
+        self.dirty.clear()
+        self.signature = self.stat()
+
+    def flush(self) -> None:
+        """
+        Écrit la collection sur le disque si elle a été modifiée depuis la dernière écriture.
+
+        En mode journal, les mises à jour sont déjà sur le disque : seul un remplacement
+        complet de la collection (replace) nécessite un nouvel instantané.
+        """
+        if self.items is None or not self.dirty:
+            return
+        with self.locked(), self.lock:
+            self.compact()
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        Verrouille la collection en écriture, entre les threads et entre les processus (fichier
+        lock_file), puis lui applique les dernières modifications des autres processus.
+
+        Le verrou est réentrant : seul le premier niveau verrouille le fichier. Il doit être
+        pris avant `lock`, et le moins longtemps possible : les autres processus l'attendent.
+        """
+        with self.write_lock:
+            self.lock_depth += 1
+            try:
+                if self.lock_depth > 1:
+                    yield
+                    return
+                with file_lock(self.lock_file):
+                    with self.lock:
+                        self.refresh()
+                    yield
+            finally:
+                self.lock_depth -= 1
+
+
+@contextlib.contextmanager
+def transaction(*handlers: "FileHandler") -> Iterator[None]:
+    """
+    Verrouille en écriture les collections des handlers (voir Repository.locked) pendant tout
+    le bloc, toujours dans le même ordre. Les éléments lus dans le bloc sont les derniers
+    enregistrés et aucun autre processus ne peut les modifier avant la fin du bloc.
+
+    Args:
+        handlers (FileHandler): Les handlers des collections à verrouiller.
+    """
+    repositories = {handler.repository.lock_file: handler.repository for handler in handlers}
+    with contextlib.ExitStack() as stack:
+        for lock_file in sorted(repositories):
+            stack.enter_context(repositories[lock_file].locked())
+        yield
+
+
+BACKEND = os.environ.get("BIBLIOTHEQUE_BACKEND", "json")
+
+_repositories: Dict[str, Repository] = {}
+
+
+def flush_all() -> None:
+    """
+    Écrit sur le disque toutes les collections modifiées.
+    """
+    for repository in _repositories.values():
+        repository.flush()
+
+
+atexit.register(flush_all)
+
+
+def open_json_repository(
+    name: str, key: str, journal: bool = False, binary: bool = False, record: Optional[type] = None
+) -> Repository:
+    """
+    Renvoie le Repository partagé du fichier database/<name>.json.
+
+    Args:
+        name (str): Le nom de la collection.
+        key (str): La clé primaire de la collection.
+        journal (bool): Si True, les modifications sont écrites dans database/<name>.journal.
+        binary (bool): Si True, l'instantané est enregistré au format binaire (database/<name>.snap).
+        record (type, optional): Le type des enregistrements de la collection (voir records.py).
+
+    Si la collection a été répartie en plusieurs fichiers (voir shards.py), c'est le
+    ShardedRepository du dossier database/<name>/ qui est renvoyé.
+
+    Returns:
+        Repository: Le Repository de la collection.
+    """
+    file_name = f"database/{name}.json"
+    if file_name not in _repositories:
+        # To avoid circular imports
+        from shards import ShardedRepository, read_manifest
+
+        manifest = read_manifest(name)
+        if manifest is not None:
+            _repositories[file_name] = ShardedRepository(name, key, manifest["shards"], journal, binary, record)
+        else:
+            _repositories[file_name] = Repository(
+                file_name, key, Journal(f"database/{name}.journal") if journal else None, binary, record
+            )
+    return _repositories[file_name]
+
+
+def open_repository(
+    name: str, key: str, journal: bool = False, binary: bool = False, record: Optional[type] = None
+) -> Repository:
+    """
+    Renvoie le Repository partagé d'une collection pour le stockage choisi par BACKEND.
+
+    Args:
+        name (str): Le nom de la collection.
+        key (str): La clé primaire de la collection.
+        journal (bool): Utiliser un journal (stockage JSON uniquement).
+        binary (bool): Enregistrer l'instantané au format binaire (stockage JSON uniquement).
+        record (type, optional): Le type des enregistrements de la collection (voir records.py).
+
+    Returns:
+        Repository: Le Repository de la collection.
+    """
+    if BACKEND == "sqlite":
+        # To avoid circular imports
+        from sqlite_backend import SQLiteRepository
+
+        if f"sqlite:{name}" not in _repositories:
+            _repositories[f"sqlite:{name}"] = SQLiteRepository(name, key, record=record)
+        return _repositories[f"sqlite:{name}"]
+
+    return open_json_repository(name, key, journal, binary, record)
+
+
+@metrics.instrumenter("load_data", "save_data", "update_data", "update_many", "modify", "delete")
+class FileHandler:
+    key: Optional[str] = None
+    journal: bool = False
+    # Instantané au format binaire (voir snapshot.py), aussi choisi par BIBLIOTHEQUE_BINAIRE
+    binary: bool = False
+    # Type des éléments de la collection (voir records.py)
+    record: Optional[type] = None
+    # Attributs ayant un index secondaire (voir find)
+    indexes: tuple = ()
+
+    def __init__(self, file_name: str):
+        self.file_name = f"database/{file_name}.json"
+
+        # Tous les handlers d'une même collection partagent le même Repository
+        self.repository = open_repository(
+            file_name, self.key, self.journal, self.binary or file_name in BINARY_COLLECTIONS, self.record
+        )
+        for field in self.indexes:
+            self.repository.add_index(field)
+
+    def load_data(self) -> List[Dict]:
+        """
+        Charge les données à partir d'un fichier JSON (ou de la base SQLite).
+
+        Les données ne sont lues qu'au premier appel, les appels suivants renvoient la liste en mémoire.
+
+        Returns:
+            List[Dict]: Les données chargées.
+        """
+        return self.repository.load()
+
+    def iter_data(self) -> Iterator[Dict]:
+        """
+        Parcourt les données en lecture seule, sans charger la collection si elle ne l'est pas déjà.
+
+        À utiliser pour les parcours complets (affichages, statistiques, exports) : les éléments
+        renvoyés ne doivent pas être modifiés.
+
+        Yields:
+            Dict: Les éléments de la collection.
+        """
+        return self.repository.iter()
+
     def save_data(self, data: List[Dict]) -> None:
         """
         Enregistre les données dans un fichier JSON.
 
         Args:
             data (List[Dict]): Les données à enregistrer.
-            file_name (str): Le nom du fichier où enregistrer les données.
         """
-        try:
-            with open(self.file_name, "w", encoding="utf-8") as file:
-                json.dump(data, file, ensure_ascii=False)
-        except json.JSONDecodeError:
-            # print(f"Error encoding data to JSON at {self.file_name}")
-            pass
+        self.repository.replace(data)
+        self.repository.flush()
+
+    def get(self, value) -> Optional[Dict]:
+        """
+        Renvoie l'élément dont la clé primaire vaut `value`, sans parcourir la collection.
 
-    def update_data(self, item, key):
+        Args:
+            value: La valeur de la clé primaire.
+
+        Returns:
+            Optional[Dict]: L'élément trouvé, ou None.
+        """
+        return self.repository.get(value)
+
+    def find(self, field: str, value) -> Optional[Dict]:
+        """
+        Renvoie l'élément dont l'attribut `field` vaut `value`, sans parcourir la collection.
+
+        Args:
+            field (str): Un attribut de `indexes`.
+            value: La valeur cherchée.
+
+        Returns:
+            Optional[Dict]: L'élément trouvé, ou None.
+        """
+        return self.repository.find(field, value)
+
+    def update_data(self, item, key=None):
         """
         Met à jour un élément dans la base de données.
 
-        Cette méthode charge les données actuelles, trouve l'élément à mettre à jour en utilisant la clé fournie,
-        remplace l'ancien élément par le nouveau, et sauvegarde les données mises à jour dans la base de données.
+        Cette méthode remplace l'ancien élément par le nouveau en utilisant l'index de la clé
+        primaire. En mode journal, la modification est ajoutée au journal, sinon l'élément est
+        marqué comme modifié et l'écriture sur le disque est faite par flush().
 
         Args:
             item (dict): Le nouvel élément qui remplacera l'ancien.
             key (str): La clé utilisée pour trouver l'élément dans la base de données. Elle doit être une clé dans le dictionnaire de l'élément.
+
+        Raises:
+            ConflictError: Si l'élément a été modifié par un autre processus depuis sa lecture (voir modify).
         """
-        items = self.load_data()
+        if key is not None and key != self.repository.key:
+            raise ValueError(f"{self.file_name} est indexé sur '{self.repository.key}', pas sur '{key}'.")
 
-        if not items:
-            items.append(item)
-        else:
-            # Find the item in the database
-            for i, existing_item in enumerate(items):
-                if existing_item[key] == item[key]:
-                    # Update the item
-                    items[i] = item
-                    break
-            else:
-                items.append(item)
+        self.repository.update(item)
 
-        # Save the changes to the database
-        self.save_data(items)
+    def update_many(self, items: List[Dict]) -> None:
+        """
+        Met à jour plusieurs éléments dans la base de données en une seule écriture.
+
+        Args:
+            items (List[Dict]): Les nouveaux éléments.
+        """
+        self.repository.update_many(items)
+
+    def modify(self, value, change: Callable[[Dict], None]) -> Dict:
+        """
+        Modifie un élément sans écraser les modifications faites entre-temps par un autre
+        processus (voir Repository.modify).
+
+        Args:
+            value: La valeur de la clé primaire.
+            change (Callable[[Dict], None]): La modification, appliquée sur place à une copie de l'élément.
+
+        Returns:
+            Dict: L'élément enregistré.
+        """
+        return self.repository.modify(value, change)
+
+    def delete(self, value) -> bool:
+        """
+        Supprime l'élément dont la clé primaire vaut `value`.
+
+        Args:
+            value: La valeur de la clé primaire.
+
+        Returns:
+            bool: True si un élément a été supprimé, False sinon.
+        """
+        return self.repository.delete(value)
+
+    def next_id(self) -> int:
+        """
+        Renvoie un nouvel id, qui n'a jamais été attribué dans cette collection.
+
+        Returns:
+            int: Le nouvel id.
+        """
+        return self.repository.next_ids()[0]
+
+    def next_ids(self, count: int) -> range:
+        """
+        Renvoie `count` nouveaux ids consécutifs (voir next_id).
+
+        Args:
+            count (int): Le nombre d'ids.
+
+        Returns:
+            range: Les nouveaux ids.
+        """
+        return self.repository.next_ids(count)
+
+    def flush(self) -> None:
+        """
+        Écrit les modifications en attente sur le disque.
+        """
+        self.repository.flush()
 
 
 class StudentHandler(FileHandler):
+    key = "id"
+    journal = True
+    record = Student
+    indexes = ("login", "email")
+
     def __init__(self):
         super().__init__("etudiants")
 
@@ -84,6 +1135,11 @@ class StudentHandler(FileHandler):
 
 
 class BookHandler(FileHandler):
+    key = "isbn"
+    journal = True
+    record = Book
+    indexes = ("id",)
+
     def __init__(self):
         super().__init__("books")
 
@@ -92,6 +1148,9 @@ class BookHandler(FileHandler):
 
 
 class AdminHandler(FileHandler):
+    key = "login"
+    record = AdminAccount
+
     def __init__(self):
         super().__init__("admins")
 
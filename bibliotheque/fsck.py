@@ -0,0 +1,370 @@
+"""
+Ce module vérifie la cohérence de la base de données (livres et étudiants) et peut la réparer.
+
+Utilisation (application arrêtée) :
+    python fsck.py             # affiche les problèmes trouvés
+    python fsck.py --reparer   # les affiche puis les corrige
+
+Problèmes recherchés :
+    - livres ayant le même ISBN, ou le même id ;
+    - nombre d'exemplaires (nbr_ex) qui n'est pas un entier positif ;
+    - étudiants ayant le même id, le même login ou le même e-mail ;
+    - emprunts et demandes qui désignent un ISBN absent du catalogue ;
+    - demandes des comptes suspendus (elles réservent un exemplaire sans pouvoir être traitées).
+
+Les livres et les étudiants sont répartis entre les processus d'un groupe : chaque partie d'un
+catalogue partagé (voir shards.py) est vérifiée par un processus, et un fichier non partagé
+(le catalogue en un seul fichier, les étudiants) est découpé en tranches d'un élément sur N.
+Chaque processus lit lui-même les fichiers de ses tranches et renvoie leurs index partiels
+(ISBN, id, login, e-mail, ISBN référencés), qui sont ensuite réunis pour trouver les doublons et
+les références manquantes. Le processus principal ne lit rien lui-même.
+
+Les réparations sont faites en mémoire puis chaque fichier est réécrit une seule fois, de façon
+atomique (fichier temporaire puis renommage). Le login et l'e-mail en double ne sont que signalés.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from files import BookHandler, StudentHandler, max_id
+
+HANDLERS = {"livres": BookHandler, "etudiants": StudentHandler}
+
+# Tranche à vérifier : (collection, numéro de la partie ou None, premier élément, pas)
+Source = Tuple[str, Optional[int], int, int]
+
+# Fichiers lus par ce processus : (collection, numéro de la partie ou None) -> éléments
+_lus: Dict[Tuple[str, Optional[int]], List[Dict]] = {}
+
+
+def _lire(source: Source) -> List[Dict]:
+    """
+    Lit un fichier de la base (une partie du catalogue, ou toute une collection) et renvoie les
+    éléments de la tranche.
+
+    Le fichier reste en mémoire pour les autres tranches du même processus et pour la recherche
+    des références manquantes.
+    """
+    collection, partie, debut, pas = source
+    if (collection, partie) not in _lus:
+        repository = HANDLERS[collection]().repository
+        _lus[collection, partie] = (repository if partie is None else repository.shards[partie]).load()
+    return _lus[collection, partie][debut::pas]
+
+
+def _probleme(collection: str, cle, probleme: str, reparation: str = "") -> Dict:
+    return {"collection": collection, "cle": cle, "probleme": probleme, "reparation": reparation}
+
+
+def nbr_ex_valide(nbr_ex) -> bool:
+    return isinstance(nbr_ex, int) and not isinstance(nbr_ex, bool) and nbr_ex >= 0
+
+
+def _indexer_livres(source: Source) -> Dict:
+    """
+    Lit un fichier de livres, construit ses index partiels et vérifie chaque livre.
+    """
+    livres = _lire(source)
+    isbns, ids, problemes = Counter(), Counter(), []
+    for livre in livres:
+        isbns[livre.get("isbn")] += 1
+        ids[livre.get("id")] += 1
+        if not nbr_ex_valide(livre.get("nbr_ex")):
+            problemes.append(
+                _probleme("livres", livre.get("isbn"), f"nbr_ex invalide : {livre.get('nbr_ex')!r}", "remplacé par 0")
+            )
+    return {"nombre": len(livres), "isbns": isbns, "ids": ids, "problemes": problemes}
+
+
+def _indexer_etudiants(source: Source) -> Dict:
+    """
+    Lit un fichier d'étudiants, construit ses index partiels et vérifie chaque étudiant.
+    """
+    etudiants = _lire(source)
+    ids, logins, emails, references, problemes = Counter(), Counter(), Counter(), set(), []
+    for etudiant in etudiants:
+        ids[etudiant.get("id")] += 1
+        logins[etudiant.get("login")] += 1
+        emails[etudiant.get("email")] += 1
+        for emprunt in etudiant.get("emprunts", []):
+            references.add(emprunt.get("isbn"))
+        for demande in etudiant.get("demandes", []):
+            references.add(demande.get("isbn"))
+        if etudiant.get("suspendu") and etudiant.get("demandes"):
+            problemes.append(
+                _probleme(
+                    "etudiants",
+                    etudiant.get("id"),
+                    f"{len(etudiant['demandes'])} demande(s) d'un compte suspendu",
+                    "demandes supprimées",
+                )
+            )
+    return {
+        "nombre": len(etudiants),
+        "ids": ids,
+        "logins": logins,
+        "emails": emails,
+        "references": references,
+        "problemes": problemes,
+    }
+
+
+def _indexer(source: Source) -> Dict:
+    return _indexer_livres(source) if source[0] == "livres" else _indexer_etudiants(source)
+
+
+def _references_manquantes(source: Source, manquants: frozenset) -> List[Dict]:
+    """
+    Liste les emprunts et les demandes d'un fichier d'étudiants qui désignent un ISBN manquant.
+    """
+    problemes = []
+    for etudiant in _lire(source):
+        for liste in ("emprunts", "demandes"):
+            for element in etudiant.get(liste, []):
+                if element.get("isbn") in manquants:
+                    problemes.append(
+                        _probleme(
+                            "etudiants",
+                            etudiant.get("id"),
+                            f"{liste[:-1]} d'un livre absent du catalogue ({element.get('isbn')})",
+                            f"{liste[:-1]} supprimé" if liste == "emprunts" else "demande supprimée",
+                        )
+                    )
+    return problemes
+
+
+def _sources(tranches: int) -> Tuple[List[Source], List[Source]]:
+    """
+    Renvoie les tranches à vérifier : une par partie du catalogue s'il est partagé, sinon
+    `tranches` tranches du fichier des livres, puis `tranches` tranches de celui des étudiants.
+    """
+    parties = getattr(BookHandler().repository, "shards", None)
+    if parties:
+        livres = [("livres", i, 0, 1) for i in range(len(parties))]
+    else:
+        livres = [("livres", None, i, tranches) for i in range(tranches)]
+    return livres, [("etudiants", None, i, tranches) for i in range(tranches)]
+
+
+def _reunir(parties: List[Dict], champ: str) -> Counter:
+    total = Counter()
+    for partie in parties:
+        total.update(partie[champ])
+    return total
+
+
+def _doublons(compteur: Counter) -> Dict:
+    return {valeur: nombre for valeur, nombre in compteur.items() if nombre > 1}
+
+
+class Verification:
+    """
+    Résultat de la vérification : les problèmes trouvés et ce qu'il faut savoir pour les réparer.
+    """
+
+    def __init__(self):
+        self.livres = 0
+        self.etudiants = 0
+        self.problemes: List[Dict] = []
+        self.isbns_en_double: Dict = {}
+        self.ids_livres_en_double: Dict = {}
+        self.ids_etudiants_en_double: Dict = {}
+        self.isbns_manquants: frozenset = frozenset()
+
+
+def verifier(processus: Optional[int] = None) -> Verification:
+    """
+    Vérifie la cohérence des livres et des étudiants de la base.
+
+    Args:
+        processus (int, optional): Le nombre de processus. Par défaut, le nombre de cœurs ;
+            avec 1, la vérification se fait dans le processus courant.
+
+    Returns:
+        Verification: Les problèmes trouvés.
+    """
+    processus = max(processus or os.cpu_count() or 1, 1)
+    sources_livres, sources_etudiants = _sources(processus)
+    sources = sources_livres + sources_etudiants
+
+    pool = None
+    if processus > 1:
+        pool = multiprocessing.Pool(min(processus, len(sources)))
+
+    try:
+        # Chaque processus lit les fichiers de ses tranches et les indexe
+        if pool is not None:
+            parties = pool.map(_indexer, sources, chunksize=1)
+        else:
+            parties = [_indexer(source) for source in sources]
+        parties_livres, parties_etudiants = parties[:len(sources_livres)], parties[len(sources_livres):]
+
+        verification = Verification()
+        verification.livres = sum(partie["nombre"] for partie in parties_livres)
+        verification.etudiants = sum(partie["nombre"] for partie in parties_etudiants)
+        isbns = _reunir(parties_livres, "isbns")
+        references = set().union(*(partie["references"] for partie in parties_etudiants))
+        verification.isbns_manquants = frozenset(references - isbns.keys())
+
+        # Les références manquantes sont rares : seuls les étudiants concernés sont détaillés
+        if verification.isbns_manquants:
+            appel = [(source, verification.isbns_manquants) for source in sources_etudiants]
+            if pool is not None:
+                parties_manquants = pool.starmap(_references_manquantes, appel)
+            else:
+                parties_manquants = [_references_manquantes(*args) for args in appel]
+        else:
+            parties_manquants = []
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _lus.clear()
+
+    verification.isbns_en_double = _doublons(isbns)
+    verification.ids_livres_en_double = _doublons(_reunir(parties_livres, "ids"))
+    verification.ids_etudiants_en_double = _doublons(_reunir(parties_etudiants, "ids"))
+
+    problemes = verification.problemes
+    for isbn, nombre in verification.isbns_en_double.items():
+        problemes.append(_probleme("livres", isbn, f"ISBN présent {nombre} fois", "seul le dernier livre est gardé"))
+    for id_livre, nombre in verification.ids_livres_en_double.items():
+        problemes.append(_probleme("livres", id_livre, f"id présent {nombre} fois", "nouvel id pour les doublons"))
+    for id_etudiant, nombre in verification.ids_etudiants_en_double.items():
+        problemes.append(_probleme("etudiants", id_etudiant, f"id présent {nombre} fois", "nouvel id pour les doublons"))
+    for champ in ("logins", "emails"):
+        for valeur, nombre in _doublons(_reunir(parties_etudiants, champ)).items():
+            problemes.append(_probleme("etudiants", valeur, f"{champ[:-1]} présent {nombre} fois"))
+
+    for partie in parties_livres + parties_etudiants:
+        problemes.extend(partie["problemes"])
+    for partie in parties_manquants:
+        problemes.extend(partie)
+    return verification
+
+
+def _renumeroter(elements: List[Dict], ids_en_double: Dict, sequence: int) -> None:
+    # La dernière occurrence garde son id (c'est elle que trouve le Repository), les autres en reçoivent un nouveau
+    if not ids_en_double:
+        return
+    prochain = max(sequence, max_id(elements)) + 1
+    restants = dict(ids_en_double)
+    for element in elements:
+        if restants.get(element.get("id"), 0) > 1:
+            restants[element["id"]] -= 1
+            element["id"] = prochain
+            prochain += 1
+
+
+def reparer(
+    livres: List[Dict], etudiants: List[Dict], verification: Verification, sequences: Tuple[int, int] = (0, 0)
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Corrige les problèmes trouvés par verifier.
+
+    Args:
+        livres (List[Dict]): Les livres.
+        etudiants (List[Dict]): Les étudiants.
+        verification (Verification): Le résultat de verifier.
+        sequences (Tuple[int, int], optional): Les derniers ids attribués aux livres et aux
+            étudiants : les nouveaux ids viennent après.
+
+    Returns:
+        Tuple[List[Dict], List[Dict]]: Les livres et les étudiants corrigés.
+    """
+    # Livres en double : le Repository ne voit déjà que la dernière occurrence de chaque ISBN
+    if verification.isbns_en_double:
+        restants = dict(verification.isbns_en_double)
+        gardes = []
+        for livre in livres:
+            if restants.get(livre.get("isbn"), 0) > 1:
+                restants[livre["isbn"]] -= 1
+                continue
+            gardes.append(livre)
+        livres = gardes
+
+    for livre in livres:
+        if not nbr_ex_valide(livre.get("nbr_ex")):
+            livre["nbr_ex"] = 0
+
+    # Les doublons d'ISBN supprimés ont pu faire disparaître des doublons d'id
+    ids_livres = _doublons(Counter(livre.get("id") for livre in livres))
+    _renumeroter(livres, ids_livres, sequences[0])
+    _renumeroter(etudiants, verification.ids_etudiants_en_double, sequences[1])
+
+    manquants = verification.isbns_manquants
+    for etudiant in etudiants:
+        if manquants:
+            etudiant["emprunts"] = [emprunt for emprunt in etudiant.get("emprunts", []) if emprunt.get("isbn") not in manquants]
+            etudiant["demandes"] = [demande for demande in etudiant.get("demandes", []) if demande.get("isbn") not in manquants]
+        if etudiant.get("suspendu") and etudiant.get("demandes"):
+            etudiant["demandes"] = []
+
+    return livres, etudiants
+
+
+def fsck(reparation: bool = False, processus: Optional[int] = None) -> Dict:
+    """
+    Vérifie la base de données et, si demandé, la répare.
+
+    Args:
+        reparation (bool, optional): Si True, corrige les problèmes trouvés. Par défaut False.
+        processus (int, optional): Le nombre de processus (voir verifier).
+
+    Returns:
+        Dict: Les problèmes trouvés, le nombre d'éléments vérifiés et la durée de la vérification
+            (lecture des fichiers comprise).
+    """
+    debut = time.perf_counter()
+    verification = verifier(processus)
+    resultat = {
+        "livres": verification.livres,
+        "etudiants": verification.etudiants,
+        "problemes": verification.problemes,
+        "duree": round(time.perf_counter() - debut, 3),
+        "repare": False,
+    }
+
+    if reparation and verification.problemes:
+        book_handler, student_handler = BookHandler(), StudentHandler()
+        # Copies : les réparations ne touchent pas les collections partagées avant l'écriture
+        livres = [dict(livre) for livre in book_handler.load_data()]
+        etudiants = [dict(etudiant) for etudiant in student_handler.load_data()]
+        sequences = (book_handler.repository.sequence, student_handler.repository.sequence)
+        livres, etudiants = reparer(livres, etudiants, verification, sequences)
+        # Une écriture atomique par fichier, qui remplace aussi le journal
+        for handler, donnees in ((student_handler, etudiants), (book_handler, livres)):
+            handler.save_data(donnees)
+            handler.flush()
+        resultat["repare"] = True
+    return resultat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vérifie la cohérence de la base de données.")
+    parser.add_argument("--reparer", action="store_true", help="corrige les problèmes trouvés")
+    parser.add_argument("--processus", type=int, help="nombre de processus (par défaut, le nombre de cœurs)")
+    args = parser.parse_args()
+
+    resultat = fsck(args.reparer, args.processus)
+
+    for probleme in resultat["problemes"]:
+        ligne = f"{probleme['collection']} {probleme['cle']} : {probleme['probleme']}"
+        if args.reparer and probleme["reparation"]:
+            ligne += f" -> {probleme['reparation']}"
+        print(ligne)
+    print(
+        f"{resultat['livres']} livre(s) et {resultat['etudiants']} étudiant(s) vérifiés en {resultat['duree']} s : "
+        f"{len(resultat['problemes'])} problème(s)" + (", réparés" if resultat["repare"] else "")
+    )
+
+    if resultat["problemes"] and not resultat["repare"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Ce module contient l'historique des emprunts rendus, séparé du catalogue.
+
+Chaque retour ajoute une ligne à database/historique.jsonl (voir Journal) : le fichier n'est
+jamais réécrit. En mémoire, l'historique est rangé par colonnes (une liste ou un tableau par
+attribut, les dates étant stockées sous forme d'entiers) avec un index par ISBN et un index
+par étudiant.
+
+Au premier chargement, les listes "emprunter_par" des livres sont déplacées dans l'historique
+puis retirées du catalogue.
+"""
+
+import datetime
+import os
+import sys
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+from journal import Journal, file_lock
+
+HISTORY_FILE = "database/historique.jsonl"
+
+# Ordre des valeurs dans une ligne du fichier
+COLONNES = ("isbn", "titre", "id_etudiant", "login", "nom", "prenom", "date", "date_rendu")
+
+
+def _ordinal(date: str) -> int:
+    """
+    Convertit une date ISO en entier (0 pour une date absente ou invalide).
+    """
+    try:
+        return datetime.date.fromisoformat(date).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def _date(ordinal: int) -> str:
+    return datetime.date.fromordinal(ordinal).isoformat() if ordinal else ""
+
+
+def _texte(valeur) -> str:
+    # Les mêmes logins, noms et titres reviennent souvent : une seule copie de chaque chaîne
+    return sys.intern(str(valeur or ""))
+
+
+class Historique:
+    """
+    Historique des emprunts, chargé à la première utilisation.
+    """
+
+    def __init__(self, file_name: str = HISTORY_FILE):
+        self.file_name = file_name
+        self.journal: Optional[Journal] = None
+        self.lock = threading.RLock()
+
+        self.isbn: List[str] = []
+        self.titre: List[str] = []
+        self.id_etudiant = array("q")  # -1 si l'étudiant n'est pas connu
+        self.login: List[str] = []
+        self.nom: List[str] = []
+        self.prenom: List[str] = []
+        self.date = array("l")
+        self.date_rendu = array("l")
+
+        # Chaque ISBN reçoit un numéro (son code), pour les calculs sur les colonnes (voir reports.py)
+        self.code_isbn = array("l")
+        self.isbns: List[str] = []  # code -> isbn
+        self.codes: Dict[str, int] = {}  # isbn -> code
+
+        self.par_isbn: Dict[str, List[int]] = {}  # isbn -> numéros de ligne
+        self.par_etudiant: Dict[int, List[int]] = {}  # id de l'étudiant -> numéros de ligne
+
+    def charger(self) -> None:
+        """
+        Lit l'historique sur le disque si ce n'est pas déjà fait, sinon les retours ajoutés
+        depuis par un autre processus. S'il n'existe pas encore, l'historique des livres du
+        catalogue y est d'abord déplacé.
+
+        Les autres méthodes l'appellent avant de prendre self.lock, pour la raison donnée plus bas.
+        """
+        if self.journal is None and not os.path.exists(self.file_name):
+            # Avant self.lock : migrer verrouille les livres, que le service verrouille avant l'historique
+            self.migrer()
+
+        with self.lock:
+            if self.journal is None:
+                self.journal = Journal(self.file_name)
+                self.journal.size = 0
+
+            # Tout le fichier au premier appel, ensuite les lignes ajoutées par d'autres processus
+            for ligne in self.journal.follow():
+                self._ajouter_ligne(ligne)
+
+    @property
+    def lock_file(self) -> str:
+        return f"{os.path.splitext(self.file_name)[0]}.lock"
+
+    def _ajouter_ligne(self, ligne: List) -> None:
+        isbn, titre, id_etudiant, login, nom, prenom, date, date_rendu = ligne
+        numero = len(self.isbn)
+
+        self.isbn.append(_texte(isbn))
+        self.titre.append(_texte(titre))
+        self.id_etudiant.append(-1 if id_etudiant is None else id_etudiant)
+        self.login.append(_texte(login))
+        self.nom.append(_texte(nom))
+        self.prenom.append(_texte(prenom))
+        self.date.append(_ordinal(date))
+        self.date_rendu.append(_ordinal(date_rendu))
+
+        if self.isbn[numero] not in self.codes:
+            self.codes[self.isbn[numero]] = len(self.isbns)
+            self.isbns.append(self.isbn[numero])
+        self.code_isbn.append(self.codes[self.isbn[numero]])
+
+        self.par_isbn.setdefault(self.isbn[numero], []).append(numero)
+        if id_etudiant is not None:
+            self.par_etudiant.setdefault(id_etudiant, []).append(numero)
+
+    def ajouter(self, emprunt: Dict) -> None:
+        """
+        Ajoute un emprunt rendu à l'historique et l'écrit immédiatement sur le disque.
+
+        Args:
+            emprunt (Dict): L'emprunt (isbn, titre, id_etudiant, login, nom, prenom, date, date_rendu).
+        """
+        ligne = [emprunt.get(colonne) for colonne in COLONNES]
+        # Crée l'historique s'il n'existe pas encore, avant de prendre le verrou de fichier (voir migrer)
+        self.charger()
+        # Le verrou de fichier empêche un autre processus d'écrire entre la lecture et l'ajout
+        with self.lock, file_lock(self.lock_file):
+            self.charger()
+            self.journal.append([ligne])
+            self._ajouter_ligne(ligne)
+
+    def _entree(self, numero: int) -> Dict:
+        id_etudiant = self.id_etudiant[numero]
+        return {
+            "isbn": self.isbn[numero],
+            "titre": self.titre[numero],
+            "id_etudiant": None if id_etudiant == -1 else id_etudiant,
+            "login": self.login[numero],
+            "nom": self.nom[numero],
+            "prenom": self.prenom[numero],
+            "date": _date(self.date[numero]),
+            "date_rendu": _date(self.date_rendu[numero]),
+        }
+
+    def livre(self, isbn: str) -> List[Dict]:
+        """
+        Renvoie l'historique d'un livre, du plus ancien au plus récent retour.
+        """
+        self.charger()
+        with self.lock:
+            return [self._entree(numero) for numero in self.par_isbn.get(isbn, [])]
+
+    def etudiant(self, id_etudiant: int) -> List[Dict]:
+        """
+        Renvoie l'historique d'un étudiant, du plus ancien au plus récent retour.
+        """
+        self.charger()
+        with self.lock:
+            return [self._entree(numero) for numero in self.par_etudiant.get(id_etudiant, [])]
+
+    def recents(self) -> Iterator[Dict]:
+        """
+        Parcourt tout l'historique, du plus récent au plus ancien retour.
+
+        Yields:
+            Dict: Les emprunts rendus.
+        """
+        self.charger()
+        with self.lock:
+            total = len(self.isbn)
+        for numero in range(total - 1, -1, -1):
+            yield self._entree(numero)
+
+    def colonnes(self) -> Tuple[List[str], array, array, array]:
+        """
+        Renvoie une copie des colonnes utilisées par les statistiques.
+
+        Returns:
+            Tuple[List[str], array, array, array]: Les ISBN (par code), puis pour chaque ligne
+                le code de l'ISBN, la date d'emprunt et la date de retour (en ordinaux).
+        """
+        self.charger()
+        with self.lock:
+            return list(self.isbns), array("l", self.code_isbn), array("l", self.date), array("l", self.date_rendu)
+
+    def __len__(self) -> int:
+        self.charger()
+        with self.lock:
+            return len(self.isbn)
+
+    def migrer(self) -> None:
+        """
+        Déplace les listes "emprunter_par" des livres dans le fichier de l'historique.
+
+        L'historique est écrit dans un fichier temporaire puis renommé avant de modifier les
+        livres : une interruption ne peut pas faire perdre d'emprunts, au pire les livres
+        gardent une copie inutilisée de leur ancienne liste.
+
+        La migration se fait en tenant le verrou d'écriture des livres puis le verrou de fichier
+        de l'historique (celui de ajouter) : si un autre processus a créé l'historique entre-temps,
+        il n'est pas remplacé, et aucun livre ne peut changer avant d'être enregistré.
+        """
+        # To avoid circular imports
+        from files import BookHandler, StudentHandler, transaction
+
+        book_handler, student_handler = BookHandler(), StudentHandler()
+
+        with transaction(book_handler), file_lock(self.lock_file):
+            if not os.path.exists(self.file_name):
+                self._migrer(book_handler, student_handler)
+
+    def _migrer(self, book_handler: "BookHandler", student_handler: "StudentHandler") -> None:
+        lignes, livres = [], []
+        for livre in book_handler.load_data():
+            if "emprunter_par" not in livre:
+                continue
+            for entree in livre["emprunter_par"]:
+                etudiant = student_handler.find("login", entree.get("login"))
+                lignes.append(
+                    [
+                        livre["isbn"],
+                        livre.get("titre"),
+                        etudiant["id"] if etudiant else None,
+                        entree.get("login"),
+                        entree.get("nom"),
+                        entree.get("prenom"),
+                        entree.get("date"),
+                        entree.get("date_rendu"),
+                    ]
+                )
+            del livre["emprunter_par"]
+            # Un doublon d'ISBN masqué par l'index n'est pas réenregistré à la place du livre
+            if book_handler.get(livre["isbn"]) is livre:
+                livres.append(livre)
+
+        tmp_name = f"{self.file_name}.tmp"
+        with open(tmp_name, "wb"):
+            pass
+        if lignes:
+            Journal(tmp_name).append(lignes)
+        os.replace(tmp_name, self.file_name)
+
+        if livres:
+            # Les livres ont été lus sous le verrou d'écriture : ce sont les derniers enregistrés,
+            # update_many ne peut donc pas lever de ConflictError
+            book_handler.update_many(livres)
@@ -0,0 +1,207 @@
+"""
+Ce module gère le journal des modifications de la base de données.
+
+Chaque modification est ajoutée à la fin d'un fichier JSON-lines au lieu de réécrire
+tout le fichier JSON. Le journal est rejoué au chargement puis fusionné dans un nouvel
+instantané (snapshot) lorsqu'il devient trop gros.
+
+Les processus qui écrivent dans une même collection se coordonnent avec file_lock, un verrou
+consultatif posé sur un fichier à côté de la collection (fcntl, ou msvcrt sous Windows).
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterator, List
+import metrics
+from records import encode
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de fcntl, msvcrt verrouille le premier octet du fichier de verrou
+    fcntl = None
+    import msvcrt
+
+# Taille à partir de laquelle le journal est fusionné dans l'instantané
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+
+def atomic_write(file_name: str, data) -> None:
+    """
+    Écrit des données JSON dans un fichier de manière atomique (voir atomic_write_bytes).
+
+    Args:
+        file_name (str): Le fichier à écrire.
+        data: Les données à écrire.
+    """
+    atomic_write_bytes(file_name, json.dumps(data, ensure_ascii=False, default=encode).encode("utf-8"))
+
+
+def atomic_write_bytes(file_name: str, content: bytes) -> None:
+    """
+    Écrit un contenu dans un fichier de manière atomique.
+
+    Le contenu est d'abord écrit dans un fichier temporaire du même dossier,
+    puis le fichier temporaire remplace l'ancien fichier avec os.replace().
+
+    Args:
+        file_name (str): Le fichier à écrire.
+        content (bytes): Le contenu à écrire.
+    """
+    directory = os.path.dirname(file_name) or "."
+    try:
+        mode = os.stat(file_name).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(file_name)[1])
+    try:
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        if metrics.ACTIF:
+            metrics.octets(ecrits=len(content))
+        os.replace(tmp_name, file_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(file_name: str) -> Iterator[None]:
+    """
+    Verrou exclusif entre processus, posé sur le fichier `file_name` (créé s'il n'existe pas).
+
+    Le verrou est consultatif : il n'attend que les autres processus qui demandent le même
+    verrou. Il est libéré à la sortie du bloc, ou par le système si le processus s'arrête.
+
+    Args:
+        file_name (str): Le fichier de verrou.
+    """
+    fd = os.open(file_name, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK abandonne après 10 secondes d'attente : on attend de nouveau
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    Journal append-only des modifications d'une collection.
+
+    Chaque ligne est un enregistrement JSON de la forme {"op": "put", "item": {...}}
+    ou {"op": "del", "key": ...}.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Relit la taille du journal (après une modification par un autre processus).
+        """
+        try:
+            self.size = os.path.getsize(self.file_name)
+        except OSError:
+            self.size = 0
+
+    def append(self, records: List[Dict]) -> None:
+        """
+        Ajoute des enregistrements à la fin du journal et force leur écriture sur le disque.
+
+        Args:
+            records (List[Dict]): Les enregistrements à ajouter.
+        """
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False, default=encode) + "\n" for record in records
+        ).encode("utf-8")
+
+        with open(self.file_name, "ab") as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.size += len(lines)
+        if metrics.ACTIF:
+            metrics.octets(ecrits=len(lines))
+
+    def replay(self) -> Iterator[Dict]:
+        """
+        Relit les enregistrements du journal dans l'ordre.
+
+        Une dernière ligne incomplète (écriture interrompue) est ignorée.
+
+        Yields:
+            Dict: Les enregistrements du journal.
+        """
+        try:
+            with open(self.file_name, "r", encoding="utf-8") as file:
+                try:
+                    for line in file:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            return
+                finally:
+                    if metrics.ACTIF:
+                        metrics.octets(lus=file.buffer.tell())
+        except FileNotFoundError:
+            return
+
+    def follow(self) -> Iterator[Dict]:
+        """
+        Lit les enregistrements ajoutés depuis la position `size` (par exemple par un autre
+        processus) et avance `size` d'autant. Une dernière ligne incomplète est laissée pour
+        la lecture suivante.
+
+        Yields:
+            Dict: Les nouveaux enregistrements.
+        """
+        try:
+            with open(self.file_name, "rb") as file:
+                file.seek(self.size)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        return
+                    self.size += len(line)
+                    if metrics.ACTIF:
+                        metrics.octets(lus=len(line))
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Ligne abîmée par une écriture interrompue
+                        continue
+        except FileNotFoundError:
+            return
+
+    def clear(self) -> None:
+        """
+        Vide le journal une fois son contenu fusionné dans l'instantané.
+        """
+        with open(self.file_name, "wb") as file:
+            os.fsync(file.fileno())
+        self.size = 0
+
+    def is_full(self) -> bool:
+        return self.size > JOURNAL_MAX_BYTES
@@ -6,7 +6,7 @@ Il gère la boucle principale du programme et dirige l'utilisateur vers les fonc
 
 import utils
 from admin import Admin
-from etudiant import Etudiant
+from etudiant import CompteSupprime, Etudiant
 from utilisateur import Authentification
 
 
@@ -49,10 +49,11 @@ def handle_admin(admin: Admin) -> None:
             "2 - Gérer les livres.",
             "3 - Gérer les emprunts.",
             "4 - Verifier la régle des 7 jours.",
-            "5 - Quitter l'interface d'admin.",
+            "5 - Voir les statistiques d'emprunt.",
+            "6 - Quitter l'interface d'admin.",
             sep="\n",
         )
-        gestion = utils.get_input(5)
+        gestion = utils.get_input(6)
         utils.clear()
 
         # Gérer les comptes
@@ -98,10 +99,28 @@ def handle_admin(admin: Admin) -> None:
 
         # Gérer les emprunts
         elif gestion == 3:
-            admin.gerer_emprunts()
+            while True:
+                print(
+                    "Que souhaitez-vous faire :",
+                    "1 - Traiter la demande d'un étudiant.",
+                    "2 - Voir la file des demandes.",
+                    "3 - Accepter toutes les demandes possibles.",
+                    "4 - Retourner en arriere.",
+                    sep="\n",
+                )
+                choix = utils.get_input(4)
+                utils.clear()
+
+                if choix == 4:
+                    break
+                else:
+                    admin.gerer_emprunts(choix)
         # verifier la regles des 7 jours
         elif gestion == 4:
             admin.regle_7jours()
+        # Statistiques d'emprunt
+        elif gestion == 5:
+            admin.afficher_rapports()
         else:
             utils.message([("Vous n'êtes plus admin!", "error")])
             return
@@ -126,12 +145,17 @@ def handle_etudiant(etudiant: Etudiant) -> None:
             student_choice = utils.get_input(3)
             utils.clear()
 
-            if student_choice == 1:
-                etudiant.choisir_livre()
-            elif student_choice == 2:
-                etudiant.retourner_livre()
-            else:
-                utils.message([("Vous quittez l'interface étudiant.", "error")])
+            try:
+                if student_choice == 1:
+                    etudiant.choisir_livre()
+                elif student_choice == 2:
+                    etudiant.retourner_livre()
+                else:
+                    utils.message([("Vous quittez l'interface étudiant.", "error")])
+                    return
+            except CompteSupprime as erreur:
+                # Le compte a été supprimé pendant la session
+                utils.message([(str(erreur), "error")])
                 return
 
 if __name__ == "__main__":
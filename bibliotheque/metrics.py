@@ -0,0 +1,319 @@
+"""
+Ce module mesure la durée des opérations de la bibliothèque et les octets qu'elles lisent et écrivent.
+
+Les mesures sont désactivées par défaut. Elles s'activent avec la variable d'environnement
+BIBLIOTHEQUE_METRIQUES, qui donne le fichier où elles sont cumulées à la fin de chaque exécution
+("1" pour le fichier par défaut, database/metriques.json) :
+    BIBLIOTHEQUE_METRIQUES=1 python main.py
+
+Le choix est fait une seule fois, quand les fonctions sont décorées : désactivés, les décorateurs
+renvoient la fonction ou la classe telle quelle et les mesures ne coûtent rien.
+
+Pour chaque opération sont gardés le nombre d'appels et d'erreurs, un histogramme des durées
+et les octets lus et écrits sur le disque pendant l'appel (opérations imbriquées comprises).
+Les mesures sont exportées au format texte de Prometheus (route /metrics de server.py) et le
+rapport des opérations les plus lentes s'affiche avec :
+    python metrics.py [-n 10] [--tri p95]
+"""
+
+import argparse
+import atexit
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+METRICS_FILE = "database/metriques.json"
+
+_variable = os.environ.get("BIBLIOTHEQUE_METRIQUES", "")
+ACTIF = bool(_variable) and _variable != "0"
+FICHIER = METRICS_FILE if _variable in ("", "0", "1") else _variable
+
+# Bornes supérieures (en secondes) des tranches de l'histogramme des durées
+TRANCHES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Statistiques:
+    """
+    Mesures cumulées d'une opération.
+    """
+
+    def __init__(self):
+        self.appels = 0
+        self.erreurs = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.tranches = [0] * (len(TRANCHES) + 1)  # la dernière tranche n'a pas de borne
+        self.octets_lus = 0
+        self.octets_ecrits = 0
+
+    def ajouter(self, duree: float, lus: int, ecrits: int, erreur: bool) -> None:
+        self.appels += 1
+        self.erreurs += erreur
+        self.total += duree
+        self.max = max(self.max, duree)
+        self.tranches[bisect.bisect_left(TRANCHES, duree)] += 1
+        self.octets_lus += lus
+        self.octets_ecrits += ecrits
+
+    def fusionner(self, autre: "Statistiques") -> None:
+        self.appels += autre.appels
+        self.erreurs += autre.erreurs
+        self.total += autre.total
+        self.max = max(self.max, autre.max)
+        self.tranches = [a + b for a, b in zip(self.tranches, autre.tranches)]
+        self.octets_lus += autre.octets_lus
+        self.octets_ecrits += autre.octets_ecrits
+
+    def quantile(self, q: float) -> float:
+        """
+        Estime un quantile des durées à partir de l'histogramme (interpolation dans la tranche).
+
+        Args:
+            q (float): Le quantile, entre 0 et 1.
+
+        Returns:
+            float: La durée estimée, en secondes.
+        """
+        rang = q * self.appels
+        cumul = 0
+        for i, nombre in enumerate(self.tranches):
+            if nombre and cumul + nombre >= rang:
+                bas = TRANCHES[i - 1] if i else 0.0
+                haut = TRANCHES[i] if i < len(TRANCHES) else self.max
+                return min(bas + (haut - bas) * (rang - cumul) / nombre, self.max)
+            cumul += nombre
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Statistiques":
+        statistiques = cls()
+        for attribut, valeur in data.items():
+            setattr(statistiques, attribut, valeur)
+        # Un fichier écrit avec d'autres tranches : l'histogramme n'est pas repris
+        if len(statistiques.tranches) != len(TRANCHES) + 1:
+            statistiques.tranches = [0] * len(TRANCHES) + [statistiques.appels]
+        return statistiques
+
+
+_statistiques: Dict[str, Statistiques] = {}
+_verrou = threading.Lock()
+# Pile des opérations en cours dans chaque thread : [octets lus, octets écrits] par opération
+_local = threading.local()
+
+
+def _enregistrer(nom: str, duree: float, lus: int, ecrits: int, erreur: bool) -> None:
+    with _verrou:
+        if nom not in _statistiques:
+            _statistiques[nom] = Statistiques()
+        _statistiques[nom].ajouter(duree, lus, ecrits, erreur)
+
+
+def _mesurer(fonction: Callable, nom: Optional[str]) -> Callable:
+    @functools.wraps(fonction)
+    def wrapper(*args, **kwargs):
+        # Sans nom, une méthode est nommée d'après la classe de l'objet (StudentHandler.load_data, ...)
+        operation = nom or f"{type(args[0]).__name__}.{fonction.__name__}"
+        pile = getattr(_local, "pile", None)
+        if pile is None:
+            pile = _local.pile = []
+        octets = [0, 0]
+        pile.append(octets)
+        erreur = False
+        debut = time.perf_counter()
+        try:
+            return fonction(*args, **kwargs)
+        except BaseException:
+            erreur = True
+            raise
+        finally:
+            duree = time.perf_counter() - debut
+            pile.pop()
+            _enregistrer(operation, duree, octets[0], octets[1], erreur)
+
+    return wrapper
+
+
+def mesure(nom: str) -> Callable:
+    """
+    Décorateur qui mesure chaque appel d'une fonction sous le nom `nom`.
+    """
+    def decorateur(fonction: Callable) -> Callable:
+        return _mesurer(fonction, nom) if ACTIF else fonction
+
+    return decorateur
+
+
+def instrumenter(*methodes: str) -> Callable:
+    """
+    Décorateur de classe qui mesure les méthodes `methodes`, ou toutes les méthodes publiques
+    définies dans la classe si aucune n'est donnée. Chaque mesure est nommée <classe>.<méthode>,
+    d'après la classe de l'objet.
+    """
+    def decorateur(cls: type) -> type:
+        if not ACTIF:
+            return cls
+        for nom in methodes or [nom for nom in vars(cls) if not nom.startswith("_")]:
+            fonction = vars(cls).get(nom)
+            if inspect.isfunction(fonction):
+                setattr(cls, nom, _mesurer(fonction, None))
+        return cls
+
+    return decorateur
+
+
+def octets(lus: int = 0, ecrits: int = 0) -> None:
+    """
+    Ajoute des octets lus ou écrits sur le disque à toutes les opérations en cours du thread.
+    """
+    for compteur in getattr(_local, "pile", ()):
+        compteur[0] += lus
+        compteur[1] += ecrits
+
+
+def statistiques() -> Dict[str, Statistiques]:
+    """
+    Renvoie une copie des mesures de l'exécution en cours.
+    """
+    with _verrou:
+        return {nom: Statistiques.from_dict(stat.to_dict()) for nom, stat in _statistiques.items()}
+
+
+def lire(fichier: str = None) -> Dict[str, Statistiques]:
+    """
+    Lit les mesures cumulées dans le fichier des métriques.
+    """
+    try:
+        with open(fichier or FICHIER, "r", encoding="utf-8") as file:
+            return {nom: Statistiques.from_dict(data) for nom, data in json.load(file).items()}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def enregistrer(fichier: str = None) -> None:
+    """
+    Ajoute les mesures de l'exécution en cours à celles du fichier des métriques, puis les remet à zéro.
+    """
+    # To avoid circular imports
+    from journal import atomic_write
+
+    with _verrou:
+        if not _statistiques:
+            return
+        courantes = dict(_statistiques)
+        _statistiques.clear()
+
+    fichier = fichier or FICHIER
+    cumulees = lire(fichier)
+    for nom, stat in courantes.items():
+        cumulees.setdefault(nom, Statistiques()).fusionner(stat)
+    if os.path.dirname(fichier):
+        os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    atomic_write(fichier, {nom: stat.to_dict() for nom, stat in cumulees.items()})
+
+
+if ACTIF:
+    atexit.register(enregistrer)
+
+
+def prometheus(mesures: Dict[str, Statistiques] = None) -> str:
+    """
+    Renvoie les mesures au format texte de Prometheus.
+
+    Args:
+        mesures (Dict[str, Statistiques], optional): Par défaut, celles de l'exécution en cours.
+
+    Returns:
+        str: Le texte à servir sur /metrics.
+    """
+    mesures = statistiques() if mesures is None else mesures
+    lignes = [
+        "# HELP bibliotheque_operation_duree_secondes Durée des opérations.",
+        "# TYPE bibliotheque_operation_duree_secondes histogram",
+    ]
+    for nom, stat in sorted(mesures.items()):
+        cumul = 0
+        for borne, nombre in zip(list(TRANCHES) + ["+Inf"], stat.tranches):
+            cumul += nombre
+            lignes.append(f'bibliotheque_operation_duree_secondes_bucket{{operation="{nom}",le="{borne}"}} {cumul}')
+        lignes.append(f'bibliotheque_operation_duree_secondes_sum{{operation="{nom}"}} {stat.total}')
+        lignes.append(f'bibliotheque_operation_duree_secondes_count{{operation="{nom}"}} {stat.appels}')
+
+    for metrique, attribut, description in (
+        ("bibliotheque_operation_erreurs_total", "erreurs", "Appels terminés par une exception."),
+        ("bibliotheque_octets_lus_total", "octets_lus", "Octets lus sur le disque."),
+        ("bibliotheque_octets_ecrits_total", "octets_ecrits", "Octets écrits sur le disque."),
+    ):
+        lignes.append(f"# HELP {metrique} {description}")
+        lignes.append(f"# TYPE {metrique} counter")
+        for nom, stat in sorted(mesures.items()):
+            lignes.append(f'{metrique}{{operation="{nom}"}} {getattr(stat, attribut)}')
+    return "\n".join(lignes) + "\n"
+
+
+# Critères de tri du rapport : durée (en secondes) associée à une opération
+TRIS = {
+    "p95": lambda stat: stat.quantile(0.95),
+    "moyenne": lambda stat: stat.total / stat.appels if stat.appels else 0.0,
+    "max": lambda stat: stat.max,
+    "total": lambda stat: stat.total,
+}
+
+
+def top(mesures: Dict[str, Statistiques], n: int = 10, tri: str = "p95") -> List[Dict]:
+    """
+    Renvoie les opérations les plus lentes.
+
+    Args:
+        mesures (Dict[str, Statistiques]): Les mesures.
+        n (int, optional): Le nombre d'opérations. Par défaut 10.
+        tri (str, optional): Le critère de tri (voir TRIS). Par défaut "p95".
+
+    Returns:
+        List[Dict]: Une ligne par opération, de la plus lente à la plus rapide.
+    """
+    lentes = sorted(mesures.items(), key=lambda element: TRIS[tri](element[1]), reverse=True)[:n]
+    return [
+        {
+            "operation": nom,
+            "appels": stat.appels,
+            "erreurs": stat.erreurs,
+            "moyenne (ms)": round(TRIS["moyenne"](stat) * 1000, 3),
+            "p95 (ms)": round(stat.quantile(0.95) * 1000, 3),
+            "max (ms)": round(stat.max * 1000, 3),
+            "total (s)": round(stat.total, 3),
+            "lus (Ko)": round(stat.octets_lus / 1024, 1),
+            "écrits (Ko)": round(stat.octets_ecrits / 1024, 1),
+        }
+        for nom, stat in lentes
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Affiche les opérations les plus lentes.")
+    parser.add_argument("--fichier", default=FICHIER, help=f"fichier des métriques (par défaut {FICHIER})")
+    parser.add_argument("-n", type=int, default=10, help="nombre d'opérations affichées")
+    parser.add_argument("--tri", choices=tuple(TRIS), default="p95", help="critère de tri")
+    args = parser.parse_args()
+
+    lignes = top(lire(args.fichier), args.n, args.tri)
+    if not lignes:
+        print(f"Aucune mesure dans {args.fichier} (activez-les avec BIBLIOTHEQUE_METRIQUES=1).")
+        return
+
+    colonnes = list(lignes[0])
+    largeurs = [max(len(colonne), *(len(str(ligne[colonne])) for ligne in lignes)) for colonne in colonnes]
+    print("  ".join(colonne.ljust(largeur) for colonne, largeur in zip(colonnes, largeurs)))
+    for ligne in lignes:
+        print("  ".join(str(ligne[colonne]).ljust(largeur) for colonne, largeur in zip(colonnes, largeurs)))
+
+
+if __name__ == "__main__":
+    main()
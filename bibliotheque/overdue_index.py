@@ -0,0 +1,92 @@
+"""
+Ce module contient l'index des emprunts en cours, trié par date d'emprunt.
+
+Les dates sont au format ISO (AAAA-MM-JJ) : leur ordre alphabétique est aussi leur ordre
+chronologique, il n'est donc pas nécessaire de les convertir pour les comparer. Trouver les
+emprunts de plus de 7 jours revient à une recherche dichotomique dans la liste triée.
+"""
+
+import bisect
+import datetime
+from typing import Dict, List, Tuple
+
+# Nombre de jours pendant lesquels un livre peut être emprunté
+DUREE_EMPRUNT = 7
+
+
+def date_limite(aujourdhui: datetime.date = None) -> str:
+    """
+    Renvoie la date ISO avant laquelle un emprunt est en retard.
+
+    Args:
+        aujourdhui (datetime.date, optional): La date du jour. Par défaut datetime.date.today().
+
+    Returns:
+        str: La date limite au format ISO.
+    """
+    aujourdhui = aujourdhui or datetime.date.today()
+    return (aujourdhui - datetime.timedelta(days=DUREE_EMPRUNT)).isoformat()
+
+
+class OverdueIndex:
+    """
+    Liste triée des emprunts en cours : (date, id de l'étudiant, isbn).
+    """
+
+    def __init__(self):
+        self.emprunts: List[Tuple[str, int, str]] = []
+
+    @classmethod
+    def construire(cls, etudiants: List[Dict]) -> "OverdueIndex":
+        """
+        Construit l'index à partir des emprunts des étudiants.
+
+        Args:
+            etudiants (List[Dict]): Les étudiants.
+
+        Returns:
+            OverdueIndex: L'index construit.
+        """
+        index = cls()
+        index.emprunts = sorted(
+            (emprunt["date"], etudiant["id"], emprunt["isbn"])
+            for etudiant in etudiants
+            for emprunt in etudiant["emprunts"]
+        )
+        return index
+
+    def ajouter(self, id_etudiant: int, emprunt: Dict) -> None:
+        """
+        Ajoute un emprunt à l'index.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            emprunt (Dict): L'emprunt (avec "date" et "isbn").
+        """
+        bisect.insort(self.emprunts, (emprunt["date"], id_etudiant, emprunt["isbn"]))
+
+    def retirer(self, id_etudiant: int, emprunt: Dict) -> None:
+        """
+        Retire un emprunt de l'index.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            emprunt (Dict): L'emprunt (avec "date" et "isbn").
+        """
+        entree = (emprunt["date"], id_etudiant, emprunt["isbn"])
+        i = bisect.bisect_left(self.emprunts, entree)
+        if i < len(self.emprunts) and self.emprunts[i] == entree:
+            del self.emprunts[i]
+
+    def en_retard(self, limite: str = None) -> List[Tuple[str, int, str]]:
+        """
+        Renvoie les emprunts faits avant la date limite, du plus ancien au plus récent.
+
+        Args:
+            limite (str, optional): La date limite ISO. Par défaut date_limite().
+
+        Returns:
+            List[Tuple[str, int, str]]: Les emprunts en retard (date, id de l'étudiant, isbn).
+        """
+        limite = limite or date_limite()
+        return self.emprunts[: bisect.bisect_left(self.emprunts, (limite,))]
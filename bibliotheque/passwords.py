@@ -0,0 +1,145 @@
+"""
+Ce module gère le hachage et la vérification des mots de passe.
+
+Les mots de passe sont enregistrés sous la forme "pbkdf2_sha256$<itérations>$<sel>$<empreinte>"
+(sel et empreinte en base64). Le nombre d'itérations se règle avec la variable d'environnement
+BIBLIOTHEQUE_KDF_ITERATIONS ; les empreintes calculées avec un autre coût restent valides et
+sont recalculées à la connexion suivante (voir doit_rehacher).
+
+Les anciens mots de passe en clair sont encore acceptés, pour pouvoir les remplacer par une
+empreinte à la première connexion.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+
+ALGORITHME = "pbkdf2_sha256"
+
+# Coût du hachage : nombre d'itérations de PBKDF2
+ITERATIONS = int(os.environ.get("BIBLIOTHEQUE_KDF_ITERATIONS", 600_000))
+
+# Nombre de vérifications réussies gardées en mémoire pendant la session
+TAILLE_CACHE = 256
+
+# Clé de la session : le cache ne contient jamais les mots de passe eux-mêmes
+_cle_session = os.urandom(32)
+_cache: "OrderedDict[tuple, bool]" = OrderedDict()
+_verrou_cache = threading.Lock()
+
+
+def _pbkdf2(mdp: str, sel: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", mdp.encode("utf-8"), sel, iterations)
+
+
+def _cle_cache(mdp: str, stocke: str) -> tuple:
+    return stocke, hmac.new(_cle_session, mdp.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _memoriser(cle: tuple) -> None:
+    with _verrou_cache:
+        _cache[cle] = True
+        if len(_cache) > TAILLE_CACHE:
+            _cache.popitem(last=False)
+
+
+def hacher(mdp: str, iterations: int = None) -> str:
+    """
+    Calcule l'empreinte salée d'un mot de passe. L'empreinte est aussi ajoutée au cache des
+    vérifications : la connexion qui vient de la calculer n'a pas à la vérifier de nouveau.
+
+    Args:
+        mdp (str): Le mot de passe.
+        iterations (int, optional): Le nombre d'itérations. Par défaut ITERATIONS.
+
+    Returns:
+        str: L'empreinte à enregistrer.
+    """
+    iterations = iterations or ITERATIONS
+    sel = os.urandom(16)
+    empreinte = _pbkdf2(mdp, sel, iterations)
+    stocke = "$".join(
+        (
+            ALGORITHME,
+            str(iterations),
+            base64.b64encode(sel).decode("ascii"),
+            base64.b64encode(empreinte).decode("ascii"),
+        )
+    )
+    _memoriser(_cle_cache(mdp, stocke))
+    return stocke
+
+
+def _decoder(stocke: str):
+    """
+    Renvoie (itérations, sel, empreinte) d'un mot de passe haché, ou None s'il est en clair.
+    """
+    parties = str(stocke).split("$")
+    if len(parties) != 4 or parties[0] != ALGORITHME:
+        return None
+    try:
+        return int(parties[1]), base64.b64decode(parties[2]), base64.b64decode(parties[3])
+    except ValueError:
+        return None
+
+
+def est_hache(stocke: str) -> bool:
+    return _decoder(stocke) is not None
+
+
+def doit_rehacher(stocke: str) -> bool:
+    """
+    Indique si un mot de passe enregistré doit être haché de nouveau : s'il est en clair ou
+    si son nombre d'itérations n'est plus celui de ITERATIONS.
+    """
+    decode = _decoder(stocke)
+    return decode is None or decode[0] != ITERATIONS
+
+
+def verifier(mdp: str, stocke: str) -> bool:
+    """
+    Vérifie un mot de passe en temps constant.
+
+    Les vérifications réussies sont gardées en mémoire pendant la session pour ne pas
+    recalculer l'empreinte à chaque connexion ; les échecs sont toujours recalculés.
+
+    Args:
+        mdp (str): Le mot de passe saisi.
+        stocke (str): Le mot de passe enregistré (empreinte ou ancien mot de passe en clair).
+
+    Returns:
+        bool: True si le mot de passe est correct.
+    """
+    if not isinstance(stocke, str):
+        return False
+
+    cle = _cle_cache(mdp, stocke)
+    with _verrou_cache:
+        if cle in _cache:
+            _cache.move_to_end(cle)
+            return True
+
+    decode = _decoder(stocke)
+    if decode is None:
+        correct = hmac.compare_digest(mdp.encode("utf-8"), stocke.encode("utf-8"))
+    else:
+        iterations, sel, empreinte = decode
+        correct = hmac.compare_digest(_pbkdf2(mdp, sel, iterations), empreinte)
+
+    if correct:
+        _memoriser(cle)
+    return correct
+
+
+def verifier_factice(mdp: str) -> None:
+    """
+    Calcule une empreinte pour rien quand aucun étudiant n'a ce login, afin qu'un login inconnu
+    prenne autant de temps qu'un mauvais mot de passe.
+
+    Args:
+        mdp (str): Le mot de passe saisi.
+    """
+    hmac.compare_digest(_pbkdf2(mdp, bytes(16), ITERATIONS), bytes(32))
@@ -0,0 +1,255 @@
+"""
+Ce module définit les enregistrements de la bibliothèque : Book, Student, Loan (un emprunt),
+BorrowRequest (une demande d'emprunt) et AdminAccount.
+
+Un enregistrement range ses attributs dans des __slots__ au lieu d'un dictionnaire : avec un
+million de livres, c'est l'essentiel de la mémoire de la collection. Il se comporte pourtant
+comme le dictionnaire du fichier JSON (livre["titre"], livre.get("annee"), "isbn" in livre,
+livre.items(), livre.update(...), ...) : le reste du code n'a pas à savoir ce qu'il manipule.
+Un attribut absent du fichier reste absent (KeyError, comme pour un dictionnaire), et les
+attributs que le schéma ne prévoit pas sont gardés à part, dans un dictionnaire créé seulement
+s'il y en a.
+
+Les chaînes très répétées (auteur, éditeur, année, ...) sont internées : tous les livres d'un
+même éditeur partagent la même chaîne. to_dict redonne le schéma du disque, et encode permet
+d'écrire directement des enregistrements avec json.dumps.
+
+Cette économie se paie au chargement : chaque élément lu dans le JSON est converti par from_dict.
+Mesuré sur 400 000 livres en 16 parties, la collection se charge en 2,9 s environ au lieu de
+1,7 s avec les dictionnaires, mais occupe 216 Mo au lieu de 323 Mo. Le chargement n'a lieu
+qu'une fois par processus, alors que la mémoire limite la taille du catalogue que l'on peut
+garder chargé : c'est elle que l'on privilégie.
+"""
+
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, Optional
+
+# Valeur d'un attribut absent (None est une valeur possible)
+_ABSENT = object()
+
+
+class Record(MutableMapping):
+    """
+    Enregistrement à attributs fixes (FIELDS) qui se manipule comme un dictionnaire.
+
+    Les sous-classes définissent FIELDS (dans l'ordre du fichier JSON) et `__slots__ = FIELDS`,
+    INTERNED (attributs dont les chaînes sont internées) et NESTED (attribut -> type des
+    enregistrements de la liste, comme les emprunts d'un étudiant).
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: tuple = ()
+    INTERNED: frozenset = frozenset()
+    NESTED: Dict[str, type] = {}
+    _fields: frozenset = frozenset()
+    # Attribut simple (pas une liste imbriquée) -> True si ses chaînes sont internées
+    _plain: Dict[str, bool] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = frozenset(cls.FIELDS)
+        cls._plain = {key: key in cls.INTERNED for key in cls.FIELDS if key not in cls.NESTED}
+
+    def __init__(self, data: Optional[Mapping] = None, **fields):
+        self._extra = None
+        for source in (data or {}, fields):
+            for key, value in source.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Record":
+        """
+        Crée l'enregistrement d'un élément lu sur le disque (les listes imbriquées sont converties).
+
+        Comme __setitem__, sans passer par lui pour les attributs simples : c'est le chemin de
+        chaque élément chargé.
+        """
+        record = cls.__new__(cls)
+        record._extra = None
+        plain = cls._plain
+        for key, value in data.items():
+            interned = plain.get(key)
+            if interned is None:
+                record[key] = value
+            else:
+                if interned and type(value) is str:
+                    value = sys.intern(value)
+                setattr(record, key, value)
+        return record
+
+    @classmethod
+    def coerce(cls, value):
+        # Un dictionnaire devient un enregistrement, le reste est gardé tel quel
+        if isinstance(value, Mapping) and not isinstance(value, cls):
+            return cls.from_dict(value)
+        return value
+
+    def to_dict(self) -> Dict:
+        """
+        Renvoie l'élément tel qu'il est écrit sur le disque (dictionnaires et listes).
+        """
+        data = self._dict()
+        for key in self.NESTED:
+            if type(data.get(key)) is list:
+                data[key] = [elem.to_dict() if isinstance(elem, Record) else elem for elem in data[key]]
+        return data
+
+    def _dict(self) -> Dict:
+        # Les attributs présents, sans convertir les listes imbriquées
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key, _ABSENT)
+            if value is not _ABSENT:
+                data[key] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    # Plus rapides que les vues de Mapping, qui repassent par __getitem__ pour chaque attribut.
+    # Comme celles d'un dictionnaire copié, ces vues ne suivent pas les modifications suivantes.
+    def keys(self):
+        return self._dict().keys()
+
+    def values(self):
+        return self._dict().values()
+
+    def items(self):
+        return self._dict().items()
+
+    def copy(self) -> "Record":
+        """
+        Copie superficielle, comme dict.copy (les listes sont partagées).
+        """
+        record = type(self).__new__(type(self))
+        record._extra = dict(self._extra) if self._extra else None
+        for key in self.FIELDS:
+            value = getattr(self, key, _ABSENT)
+            if value is not _ABSENT:
+                setattr(record, key, value)
+        return record
+
+    def __reduce__(self):
+        # Pickle et deepcopy passent par le schéma du disque
+        return _rebuild, (type(self), self.to_dict())
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Plus rapide que Mapping.get (sans KeyError) : les index appellent get sur chaque élément
+        if key in self._fields:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value) -> None:
+        if key in self._fields:
+            if key in self.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            elif key in self.NESTED and type(value) is list:
+                nested = self.NESTED[key]
+                if not all(isinstance(elem, nested) for elem in value):
+                    value = [nested.coerce(elem) for elem in value]
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key) -> None:
+        if key in self._fields:
+            try:
+                delattr(self, key)
+                return
+            except AttributeError:
+                pass
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+            return
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._fields:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator:
+        return iter(self._dict())
+
+    def __len__(self) -> int:
+        return len(self._dict())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _rebuild(cls: type, data: Dict) -> Record:
+    # Sans appeler cls.__init__ : une sous-classe (Etudiant, Admin) peut avoir un autre constructeur
+    return cls.from_dict(data)
+
+
+class Loan(Record):
+    FIELDS = ("titre", "isbn", "date")
+    __slots__ = FIELDS
+    INTERNED = frozenset(("titre", "isbn", "date"))
+
+    @classmethod
+    def from_request(cls, demande: Mapping, date: str) -> "Loan":
+        """
+        Crée l'emprunt d'une demande acceptée : les attributs de la demande, daté du jour `date`.
+        """
+        loan = cls.from_dict({key: value for key, value in demande.items() if key != "date_demande"})
+        loan["date"] = date
+        return loan
+
+
+class BorrowRequest(Record):
+    FIELDS = ("titre", "isbn", "date_demande")
+    __slots__ = FIELDS
+    INTERNED = frozenset(("titre", "isbn"))
+
+
+class Book(Record):
+    FIELDS = ("id", "titre", "auteur", "editeur", "isbn", "nbr_ex", "annee", "_version")
+    __slots__ = FIELDS
+    INTERNED = frozenset(("auteur", "editeur", "annee"))
+
+
+class Student(Record):
+    FIELDS = ("id", "nom", "prenom", "login", "mdp", "email", "suspendu", "emprunts", "demandes", "_version")
+    __slots__ = FIELDS
+    INTERNED = frozenset(("nom", "prenom"))
+    NESTED = {"emprunts": Loan, "demandes": BorrowRequest}
+
+
+class AdminAccount(Record):
+    FIELDS = ("id", "nom", "prenom", "login", "mdp", "_version")
+    __slots__ = FIELDS
+
+
+def encode(obj) -> Dict:
+    """
+    Fonction `default` de json.dumps : un enregistrement est écrit comme un dictionnaire.
+
+    Raises:
+        TypeError: Si l'objet n'est pas un enregistrement.
+    """
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def plain(items: list) -> list:
+    """
+    Renvoie les éléments sous forme de dictionnaires (pour les formats qui ne passent pas par encode).
+    """
+    return [item.to_dict() if isinstance(item, Record) else item for item in items]
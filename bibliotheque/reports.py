@@ -0,0 +1,327 @@
+"""
+Ce module calcule les statistiques d'emprunt de la bibliothèque avec NumPy.
+
+Les emprunts rendus (historique.jsonl, écrit par retourner_livre) et les emprunts en cours (écrits
+par accepter_demande dans les étudiants) sont réunis dans quelques tableaux NumPy : le code de
+l'ISBN, la date d'emprunt et la date de retour de chaque emprunt. Toutes les statistiques sont
+ensuite des opérations sur ces tableaux (bincount, histogram, ...), sans boucle sur les emprunts.
+"""
+
+import datetime
+from typing import Dict, List
+import numpy as np
+from overdue_index import DUREE_EMPRUNT
+
+# Ordinal du 1er janvier 1970, pour convertir les ordinaux en datetime64
+EPOQUE = datetime.date(1970, 1, 1).toordinal()
+
+# Bornes (en jours) des tranches de durée d'emprunt
+TRANCHES_DUREE = (0, 2, 4, 8, 15, 31, 61)
+
+MOIS = ("janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre")
+
+
+def _tableau(colonne) -> np.ndarray:
+    """
+    Convertit une colonne array("l") en tableau NumPy d'entiers 64 bits.
+    """
+    return np.frombuffer(colonne, dtype=f"i{colonne.itemsize}").astype(np.int64)
+
+
+class Prets:
+    """
+    Tous les emprunts, rendus ou en cours, rangés en colonnes NumPy.
+
+    Attributes:
+        isbns (List[str]): Les ISBN, dans l'ordre de leur code.
+        isbn (np.ndarray): Le code de l'ISBN de chaque emprunt.
+        debut (np.ndarray): La date d'emprunt (ordinal).
+        fin (np.ndarray): La date de retour (ordinal), ou 0 si l'emprunt est en cours.
+    """
+
+    def __init__(self, isbns: List[str], isbn: np.ndarray, debut: np.ndarray, fin: np.ndarray):
+        self.isbns = isbns
+        self.isbn = isbn
+        self.debut = debut
+        self.fin = fin
+
+    @classmethod
+    def construire(cls, historique, etudiants: List[Dict]) -> "Prets":
+        """
+        Réunit l'historique des emprunts rendus et les emprunts en cours des étudiants.
+
+        Args:
+            historique (Historique): L'historique des emprunts rendus.
+            etudiants (List[Dict]): Les étudiants.
+
+        Returns:
+            Prets: Les emprunts.
+        """
+        isbns, code_isbn, date, date_rendu = historique.colonnes()
+        codes = {isbn: code for code, isbn in enumerate(isbns)}
+
+        # Les emprunts en cours sont peu nombreux (3 au plus par étudiant)
+        en_cours_isbn, en_cours_debut = [], []
+        for etudiant in etudiants:
+            for emprunt in etudiant["emprunts"]:
+                if emprunt["isbn"] not in codes:
+                    codes[emprunt["isbn"]] = len(isbns)
+                    isbns.append(emprunt["isbn"])
+                en_cours_isbn.append(codes[emprunt["isbn"]])
+                try:
+                    en_cours_debut.append(datetime.date.fromisoformat(emprunt["date"]).toordinal())
+                except (KeyError, TypeError, ValueError):
+                    # Date absente ou invalide : ordinal 0, comme dans l'historique (ignoré plus bas)
+                    en_cours_debut.append(0)
+
+        prets = cls(
+            isbns,
+            np.concatenate([_tableau(code_isbn), np.array(en_cours_isbn, dtype=np.int64)]),
+            np.concatenate([_tableau(date), np.array(en_cours_debut, dtype=np.int64)]),
+            np.concatenate([_tableau(date_rendu), np.zeros(len(en_cours_debut), dtype=np.int64)]),
+        )
+
+        # Les emprunts sans date d'emprunt connue ou valide ne peuvent pas être comptés
+        valides = prets.debut > 0
+        if not valides.all():
+            prets.isbn, prets.debut, prets.fin = prets.isbn[valides], prets.debut[valides], prets.fin[valides]
+        return prets
+
+    def __len__(self) -> int:
+        return len(self.isbn)
+
+    def fin_effective(self, aujourdhui: int) -> np.ndarray:
+        """
+        Renvoie la date de fin de chaque emprunt, aujourd'hui pour les emprunts en cours.
+        """
+        return np.where(self.fin > 0, self.fin, aujourdhui)
+
+
+def _mois(ordinaux: np.ndarray) -> np.ndarray:
+    """
+    Convertit des ordinaux en mois NumPy (datetime64[M]).
+    """
+    return (ordinaux - EPOQUE).astype("datetime64[D]").astype("datetime64[M]")
+
+
+def plus_empruntes(prets: Prets, livres: Dict[str, Dict], n: int = 10) -> List[Dict]:
+    """
+    Les titres les plus empruntés.
+
+    Args:
+        prets (Prets): Les emprunts.
+        livres (Dict[str, Dict]): Les livres du catalogue, par ISBN.
+        n (int, optional): Le nombre de titres. Par défaut 10.
+
+    Returns:
+        List[Dict]: Les titres et leur nombre d'emprunts.
+    """
+    comptes = np.bincount(prets.isbn, minlength=len(prets.isbns))
+    meilleurs = np.argsort(-comptes, kind="stable")[:n]
+    return [
+        {
+            "titre": livres.get(prets.isbns[code], {}).get("titre", prets.isbns[code]),
+            "isbn": prets.isbns[code],
+            "emprunts": int(comptes[code]),
+        }
+        for code in meilleurs
+        if comptes[code]
+    ]
+
+
+def auteurs_plus_empruntes(prets: Prets, livres: Dict[str, Dict], n: int = 10) -> List[Dict]:
+    """
+    Les auteurs les plus empruntés.
+
+    Args:
+        prets (Prets): Les emprunts.
+        livres (Dict[str, Dict]): Les livres du catalogue, par ISBN.
+        n (int, optional): Le nombre d'auteurs. Par défaut 10.
+
+    Returns:
+        List[Dict]: Les auteurs et leur nombre d'emprunts.
+    """
+    # Code de l'auteur de chaque ISBN (une boucle par livre, pas par emprunt)
+    auteurs: Dict[str, int] = {}
+    auteur_de = np.array(
+        [auteurs.setdefault(livres.get(isbn, {}).get("auteur") or "-", len(auteurs)) for isbn in prets.isbns],
+        dtype=np.int64,
+    )
+    if not len(prets) or not len(auteurs):
+        return []
+
+    comptes = np.bincount(auteur_de[prets.isbn], minlength=len(auteurs))
+    noms = list(auteurs)
+    meilleurs = np.argsort(-comptes, kind="stable")[:n]
+    return [{"auteur": noms[code], "emprunts": int(comptes[code])} for code in meilleurs if comptes[code]]
+
+
+def durees(prets: Prets) -> List[Dict]:
+    """
+    La répartition des durées des emprunts rendus.
+
+    Args:
+        prets (Prets): Les emprunts.
+
+    Returns:
+        List[Dict]: Le nombre d'emprunts et leur part dans chaque tranche de durée.
+    """
+    rendus = prets.fin > 0
+    duree = prets.fin[rendus] - prets.debut[rendus]
+    if not len(duree):
+        return []
+
+    bornes = np.array(TRANCHES_DUREE + (max(int(duree.max()) + 1, TRANCHES_DUREE[-1] + 1),))
+    comptes, _ = np.histogram(duree, bins=bornes)
+    lignes = [
+        {
+            "durée (jours)": f"{debut}-{fin - 1}" if i < len(comptes) - 1 else f"{debut} et plus",
+            "emprunts": int(compte),
+            "part": f"{compte / len(duree):.1%}",
+        }
+        for i, (debut, fin, compte) in enumerate(zip(bornes[:-1], bornes[1:], comptes))
+    ]
+    lignes.append(
+        {
+            "durée (jours)": "moyenne / médiane / 90e centile",
+            "emprunts": len(duree),
+            "part": f"{duree.mean():.1f} / {np.median(duree):.0f} / {np.percentile(duree, 90):.0f}",
+        }
+    )
+    return lignes
+
+
+def retards_par_cohorte(prets: Prets, aujourdhui: int) -> List[Dict]:
+    """
+    Le taux de retard des emprunts, par mois d'emprunt.
+
+    Un emprunt est en retard s'il a été (ou est encore) gardé plus de DUREE_EMPRUNT jours.
+
+    Args:
+        prets (Prets): Les emprunts.
+        aujourdhui (int): La date du jour (ordinal).
+
+    Returns:
+        List[Dict]: Pour chaque mois, le nombre d'emprunts, de retards et le taux de retard.
+    """
+    if not len(prets):
+        return []
+
+    mois = _mois(prets.debut)
+    premier = mois.min()
+    cohorte = (mois - premier).astype(np.int64)
+    en_retard = (prets.fin_effective(aujourdhui) - prets.debut) > DUREE_EMPRUNT
+
+    totaux = np.bincount(cohorte)
+    retards = np.bincount(cohorte, weights=en_retard, minlength=len(totaux))
+    return [
+        {
+            "cohorte": str(premier + i),
+            "emprunts": int(total),
+            "retards": int(retards[i]),
+            "taux": f"{retards[i] / total:.1%}",
+        }
+        for i, total in enumerate(totaux)
+        if total
+    ]
+
+
+def utilisation(prets: Prets, livres: Dict[str, Dict], exemplaires: Dict[str, int], aujourdhui: int, jours: int = 365, n: int = 20) -> List[Dict]:
+    """
+    Le taux d'utilisation des exemplaires de chaque livre sur une période.
+
+    Le taux est le nombre de jours d'emprunt pendant la période, divisé par le nombre
+    d'exemplaires multiplié par la durée de la période.
+
+    Args:
+        prets (Prets): Les emprunts.
+        livres (Dict[str, Dict]): Les livres du catalogue, par ISBN.
+        exemplaires (Dict[str, int]): Le nombre total d'exemplaires (en rayon et empruntés) par ISBN.
+        aujourdhui (int): La date du jour (ordinal).
+        jours (int, optional): La durée de la période, jusqu'à aujourd'hui. Par défaut 365.
+        n (int, optional): Le nombre de livres renvoyés (les plus utilisés). Par défaut 20.
+
+    Returns:
+        List[Dict]: Les livres les plus utilisés et leur taux d'utilisation.
+    """
+    if not len(prets):
+        return []
+
+    debut_periode = aujourdhui - jours
+    debut = np.maximum(prets.debut, debut_periode)
+    fin = np.minimum(prets.fin_effective(aujourdhui), aujourdhui)
+    jours_empruntes = np.bincount(prets.isbn, weights=np.clip(fin - debut, 0, None), minlength=len(prets.isbns))
+
+    nb_exemplaires = np.array([max(exemplaires.get(isbn, 0), 1) for isbn in prets.isbns])
+    taux = jours_empruntes / (nb_exemplaires * jours)
+
+    meilleurs = np.argsort(-taux, kind="stable")[:n]
+    return [
+        {
+            "titre": livres.get(prets.isbns[code], {}).get("titre", prets.isbns[code]),
+            "isbn": prets.isbns[code],
+            "exemplaires": int(nb_exemplaires[code]),
+            "jours d'emprunt": int(jours_empruntes[code]),
+            "utilisation": f"{taux[code]:.1%}",
+        }
+        for code in meilleurs
+        if jours_empruntes[code]
+    ]
+
+
+def saisonnalite(prets: Prets) -> List[Dict]:
+    """
+    La demande selon le mois de l'année : nombre d'emprunts commencés chaque mois, en moyenne par an.
+
+    Args:
+        prets (Prets): Les emprunts.
+
+    Returns:
+        List[Dict]: Pour chaque mois, le nombre total et moyen d'emprunts.
+    """
+    if not len(prets):
+        return []
+
+    mois = _mois(prets.debut).astype(np.int64)  # mois depuis janvier 1970
+    comptes = np.bincount(mois % 12, minlength=12)
+    # Nombre d'années où chaque mois apparaît dans la période couverte
+    annees = np.bincount(np.arange(mois.min(), mois.max() + 1) % 12, minlength=12)
+    return [
+        {
+            "mois": MOIS[i],
+            "emprunts": int(comptes[i]),
+            "moyenne par an": f"{comptes[i] / annees[i]:.1f}" if annees[i] else "-",
+        }
+        for i in range(12)
+    ]
+
+
+def rapport(historique, etudiants: List[Dict], livres: List[Dict], exemplaires: Dict[str, int] = None, aujourdhui: datetime.date = None) -> Dict[str, List[Dict]]:
+    """
+    Calcule toutes les statistiques d'emprunt.
+
+    Args:
+        historique (Historique): L'historique des emprunts rendus.
+        etudiants (List[Dict]): Les étudiants (pour les emprunts en cours).
+        livres (List[Dict]): Les livres du catalogue.
+        exemplaires (Dict[str, int], optional): Le nombre total d'exemplaires par ISBN.
+            Par défaut, les exemplaires en rayon (nbr_ex) de chaque livre.
+        aujourdhui (datetime.date, optional): La date du jour. Par défaut datetime.date.today().
+
+    Returns:
+        Dict[str, List[Dict]]: Chaque statistique, sous forme de lignes de tableau.
+    """
+    aujourdhui = (aujourdhui or datetime.date.today()).toordinal()
+    par_isbn = {livre["isbn"]: livre for livre in livres}
+    if exemplaires is None:
+        exemplaires = {isbn: livre["nbr_ex"] for isbn, livre in par_isbn.items()}
+
+    prets = Prets.construire(historique, etudiants)
+    return {
+        "Titres les plus empruntés": plus_empruntes(prets, par_isbn),
+        "Auteurs les plus empruntés": auteurs_plus_empruntes(prets, par_isbn),
+        "Durée des emprunts": durees(prets),
+        "Retards par mois d'emprunt": retards_par_cohorte(prets, aujourdhui),
+        "Utilisation des exemplaires (12 derniers mois)": utilisation(prets, par_isbn, exemplaires, aujourdhui),
+        "Demande selon le mois": saisonnalite(prets),
+    }
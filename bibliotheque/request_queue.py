@@ -0,0 +1,86 @@
+"""
+Ce module contient la file des demandes d'emprunt en attente, tous étudiants confondus.
+
+Chaque demande porte la date et l'heure à laquelle elle a été faite ("date_demande", au format
+ISO). Comme pour l'index des retards, la file est une liste triée de tuples : les demandes sont
+donc traitées dans l'ordre où elles ont été faites. Les anciennes demandes, sans date, passent
+en premier.
+"""
+
+import bisect
+import datetime
+from typing import Dict, List, Tuple
+
+
+def maintenant() -> str:
+    """
+    Renvoie la date et l'heure actuelles au format ISO, à la microseconde près.
+    """
+    return datetime.datetime.now().isoformat(timespec="microseconds")
+
+
+class FileDemandes:
+    """
+    Liste triée des demandes en attente : (date de la demande, id de l'étudiant, isbn).
+    """
+
+    def __init__(self):
+        self.demandes: List[Tuple[str, int, str]] = []
+
+    @staticmethod
+    def _entree(id_etudiant: int, demande: Dict) -> Tuple[str, int, str]:
+        return demande.get("date_demande", ""), id_etudiant, demande["isbn"]
+
+    @classmethod
+    def construire(cls, etudiants: List[Dict]) -> "FileDemandes":
+        """
+        Construit la file à partir des demandes des étudiants.
+
+        Args:
+            etudiants (List[Dict]): Les étudiants.
+
+        Returns:
+            FileDemandes: La file construite.
+        """
+        file = cls()
+        file.demandes = sorted(
+            cls._entree(etudiant["id"], demande)
+            for etudiant in etudiants
+            for demande in etudiant["demandes"]
+        )
+        return file
+
+    def ajouter(self, id_etudiant: int, demande: Dict) -> None:
+        """
+        Ajoute une demande à la file.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            demande (Dict): La demande (avec "isbn" et "date_demande").
+        """
+        bisect.insort(self.demandes, self._entree(id_etudiant, demande))
+
+    def retirer(self, id_etudiant: int, demande: Dict) -> None:
+        """
+        Retire une demande de la file.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            demande (Dict): La demande (avec "isbn" et "date_demande").
+        """
+        entree = self._entree(id_etudiant, demande)
+        i = bisect.bisect_left(self.demandes, entree)
+        if i < len(self.demandes) and self.demandes[i] == entree:
+            del self.demandes[i]
+
+    def en_attente(self) -> List[Tuple[str, int, str]]:
+        """
+        Renvoie les demandes en attente, de la plus ancienne à la plus récente.
+
+        Returns:
+            List[Tuple[str, int, str]]: Les demandes (date de la demande, id de l'étudiant, isbn).
+        """
+        return list(self.demandes)
+
+    def __len__(self) -> int:
+        return len(self.demandes)
@@ -0,0 +1,213 @@
+"""
+Ce module contient l'index de recherche du catalogue.
+
+L'index associe chaque mot des titres, auteurs et éditeurs aux ISBN des livres qui le contiennent
+(index inversé), sans tenir compte des accents ni des majuscules. Les ISBN sont aussi rangés dans
+un arbre de préfixes (trie) pour pouvoir chercher un livre à partir du début de son ISBN.
+"""
+
+import bisect
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Set
+
+CHAMPS_INDEXES = ("titre", "auteur", "editeur")
+
+
+def normaliser(texte: str) -> str:
+    """
+    Met un texte en minuscules et retire ses accents ("Étranger" -> "etranger").
+
+    Args:
+        texte (str): Le texte à normaliser.
+
+    Returns:
+        str: Le texte normalisé.
+    """
+    decompose = unicodedata.normalize("NFKD", str(texte))
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def decouper(texte: str) -> List[str]:
+    """
+    Découpe un texte en mots normalisés.
+
+    Args:
+        texte (str): Le texte à découper.
+
+    Returns:
+        List[str]: Les mots du texte.
+    """
+    return re.findall(r"[^\W_]+", normaliser(texte))
+
+
+def est_isbn(requete: str) -> bool:
+    """
+    Indique si une requête ressemble à un (début d')ISBN : chiffres, tirets et X final.
+    """
+    return bool(re.fullmatch(r"[\d\- ]+[xX]?", requete.strip()))
+
+
+class IsbnTrie:
+    """
+    Arbre de préfixes des ISBN. Chaque noeud est un dictionnaire caractère -> noeud,
+    la clé "" d'un noeud contient l'ISBN complet qui s'y termine.
+    """
+
+    def __init__(self):
+        self.racine: Dict = {}
+
+    def ajouter(self, isbn: str) -> None:
+        noeud = self.racine
+        for c in isbn:
+            noeud = noeud.setdefault(c, {})
+        noeud[""] = isbn
+
+    def retirer(self, isbn: str) -> None:
+        chemin = [self.racine]
+        for c in isbn:
+            if c not in chemin[-1]:
+                return
+            chemin.append(chemin[-1][c])
+        chemin[-1].pop("", None)
+
+        # Supprime les noeuds devenus vides
+        for i in range(len(isbn), 0, -1):
+            if chemin[i]:
+                break
+            del chemin[i - 1][isbn[i - 1]]
+
+    def prefixe(self, prefixe: str) -> Iterable[str]:
+        """
+        Parcourt les ISBN commençant par `prefixe`, dans l'ordre lexicographique.
+
+        Args:
+            prefixe (str): Le début de l'ISBN.
+
+        Yields:
+            str: Les ISBN trouvés.
+        """
+        noeud = self.racine
+        for c in prefixe:
+            if c not in noeud:
+                return
+            noeud = noeud[c]
+
+        pile = [noeud]
+        while pile:
+            noeud = pile.pop()
+            if "" in noeud:
+                yield noeud[""]
+            pile.extend(noeud[c] for c in sorted(noeud, reverse=True) if c)
+
+
+class CatalogueIndex:
+    """
+    Index de recherche du catalogue (index inversé des mots et trie des ISBN).
+    """
+
+    def __init__(self):
+        self.mots: Dict[str, Set[str]] = {}  # mot -> ISBN des livres qui le contiennent
+        self.vocabulaire: List[str] = []  # mots triés, pour la recherche par préfixe
+        self.isbn = IsbnTrie()
+
+    @classmethod
+    def construire(cls, livres: List[Dict]) -> "CatalogueIndex":
+        """
+        Construit l'index à partir de la liste des livres.
+
+        Args:
+            livres (List[Dict]): Les livres du catalogue.
+
+        Returns:
+            CatalogueIndex: L'index construit.
+        """
+        index = cls()
+        for livre in livres:
+            for mot in index._mots_du_livre(livre):
+                index.mots.setdefault(mot, set()).add(livre["isbn"])
+            index.isbn.ajouter(livre["isbn"])
+        index.vocabulaire = sorted(index.mots)
+        return index
+
+    @staticmethod
+    def _mots_du_livre(livre: Dict) -> Set[str]:
+        return {mot for champ in CHAMPS_INDEXES for mot in decouper(livre.get(champ) or "")}
+
+    def ajouter(self, livre: Dict) -> None:
+        """
+        Ajoute un livre à l'index.
+
+        Args:
+            livre (Dict): Le livre à ajouter.
+        """
+        for mot in self._mots_du_livre(livre):
+            if mot not in self.mots:
+                self.mots[mot] = set()
+                bisect.insort(self.vocabulaire, mot)
+            self.mots[mot].add(livre["isbn"])
+        self.isbn.ajouter(livre["isbn"])
+
+    def retirer(self, livre: Dict) -> None:
+        """
+        Retire un livre de l'index. Doit être appelé avant de modifier le livre.
+
+        Args:
+            livre (Dict): Le livre à retirer.
+        """
+        for mot in self._mots_du_livre(livre):
+            isbns = self.mots.get(mot)
+            if isbns is None:
+                continue
+            isbns.discard(livre["isbn"])
+            if not isbns:
+                del self.mots[mot]
+                del self.vocabulaire[bisect.bisect_left(self.vocabulaire, mot)]
+        self.isbn.retirer(livre["isbn"])
+
+    def _commencant_par(self, prefixe: str, parmi: Set[str] = None) -> Set[str]:
+        """
+        Renvoie les ISBN des livres contenant un mot qui commence par `prefixe`.
+
+        Args:
+            prefixe (str): Le début du mot.
+            parmi (Set[str], optional): Si donné, limite le résultat à ces ISBN.
+        """
+        resultat = set()
+        i = bisect.bisect_left(self.vocabulaire, prefixe)
+        while i < len(self.vocabulaire) and self.vocabulaire[i].startswith(prefixe):
+            isbns = self.mots[self.vocabulaire[i]]
+            resultat |= isbns if parmi is None else parmi & isbns
+            i += 1
+        return resultat
+
+    def rechercher(self, requete: str) -> Set[str]:
+        """
+        Cherche les livres correspondant à une requête.
+
+        Si la requête ressemble à un ISBN, renvoie les livres dont l'ISBN commence par la requête.
+        Sinon, renvoie les livres qui contiennent tous les mots de la requête ; le dernier mot
+        peut être incomplet ("petit pri" trouve "Le Petit Prince").
+
+        Args:
+            requete (str): La requête.
+
+        Returns:
+            Set[str]: Les ISBN des livres trouvés.
+        """
+        if est_isbn(requete):
+            return set(self.isbn.prefixe(re.sub(r"[\- ]", "", requete.strip()).upper()))
+
+        mots = decouper(requete)
+        if not mots:
+            return set()
+
+        # Commence par les mots les plus rares pour réduire l'intersection au plus vite
+        complets = sorted((self.mots.get(mot, set()) for mot in mots[:-1]), key=len)
+        resultat = None
+        for isbns in complets:
+            resultat = set(isbns) if resultat is None else resultat & isbns
+            if not resultat:
+                return set()
+
+        return self._commencant_par(mots[-1], resultat)
@@ -0,0 +1,273 @@
+"""
+Ce module lance un serveur HTTP local qui expose le service de la bibliothèque en JSON.
+
+Chaque requête est traitée dans son propre thread ; les opérations qui modifient la base se font
+l'une après l'autre, dans une transaction de BibliothequeService.
+
+Utilisation :
+    python server.py [--port 8000]
+
+Routes :
+    GET  /livres?q=<recherche>&page=1&par_page=10&disponibles=1
+    GET  /livres/<isbn>       (avec les exemplaires disponibles, réservés et empruntés)
+    GET  /livres/id/<id>
+    POST /demandes            {"id_etudiant": 1, "isbn": "..."}      (admin ou l'étudiant)
+    POST /demandes/accepter   {"id_etudiant": 1, "num_demande": 1}   (admin)
+    POST /demandes/refuser    {"id_etudiant": 1, "num_demande": 1}   (admin)
+    POST /retours             {"id_etudiant": 1, "num_emprunt": 1}   (admin)
+    GET  /retards                                                    (admin)
+    GET  /metrics             (mesures au format Prometheus, si BIBLIOTHEQUE_METRIQUES est défini)
+
+Les routes marquées (admin) demandent le login et le mot de passe d'un administrateur, en
+authentification HTTP Basic :
+    curl -u <login>:<mot de passe> -d '{"id_etudiant": 1, "num_demande": 1}' http://127.0.0.1:8000/demandes/accepter
+
+Une demande d'emprunt peut aussi être faite par l'étudiant lui-même, avec son propre login et
+mot de passe : elle est refusée (403) si id_etudiant n'est pas le sien.
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from files import AdminHandler, ConflictError
+import metrics
+import passwords
+from records import encode
+from snapshot import SnapshotError
+from service import (
+    BibliothequeService,
+    BibliothequeErreur,
+    DemandeIntrouvable,
+    EmpruntIntrouvable,
+    EtudiantIntrouvable,
+    LivreIntrouvable,
+)
+
+# Attributs des livres renvoyés par l'API (l'historique des emprunts n'est pas exposé)
+CHAMPS_LIVRE = ("id", "titre", "auteur", "editeur", "isbn", "nbr_ex", "annee")
+
+# Routes réservées aux administrateurs
+ROUTES_ADMIN = ("/demandes/accepter", "/demandes/refuser", "/retours", "/retards")
+# Routes ouvertes aussi à un étudiant, pour son propre compte (id_etudiant du corps)
+ROUTES_ETUDIANT = ("/demandes",)
+
+service = BibliothequeService()
+admin_handler = AdminHandler()
+
+
+def resume_livre(livre: dict) -> dict:
+    return {champ: livre.get(champ) for champ in CHAMPS_LIVRE}
+
+
+class AccesRefuse(Exception):
+    pass
+
+
+def authentifier(entete: str) -> Optional[Tuple[str, dict]]:
+    """
+    Vérifie l'en-tête Authorization d'une requête (HTTP Basic, login et mot de passe d'un
+    administrateur ou d'un étudiant), comme la connexion de la console.
+
+    Args:
+        entete (str): La valeur de l'en-tête, ou None s'il est absent.
+
+    Returns:
+        Optional[Tuple[str, dict]]: ("admin", administrateur) ou ("etudiant", étudiant), ou None
+            si l'en-tête est absent ou invalide, ou si le login ou le mot de passe est incorrect.
+    """
+    schema, _, valeur = (entete or "").partition(" ")
+    if schema.lower() != "basic":
+        return None
+    try:
+        login, separateur, mdp = base64.b64decode(valeur, validate=True).decode("utf-8").partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    if not separateur:
+        return None
+
+    # Les admins sont indexés sur leur login
+    admin = admin_handler.get(login)
+    if admin is not None and passwords.verifier(mdp, admin["mdp"]):
+        return "admin", admin
+
+    etudiant = service.student_handler.find("login", login)
+    if etudiant is None:
+        if admin is None:
+            # Login inconnu : le temps de réponse est le même qu'avec un mauvais mot de passe
+            passwords.verifier_factice(mdp)
+        return None
+    if passwords.verifier(mdp, etudiant["mdp"]):
+        return "etudiant", etudiant
+    return None
+
+
+def id_etudiant(compte: Tuple[str, dict], corps: dict) -> int:
+    """
+    Renvoie l'id_etudiant du corps d'une requête, s'il est permis au compte authentifié.
+
+    Raises:
+        AccesRefuse: Si le compte est celui d'un autre étudiant.
+    """
+    role, utilisateur = compte
+    if role == "etudiant" and corps["id_etudiant"] != utilisateur["id"]:
+        raise AccesRefuse("Un étudiant ne peut faire une demande que pour son propre compte.")
+    return corps["id_etudiant"]
+
+
+class BibliothequeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def repondre(self, statut: int, contenu, type_contenu: str = "application/json", entetes: dict = None) -> None:
+        # Les octets sont envoyés tels quels, le reste est converti en JSON
+        corps = contenu if isinstance(contenu, bytes) else json.dumps(contenu, ensure_ascii=False, default=encode).encode("utf-8")
+        self.send_response(statut)
+        self.send_header("Content-Type", f"{type_contenu}; charset=utf-8")
+        for nom, valeur in (entetes or {}).items():
+            self.send_header(nom, valeur)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def lire_corps(self) -> dict:
+        longueur = self.headers.get("Content-Length") or "0"
+        if not longueur.isdecimal():
+            # Le corps n'est pas lu : la connexion est fermée après la réponse
+            self.close_connection = True
+            raise ValueError(f"Content-Length invalide : {longueur!r}")
+        return json.loads(self.rfile.read(int(longueur)) or b"{}")
+
+    def exiger_compte(self, chemin: str) -> Optional[Tuple[str, dict]]:
+        """
+        Authentifie la requête si la route le demande, ou envoie une réponse 401 ou 403.
+
+        Returns:
+            Optional[Tuple[str, dict]]: Le compte authentifié (voir authentifier), ("public", {})
+                pour une route ouverte à tous, ou None si une réponse 401 ou 403 a été envoyée.
+        """
+        if chemin not in ROUTES_ADMIN and chemin not in ROUTES_ETUDIANT:
+            return "public", {}
+        compte = authentifier(self.headers.get("Authorization"))
+        if compte is not None and (compte[0] == "admin" or chemin in ROUTES_ETUDIANT):
+            return compte
+
+        # Le corps n'est pas lu : la connexion est fermée après la réponse
+        self.close_connection = True
+        if compte is not None:
+            self.repondre(403, {"erreur": "Route réservée aux administrateurs."})
+        else:
+            self.repondre(
+                401,
+                {"erreur": "Authentification requise."},
+                entetes={"WWW-Authenticate": 'Basic realm="bibliotheque"'},
+            )
+        return None
+
+    def traiter(self, action) -> None:
+        """
+        Exécute une action du service et convertit son résultat ou son erreur en réponse JSON.
+        """
+        try:
+            self.repondre(200, action())
+        except AccesRefuse as erreur:
+            self.repondre(403, {"erreur": str(erreur)})
+        except (LivreIntrouvable, EtudiantIntrouvable, DemandeIntrouvable, EmpruntIntrouvable) as erreur:
+            self.repondre(404, {"erreur": str(erreur)})
+        except BibliothequeErreur as erreur:
+            self.repondre(409, {"erreur": str(erreur)})
+        except ConflictError as erreur:
+            # Modifié par un autre processus malgré les nouveaux essais : le client peut réessayer
+            self.repondre(409, {"erreur": str(erreur)})
+        except SnapshotError:
+            # Avant ValueError : un instantané abîmé n'est pas une erreur du client
+            self.erreur_interne()
+        except (KeyError, TypeError, ValueError) as erreur:
+            self.repondre(400, {"erreur": f"Requête invalide : {erreur}"})
+        except Exception:
+            # Verrou, journal, disque, ... : le client reçoit quand même une réponse
+            self.erreur_interne()
+
+    def erreur_interne(self) -> None:
+        # Appelée dans un bloc except : la trace de l'exception en cours va sur la sortie d'erreur
+        traceback.print_exc()
+        self.repondre(500, {"erreur": "Erreur interne du serveur."})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if self.exiger_compte(url.path) is None:
+            return
+
+        if url.path == "/livres":
+            def rechercher():
+                livres, total = service.rechercher(
+                    params.get("q", ""),
+                    int(params.get("page", 1)),
+                    int(params.get("par_page", 10)),
+                    params.get("disponibles") == "1",
+                )
+                return {"total": total, "livres": [resume_livre(livre) for livre in livres]}
+
+            self.traiter(rechercher)
+        elif url.path.startswith("/livres/id/"):
+            id_livre = url.path[len("/livres/id/"):]
+            self.traiter(lambda: resume_livre(service.livre_par_id(int(id_livre))))
+        elif url.path.startswith("/livres/"):
+            isbn = url.path[len("/livres/"):]
+            self.traiter(lambda: {**resume_livre(service.livre(isbn)), **service.disponibilite(isbn)})
+        elif url.path == "/retards":
+            self.traiter(service.regle_7jours)
+        elif url.path == "/metrics" and metrics.ACTIF:
+            self.repondre(200, metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self.repondre(404, {"erreur": "Route inconnue."})
+
+    def do_POST(self):
+        routes = {
+            "/demandes": lambda corps: service.demander_emprunt(id_etudiant(compte, corps), corps["isbn"]),
+            "/demandes/accepter": lambda corps: service.accepter_demande(corps["id_etudiant"], corps["num_demande"]),
+            "/demandes/refuser": lambda corps: service.refuser_demande(corps["id_etudiant"], corps["num_demande"]),
+            "/retours": lambda corps: service.retourner_livre(corps["id_etudiant"], corps["num_emprunt"]),
+        }
+
+        chemin = urlparse(self.path).path
+        route = routes.get(chemin)
+        if route is None:
+            self.repondre(404, {"erreur": "Route inconnue."})
+            return
+        compte = self.exiger_compte(chemin)
+        if compte is None:
+            return
+
+        self.traiter(lambda: route(self.lire_corps()))
+
+    def log_message(self, format, *args):
+        # Pas de ligne de log par requête
+        pass
+
+
+class BibliothequeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serveur HTTP local de la bibliothèque.")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    # Le serveur n'écoute que sur la machine locale
+    with BibliothequeServer(("127.0.0.1", args.port), BibliothequeHandler) as server:
+        print(f"Serveur de la bibliothèque sur http://127.0.0.1:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,725 @@
+"""
+Ce module définit le service de la bibliothèque : toutes les opérations sur les livres, les étudiants
+et les emprunts, sans aucune entrée ni affichage dans la console.
+
+Les méthodes prennent des arguments simples, renvoient les enregistrements modifiés et lèvent une
+BibliothequeErreur en cas de problème. Les classes Bibliotheque, Admin et Etudiant ne font que
+demander les informations à l'utilisateur puis appeler ce service ; il peut aussi être utilisé
+directement depuis un script.
+
+Le service peut être appelé depuis plusieurs threads (voir server.py) et plusieurs processus peuvent
+utiliser la même base : chaque opération qui la modifie se fait dans une transaction sur les livres
+et les étudiants (voir files.transaction), qui la verrouille entre les threads et entre les
+processus. Elle part ainsi de la dernière version des données, et les écritures se font l'une après
+l'autre. Les lectures ne prennent pas ce verrou ; les index en mémoire sont protégés par verrou_index,
+pris après la transaction.
+"""
+
+import datetime
+import heapq
+import threading
+from typing import Iterable
+from availability import Disponibilites
+from files import BookHandler, StudentHandler, transaction
+from history import Historique
+import metrics
+from overdue_index import OverdueIndex, date_limite
+from records import Book, BorrowRequest, Loan
+from request_queue import FileDemandes, maintenant
+from search_index import CatalogueIndex, normaliser
+
+# Nombre maximum d'emprunts en cours par étudiant
+MAX_EMPRUNTS = 3
+
+
+class BibliothequeErreur(Exception):
+    """
+    Erreur levée par une opération du service. Le message est destiné à l'utilisateur.
+    """
+
+
+class LivreIntrouvable(BibliothequeErreur):
+    pass
+
+
+class LivreIndisponible(BibliothequeErreur):
+    pass
+
+
+class EtudiantIntrouvable(BibliothequeErreur):
+    pass
+
+
+class CompteSuspendu(BibliothequeErreur):
+    pass
+
+
+class DemandeIntrouvable(BibliothequeErreur):
+    pass
+
+
+class EmpruntIntrouvable(BibliothequeErreur):
+    pass
+
+
+class LimiteEmprunts(BibliothequeErreur):
+    pass
+
+
+class RegleSeptJours(BibliothequeErreur):
+    pass
+
+
+class AttributInvalide(BibliothequeErreur):
+    pass
+
+
+@metrics.instrumenter()
+class BibliothequeService:
+    # Protège les index en mémoire (catalogue et emprunts en cours)
+    verrou_index = threading.RLock()
+    book_handler = BookHandler()
+    student_handler = StudentHandler()
+    # Historique des emprunts rendus, chargé à la première consultation
+    historique = Historique()
+    # Index de recherche, construit à la première recherche (voir la propriété index)
+    _index: CatalogueIndex | None = None
+    # Index des emprunts en cours, construit au premier appel de regle_7jours
+    retards: OverdueIndex | None = None
+    # File des demandes en attente, construite à la première utilisation (voir file_demandes)
+    _file_demandes: FileDemandes | None = None
+    # Exemplaires réservés et empruntés par livre, construits à la première utilisation (voir disponibilites)
+    _disponibilites: Disponibilites | None = None
+
+    @classmethod
+    def invalider_catalogue(cls) -> None:
+        """
+        Oublie l'index de recherche, construit à partir d'une version périmée du catalogue.
+        """
+        cls._index = None
+
+    @classmethod
+    def invalider_etudiants(cls) -> None:
+        """
+        Oublie les index construits à partir d'une version périmée des étudiants.
+        """
+        cls.retards = None
+        cls._file_demandes = None
+        cls._disponibilites = None
+
+    def _ecriture(self):
+        """
+        Transaction sur les livres et les étudiants, à prendre avant verrou_index.
+        """
+        return transaction(self.book_handler, self.student_handler)
+
+    @property
+    def livres(self) -> list[Book]:
+        """
+        La liste des livres, chargée à la première utilisation.
+        """
+        return self.book_handler.load_data()
+
+    @property
+    def file_demandes(self) -> FileDemandes:
+        """
+        La file des demandes en attente de tous les étudiants, construite à la première utilisation.
+        """
+        with self.verrou_index:
+            # Relit les étudiants s'ils ont été modifiés par un autre processus (voir invalider_etudiants)
+            etudiants = self.student_handler.load_data()
+            if BibliothequeService._file_demandes is None:
+                BibliothequeService._file_demandes = FileDemandes.construire(etudiants)
+            return BibliothequeService._file_demandes
+
+    @property
+    def disponibilites(self) -> Disponibilites:
+        """
+        Les compteurs d'exemplaires réservés et empruntés, construits à la première utilisation.
+        À utiliser en tenant verrou_index.
+        """
+        with self.verrou_index:
+            etudiants = self.student_handler.load_data()
+            if BibliothequeService._disponibilites is None:
+                BibliothequeService._disponibilites = Disponibilites.construire(etudiants)
+            return BibliothequeService._disponibilites
+
+    @property
+    def index(self) -> CatalogueIndex:
+        """
+        L'index de recherche du catalogue, construit à la première utilisation.
+        """
+        with self.verrou_index:
+            # Relit le catalogue s'il a été modifié par un autre processus (voir invalider_catalogue)
+            livres = self.livres
+            if BibliothequeService._index is None:
+                BibliothequeService._index = CatalogueIndex.construire(livres)
+            return BibliothequeService._index
+
+    # ----- Livres -----
+
+    def livre(self, isbn: str) -> dict:
+        """
+        Renvoie le livre qui a l'ISBN donné.
+
+        Raises:
+            LivreIntrouvable: Si aucun livre n'a cet ISBN.
+        """
+        livre = self.book_handler.get(isbn)
+        if livre is None:
+            raise LivreIntrouvable(f"Aucun livre trouvé avec l'ISBN: {isbn}.")
+        return livre
+
+    def livre_par_id(self, id_livre: int) -> dict:
+        """
+        Renvoie le livre qui a l'id donné (à l'aide de l'index des ids).
+
+        Raises:
+            LivreIntrouvable: Si aucun livre n'a cet id.
+        """
+        livre = self.book_handler.find("id", id_livre)
+        if livre is None:
+            raise LivreIntrouvable(f"Aucun livre trouvé avec l'id: {id_livre}.")
+        return livre
+
+    def est_disponible(self, livre: dict) -> bool:
+        """
+        Indique s'il reste un exemplaire du livre qui n'est ni emprunté ni réservé.
+        """
+        with self.verrou_index:
+            return self.disponibilites.disponibles(livre) > 0
+
+    def disponibilite(self, isbn: str) -> dict:
+        """
+        Renvoie la répartition des exemplaires d'un livre.
+
+        Returns:
+            dict: Les exemplaires disponibles, réservés et empruntés.
+        """
+        livre = self.livre(isbn)
+        with self.verrou_index:
+            return self.disponibilites.etat(livre)
+
+    def rechercher(self, requete: str, page: int = 1, par_page: int = 10, disponibles: bool = False) -> tuple[list[dict], int]:
+        """
+        Recherche des livres par titre, auteur, éditeur ou début d'ISBN.
+
+        Args:
+            requete (str): Les mots recherchés, ou le début d'un ISBN.
+            page (int, optional): Le numéro de la page de résultats. Par défaut 1.
+            par_page (int, optional): Le nombre de livres par page. Par défaut 10.
+            disponibles (bool, optional): Si True, seuls les livres ayant un exemplaire disponible sont renvoyés.
+
+        Returns:
+            tuple[list[dict], int]: Les livres de la page, triés par titre, et le nombre total de livres trouvés.
+        """
+        with self.verrou_index:
+            isbns = self.index.rechercher(requete)
+
+        livres = []
+        for isbn in isbns:
+            livre = self.book_handler.get(isbn)
+            if livre is not None and (not disponibles or self.est_disponible(livre)):
+                livres.append(livre)
+
+        # Seuls les livres jusqu'à la page demandée sont triés
+        premiers = heapq.nsmallest(
+            page * par_page, livres, key=lambda livre: normaliser(livre["titre"])
+        )
+        return premiers[(page - 1) * par_page:], len(livres)
+
+    def ajouter_exemplaires(self, isbn: str, nbr_ex: int) -> dict:
+        """
+        Ajoute (ou retire, si nbr_ex est négatif) des exemplaires d'un livre.
+
+        Raises:
+            LivreIndisponible: S'il n'y a pas assez d'exemplaires en rayon à retirer.
+
+        Returns:
+            dict: Le livre modifié.
+        """
+        with self._ecriture():
+            livre = self.livre(isbn)
+            if livre["nbr_ex"] + nbr_ex < 0:
+                raise LivreIndisponible(
+                    f"Impossible de retirer {-nbr_ex} exemplaire(s) : il en reste {livre['nbr_ex']} en rayon."
+                )
+            livre["nbr_ex"] += nbr_ex
+            self.book_handler.update(livre)
+        return livre
+
+    def ajouter_livre(self, isbn: str, titre: str, auteur: str, editeur: str, nbr_ex: int, annee: str) -> Book:
+        """
+        Ajoute un nouveau livre au catalogue.
+
+        Returns:
+            Book: Le livre ajouté.
+        """
+        with self._ecriture(), self.verrou_index:
+            livre = Book(
+                id=self.book_handler.next_id(),
+                titre=titre,
+                auteur=auteur,
+                editeur=editeur,
+                isbn=isbn,
+                nbr_ex=nbr_ex,
+                annee=annee,
+            )
+            self.book_handler.update(livre)
+            self.index.ajouter(livre)
+        return livre
+
+    def importer_livres(self, livres: Iterable[dict]) -> dict:
+        """
+        Ajoute un lot de livres au catalogue et enregistre tout le lot en une seule écriture.
+
+        Comme pour ajouter_exemplaires, un ISBN déjà présent (dans le catalogue ou plus tôt dans
+        le lot) ajoute ses exemplaires au livre existant au lieu de créer un doublon.
+
+        Args:
+            livres (Iterable[dict]): Les livres validés (isbn, titre, auteur, editeur, nbr_ex, annee).
+                Peut être un générateur : il est parcouru une seule fois.
+
+        Returns:
+            dict: Le nombre de livres ajoutés, de livres fusionnés et d'exemplaires ajoutés.
+        """
+        nouveaux = {}  # isbn -> nouveau livre
+        ajouts = {}  # isbn d'un livre existant -> exemplaires à ajouter
+        exemplaires = 0
+
+        for livre in livres:
+            isbn = livre["isbn"]
+            exemplaires += livre["nbr_ex"]
+            if isbn in nouveaux:
+                nouveaux[isbn]["nbr_ex"] += livre["nbr_ex"]
+            elif isbn in ajouts or self.book_handler.get(isbn) is not None:
+                ajouts[isbn] = ajouts.get(isbn, 0) + livre["nbr_ex"]
+            else:
+                nouveaux[isbn] = Book(
+                    id=None,
+                    titre=livre["titre"],
+                    auteur=livre["auteur"],
+                    editeur=livre["editeur"],
+                    isbn=isbn,
+                    nbr_ex=livre["nbr_ex"],
+                    annee=livre["annee"],
+                )
+
+        with self._ecriture(), self.verrou_index:
+            # Un autre processus a pu ajouter certains des nouveaux livres depuis la lecture du lot
+            for isbn in [isbn for isbn in nouveaux if self.book_handler.get(isbn) is not None]:
+                ajouts[isbn] = nouveaux.pop(isbn)["nbr_ex"]
+
+            modifies = []
+            for isbn, nbr_ex in ajouts.items():
+                livre = self.livre(isbn)
+                livre["nbr_ex"] += nbr_ex
+                modifies.append(livre)
+
+            ids = self.book_handler.next_ids(len(nouveaux)) if nouveaux else range(0)
+            for id_livre, livre in zip(ids, nouveaux.values()):
+                livre["id"] = id_livre
+                self.index.ajouter(livre)
+                modifies.append(livre)
+
+            self.book_handler.update_many(modifies)
+
+        return {"ajoutes": len(nouveaux), "fusionnes": len(ajouts), "exemplaires": exemplaires}
+
+    def supprimer_livre(self, isbn: str) -> dict:
+        """
+        Supprime un livre du catalogue.
+
+        Returns:
+            dict: Le livre supprimé.
+        """
+        with self._ecriture(), self.verrou_index:
+            livre = self.livre(isbn)
+            self.index.retirer(livre)
+            self.book_handler.delete(isbn)
+        return livre
+
+    def modifier_livre(self, isbn: str, attribut: str, valeur) -> dict:
+        """
+        Modifie un attribut d'un livre.
+
+        Raises:
+            AttributInvalide: Si le livre n'a pas cet attribut, ou si le nombre d'exemplaires est négatif.
+
+        Returns:
+            dict: Le livre modifié.
+        """
+        with self._ecriture(), self.verrou_index:
+            livre = self.livre(isbn)
+            if attribut not in livre:
+                raise AttributInvalide(f"Attribut non valide : {attribut}.")
+            if attribut == "id":
+                raise AttributInvalide("L'id d'un livre ne peut pas être modifié.")
+            if attribut == "nbr_ex" and (not isinstance(valeur, int) or valeur < 0):
+                raise AttributInvalide("Le nombre d'exemplaires doit être un entier positif.")
+
+            # Le livre est retiré de l'index avant d'être modifié, puis réindexé
+            self.index.retirer(livre)
+            livre[attribut] = valeur
+            self.index.ajouter(livre)
+
+            self.book_handler.update(livre)
+        return livre
+
+    # ----- Étudiants -----
+
+    def etudiant(self, id_etudiant: int) -> dict:
+        """
+        Renvoie l'étudiant qui a l'id donné.
+
+        Raises:
+            EtudiantIntrouvable: Si aucun étudiant n'a cet id.
+        """
+        etudiant = self.student_handler.get(id_etudiant)
+        if etudiant is None:
+            raise EtudiantIntrouvable("Aucun étudiant n'a été trouvé avec l'identifiant donné.")
+        return etudiant
+
+    def suspendre_etudiant(self, id_etudiant: int) -> dict:
+        """
+        Suspend le compte d'un étudiant.
+
+        Returns:
+            dict: L'étudiant suspendu.
+        """
+        with self._ecriture():
+            etudiant = self.etudiant(id_etudiant)
+            etudiant["suspendu"] = True
+            self.student_handler.update(etudiant)
+        return etudiant
+
+    # ----- Emprunts -----
+
+    def verifier_emprunteur(self, etudiant: dict) -> None:
+        """
+        Vérifie qu'un étudiant a le droit d'emprunter un livre de plus.
+
+        Les demandes en attente comptent dans la limite de MAX_EMPRUNTS : une fois acceptées
+        (par exemple toutes ensemble par accepter_demandes), elles deviennent des emprunts.
+
+        Raises:
+            CompteSuspendu, LimiteEmprunts, RegleSeptJours
+        """
+        if etudiant["suspendu"]:
+            raise CompteSuspendu("Compte suspendu !")
+        if len(etudiant["emprunts"]) + len(etudiant["demandes"]) >= MAX_EMPRUNTS:
+            raise LimiteEmprunts(f"Vous avez déjà {MAX_EMPRUNTS} emprunts ou demandes en cours!")
+        if self.regle_7jours([etudiant]):
+            raise RegleSeptJours("Vous avez emprunter un livre plus de 7 jours.")
+
+    def demander_emprunt(self, id_etudiant: int, isbn: str) -> BorrowRequest:
+        """
+        Enregistre une demande d'emprunt, qui réserve un exemplaire du livre.
+
+        Raises:
+            LivreIndisponible: S'il ne reste aucun exemplaire disponible du livre.
+
+        Returns:
+            BorrowRequest: La demande ajoutée.
+        """
+        with self._ecriture():
+            etudiant = self.etudiant(id_etudiant)
+            self.verifier_emprunteur(etudiant)
+
+            # La vérification et la réservation d'un exemplaire se font dans la même transaction
+            with self.verrou_index:
+                livre = self.livre(isbn)
+                if self.disponibilites.disponibles(livre) <= 0:
+                    raise LivreIndisponible(f"Le livre {livre['titre']} n'est pas disponible.")
+
+                demande = BorrowRequest(titre=livre["titre"], isbn=livre["isbn"], date_demande=maintenant())
+                self.disponibilites.reserver(id_etudiant, demande)
+
+                etudiant["demandes"].append(demande)
+                if self._file_demandes is not None:
+                    self._file_demandes.ajouter(id_etudiant, demande)
+
+            self.student_handler.update(etudiant)
+        return demande
+
+    def _demande(self, etudiant: dict, num_demande: int) -> dict:
+        if not 1 <= num_demande <= len(etudiant["demandes"]):
+            raise DemandeIntrouvable(f"Aucune demande numéro {num_demande}.")
+        return etudiant["demandes"][num_demande - 1]
+
+    def accepter_demande(self, id_etudiant: int, num_demande: int) -> Loan:
+        """
+        Accepte une demande d'emprunt : la demande devient un emprunt daté du jour.
+
+        Raises:
+            LivreIndisponible: Si la réservation de la demande a expiré et qu'il ne reste aucun
+                exemplaire disponible.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            num_demande (int): Le numéro de la demande (à partir de 1).
+
+        Returns:
+            Loan: L'emprunt créé.
+        """
+        with self._ecriture():
+            etudiant = self.etudiant(id_etudiant)
+            demande = self._demande(etudiant, num_demande)
+
+            with self.verrou_index:
+                livre = self.livre(demande["isbn"])
+                if not self.disponibilites.peut_emprunter(id_etudiant, demande, livre):
+                    raise LivreIndisponible(f"Le livre {livre['titre']} n'est pas disponible.")
+                self.disponibilites.emprunter(id_etudiant, demande)
+
+                etudiant["demandes"].pop(num_demande - 1)
+                if self._file_demandes is not None:
+                    self._file_demandes.retirer(id_etudiant, demande)
+
+                emprunt = Loan.from_request(demande, datetime.date.today().isoformat())
+                etudiant["emprunts"].append(emprunt)
+                if self.retards is not None:
+                    self.retards.ajouter(id_etudiant, emprunt)
+
+                livre["nbr_ex"] -= 1
+                self.book_handler.update(livre)
+
+            self.student_handler.update(etudiant)
+        return emprunt
+
+    def refuser_demande(self, id_etudiant: int, num_demande: int) -> dict:
+        """
+        Refuse une demande d'emprunt.
+
+        Returns:
+            dict: La demande refusée.
+        """
+        with self._ecriture():
+            etudiant = self.etudiant(id_etudiant)
+            self._demande(etudiant, num_demande)
+
+            demande = etudiant["demandes"].pop(num_demande - 1)
+            with self.verrou_index:
+                self.disponibilites.liberer(id_etudiant, demande)
+                if self._file_demandes is not None:
+                    self._file_demandes.retirer(id_etudiant, demande)
+
+            self.student_handler.update(etudiant)
+        return demande
+
+    def demandes_en_attente(self) -> list[dict]:
+        """
+        Liste les demandes en attente de tous les étudiants, de la plus ancienne à la plus récente.
+
+        Returns:
+            list[dict]: Les demandes (date_demande, id, nom, prenom, titre, isbn).
+        """
+        with self.verrou_index:
+            en_attente = self.file_demandes.en_attente()
+
+        demandes = []
+        for date_demande, id_etudiant, isbn in en_attente:
+            etudiant = self.student_handler.get(id_etudiant)
+            livre = self.book_handler.get(isbn)
+            if etudiant is None:
+                continue
+            demandes.append(
+                {
+                    "date_demande": date_demande,
+                    "id": id_etudiant,
+                    "nom": etudiant["nom"],
+                    "prenom": etudiant["prenom"],
+                    "titre": livre["titre"] if livre else isbn,
+                    "isbn": isbn,
+                }
+            )
+        return demandes
+
+    def accepter_demandes(self) -> dict:
+        """
+        Accepte, dans l'ordre de la file, toutes les demandes qui peuvent l'être.
+
+        Une demande est acceptée si elle a un exemplaire réservé (ou, si sa réservation a expiré,
+        s'il reste un exemplaire disponible) et si l'étudiant n'est pas
+        suspendu, a moins de MAX_EMPRUNTS emprunts (en comptant ceux acceptés dans ce lot) et
+        n'a pas d'emprunt de plus de 7 jours. Les autres demandes restent dans la file.
+        Les livres et les étudiants modifiés sont enregistrés en une seule écriture par fichier.
+
+        Returns:
+            dict: Les emprunts acceptés ("acceptees") et le nombre de demandes restantes ("en_attente").
+        """
+        with self.verrou_index:
+            en_attente = self.file_demandes.en_attente()
+
+        with self._ecriture(), self.verrou_index:
+            limite = date_limite()
+            aujourdhui = datetime.date.today().isoformat()
+            etudiants, livres, acceptees = {}, {}, []
+
+            for date_demande, id_etudiant, isbn in en_attente:
+                etudiant = self.student_handler.get(id_etudiant)
+                livre = self.book_handler.get(isbn)
+                if etudiant is None or livre is None:
+                    continue
+                if etudiant["suspendu"] or len(etudiant["emprunts"]) >= MAX_EMPRUNTS:
+                    continue
+                if any(emprunt["date"] < limite for emprunt in etudiant["emprunts"]):
+                    continue
+
+                # La demande a pu être traitée depuis la copie de la file
+                for i, demande in enumerate(etudiant["demandes"]):
+                    if demande["isbn"] == isbn and demande.get("date_demande", "") == date_demande:
+                        break
+                else:
+                    continue
+
+                if not self.disponibilites.peut_emprunter(id_etudiant, demande, livre):
+                    continue
+                self.disponibilites.emprunter(id_etudiant, demande)
+                self.file_demandes.retirer(id_etudiant, demande)
+
+                etudiant["demandes"].pop(i)
+                emprunt = Loan.from_request(demande, aujourdhui)
+                etudiant["emprunts"].append(emprunt)
+                if self.retards is not None:
+                    self.retards.ajouter(id_etudiant, emprunt)
+                livre["nbr_ex"] -= 1
+
+                etudiants[id_etudiant] = etudiant
+                livres[isbn] = livre
+                acceptees.append({"id": id_etudiant, "titre": emprunt["titre"], "isbn": isbn})
+
+            if acceptees:
+                self.book_handler.update_many(list(livres.values()))
+                self.student_handler.update_many(list(etudiants.values()))
+
+            restantes = len(self.file_demandes)
+
+        return {"acceptees": acceptees, "en_attente": restantes}
+
+    def retourner_livre(self, id_etudiant: int, num_emprunt: int) -> dict:
+        """
+        Enregistre le retour d'un livre emprunté.
+
+        Args:
+            id_etudiant (int): L'id de l'étudiant.
+            num_emprunt (int): Le numéro de l'emprunt (à partir de 1).
+
+        Returns:
+            dict: L'emprunt terminé.
+        """
+        with self._ecriture():
+            etudiant = self.etudiant(id_etudiant)
+            if not 1 <= num_emprunt <= len(etudiant["emprunts"]):
+                raise EmpruntIntrouvable(f"Aucun emprunt numéro {num_emprunt}.")
+
+            emprunt = etudiant["emprunts"].pop(num_emprunt - 1)
+            with self.verrou_index:
+                if self.retards is not None:
+                    self.retards.retirer(id_etudiant, emprunt)
+                self.disponibilites.rendre(emprunt["isbn"])
+
+            emprunt.update(
+                {"login": etudiant["login"], "nom": etudiant["nom"], "prenom": etudiant["prenom"]}
+            )
+
+            livre = self.book_handler.get(emprunt["isbn"])
+            if livre is not None:
+                livre["nbr_ex"] += 1
+                self.book_handler.update(livre)
+
+            self.student_handler.update(etudiant)
+
+            self.historique.ajouter(
+                {**emprunt, "id_etudiant": id_etudiant, "date_rendu": datetime.date.today().isoformat()}
+            )
+        return emprunt
+
+    def historique_emprunts(self, isbn: str = None, id_etudiant: int = None) -> Iterable[dict]:
+        """
+        Renvoie l'historique des emprunts rendus, sans charger le catalogue.
+
+        Args:
+            isbn (str, optional): Si donné, seulement l'historique de ce livre.
+            id_etudiant (int, optional): Si donné, seulement l'historique de cet étudiant.
+
+        Returns:
+            Iterable[dict]: Les emprunts rendus (du plus récent au plus ancien pour l'historique complet).
+        """
+        if isbn is not None:
+            return self.historique.livre(isbn)
+        if id_etudiant is not None:
+            return self.historique.etudiant(id_etudiant)
+        return self.historique.recents()
+
+    def rapports(self) -> dict[str, list[dict]]:
+        """
+        Calcule les statistiques d'emprunt (voir reports.py, qui nécessite NumPy).
+
+        Returns:
+            dict[str, list[dict]]: Chaque statistique, sous forme de lignes de tableau.
+        """
+        # Importé ici : NumPy n'est nécessaire que pour les statistiques
+        import reports
+
+        livres = self.livres
+        with self.verrou_index:
+            # Exemplaires en rayon et empruntés de chaque livre
+            exemplaires = {
+                livre["isbn"]: livre["nbr_ex"] + self.disponibilites.empruntes.get(livre["isbn"], 0)
+                for livre in livres
+            }
+        return reports.rapport(self.historique, self.student_handler.load_data(), livres, exemplaires)
+
+    def regle_7jours(self, etudiants: list[dict] = None) -> list[dict]:
+        """
+        Liste les emprunts de plus de 7 jours.
+
+        Args:
+            etudiants (list[dict], optional): Les étudiants à vérifier.
+                Par défaut None : tous les étudiants, en utilisant l'index des emprunts.
+
+        Returns:
+            list[dict]: Les infractions (id, nom, prenom et titre).
+        """
+        # Un emprunt est en retard si sa date (ISO) est avant la date limite
+        limite = date_limite()
+
+        if etudiants is None:
+            with self.verrou_index:
+                etudiants = self.student_handler.load_data()
+                if BibliothequeService.retards is None:
+                    BibliothequeService.retards = OverdueIndex.construire(etudiants)
+                retards = self.retards.en_retard(limite)
+
+            en_retard = [
+                (self.student_handler.get(id_etudiant), {"date": date, "isbn": isbn})
+                for date, id_etudiant, isbn in retards
+            ]
+        else:
+            en_retard = [
+                (etudiant, emprunt)
+                for etudiant in etudiants
+                for emprunt in etudiant["emprunts"]
+                if emprunt["date"] < limite
+            ]
+
+        infractions = []
+        for etudiant, emprunt in en_retard:
+            if etudiant is None:
+                continue
+            livre = self.book_handler.get(emprunt["isbn"])
+            infractions.append(
+                {
+                    "id": etudiant["id"],
+                    "nom": etudiant["nom"],
+                    "prenom": etudiant["prenom"],
+                    "titre": livre["titre"] if livre else emprunt.get("titre", emprunt["isbn"]),
+                }
+            )
+        return infractions
+
+
+# Les index en mémoire sont reconstruits quand un autre processus a modifié les fichiers
+BibliothequeService.book_handler.repository.on_reload(BibliothequeService.invalider_catalogue)
+BibliothequeService.student_handler.repository.on_reload(BibliothequeService.invalider_etudiants)
@@ -0,0 +1,392 @@
+"""
+Ce module répartit une collection (par défaut le catalogue des livres) entre plusieurs fichiers.
+
+Avec un seul fichier, chaque compaction du journal réécrit tout le catalogue et la première
+recherche d'un livre le lit en entier. Une collection partagée est rangée dans le dossier
+database/<name>/ : un petit manifeste (manifest.json) et N parties (000.json, 001.json, ...),
+chacune avec son propre journal. Un élément appartient à la partie désignée par le CRC32 de sa
+clé primaire : get et update ne chargent et ne réécrivent que cette partie, les parcours complets
+(iter) lisent les parties l'une après l'autre. load() charge toutes les parties.
+
+Les handlers ne changent pas : open_json_repository (files.py) renvoie un ShardedRepository dès
+que le manifeste existe. Pour partager le catalogue, ou revenir à un seul fichier (application
+arrêtée) :
+    python shards.py --parties 16
+    python shards.py --fusionner
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import zlib
+from typing import Dict, Iterator, List, Optional
+from files import ConflictError, Repository, VERSION, gc_paused, max_id, open_json_repository, synchronise
+from journal import Journal, atomic_write
+
+MANIFEST = "manifest.json"
+
+# Nombre de parties par défaut de python shards.py
+PARTIES = 16
+
+
+def manifest_file(name: str) -> str:
+    return f"database/{name}/{MANIFEST}"
+
+
+def read_manifest(name: str) -> Optional[Dict]:
+    """
+    Lit le manifeste de la collection `name`.
+
+    Returns:
+        Optional[Dict]: Le manifeste (collection, key, shards), ou None si la collection n'est pas partagée.
+    """
+    try:
+        with open(manifest_file(name), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def shard_index(value, shards: int) -> int:
+    """
+    Renvoie le numéro de la partie d'une clé primaire. Le CRC32 ne dépend pas du processus
+    (contrairement à hash()) : tous les processus rangent une clé dans la même partie.
+    """
+    return zlib.crc32(str(value).encode("utf-8")) % shards
+
+
+class Shard(Repository):
+    """
+    Une partie d'une collection partagée : un Repository ordinaire, sans séquence (les ids sont
+    attribués par la collection) et sans verrou de fichier propre (celui de la collection suffit,
+    voir ShardedRepository.locked).
+    """
+
+    def read_sequence(self) -> int:
+        return 0
+
+    def write_sequence(self) -> None:
+        pass
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        with self.write_lock:
+            with self.lock:
+                self.refresh()
+            yield
+
+    def adopt(self, item: Dict) -> None:
+        """
+        Ajoute un élément qui vient d'une autre partie (sa clé a été modifiée), en continuant sa version.
+        """
+        with self.locked(), self.lock:
+            self._load()
+            if self.get(item.get(self.key)) is not None:
+                raise ConflictError(f"{self.file_name} : la clé {item.get(self.key)!r} existe déjà.")
+            item[VERSION] = item.get(VERSION, 0) + 1
+            self.log(self._put(item))
+
+
+class ShardedRepository(Repository):
+    """
+    Collection répartie entre plusieurs parties (voir Shard), avec les mêmes méthodes qu'un Repository.
+
+    Chaque partie est chargée à sa première utilisation. La liste renvoyée par load() est la
+    concaténation des parties ; elle est reconstruite quand un élément est ajouté, remplacé par
+    un autre objet ou supprimé.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key: str,
+        shards: int,
+        journal: bool = True,
+        binary: bool = False,
+        record: Optional[type] = None,
+    ):
+        self.directory = f"database/{name}"
+        # Les parties existent avant super().__init__, qui leur transmet `binary`
+        self.shards = [
+            Shard(
+                f"{self.directory}/{i:03d}.json",
+                key,
+                Journal(f"{self.directory}/{i:03d}.journal") if journal else None,
+                record=record,
+            )
+            for i in range(shards)
+        ]
+        super().__init__(f"{self.directory}/{MANIFEST}", key, binary=binary, record=record)
+        self.name = name
+        for shard in self.shards:
+            shard.on_reload(self._changed)
+
+    @property
+    def binary(self) -> bool:
+        # Le manifeste reste en JSON : seul l'instantané des parties change de format
+        return self.shards[0].binary
+
+    @binary.setter
+    def binary(self, value: bool) -> None:
+        for shard in self.shards:
+            shard.binary = value
+
+    @property
+    def sequence_file(self) -> str:
+        return f"{self.directory}/{self.name}.seq"
+
+    @property
+    def lock_file(self) -> str:
+        return f"{self.directory}/{self.name}.lock"
+
+    def shard(self, value) -> Shard:
+        """
+        Renvoie la partie à laquelle appartient la clé primaire `value`.
+        """
+        return self.shards[shard_index(value, len(self.shards))]
+
+    def _changed(self) -> None:
+        # Une partie a été relue (modifiée par un autre processus) : la concaténation est périmée
+        self.items = None
+        for listener in self.listeners:
+            listener()
+
+    def _holder(self, item: Dict) -> Optional[Shard]:
+        # La partie qui contient cet objet, même si sa clé a été modifiée sur place
+        for shard in self.shards:
+            pos = shard.positions.get(id(item))
+            if pos is not None and shard.items is not None and shard.items[pos] is item:
+                return shard
+        return None
+
+    @synchronise
+    def load(self) -> List[Dict]:
+        """
+        Charge toutes les parties.
+
+        Returns:
+            List[Dict]: Les éléments de toutes les parties, dans l'ordre des parties.
+        """
+        # Un seul arrêt du ramasse-miettes pour toutes les parties (voir gc_paused)
+        with gc_paused():
+            for shard in self.shards:
+                shard.load()
+        if self.items is None:
+            self.items = [item for shard in self.shards for item in shard.items]
+            self.sequence = max(self.sequence, self.read_sequence(), max_id(self.items, self.record))
+        return self.items
+
+    @synchronise
+    def unload(self) -> None:
+        self.items = None
+        for shard in self.shards:
+            shard.unload()
+
+    def stream(self) -> Iterator[Dict]:
+        for shard in self.shards:
+            yield from shard.stream()
+
+    def iter(self) -> Iterator[Dict]:
+        """
+        Parcourt les éléments en lecture seule, une partie après l'autre (voir Repository.iter).
+        """
+        for shard in self.shards:
+            yield from shard.iter()
+
+    def refresh(self) -> None:
+        for shard in self.shards:
+            shard.refresh()
+
+    @synchronise
+    def add_index(self, field: str) -> None:
+        self.secondary[field] = {}
+        for shard in self.shards:
+            shard.add_index(field)
+
+    def get(self, value) -> Optional[Dict]:
+        return self.shard(value).get(value)
+
+    def find(self, field: str, value) -> Optional[Dict]:
+        # L'attribut ne dit pas dans quelle partie chercher : les parties sont chargées une à une
+        for shard in self.shards:
+            item = shard.find(field, value)
+            if item is not None:
+                return item
+        return None
+
+    def update_many(self, items: List[Dict]) -> None:
+        """
+        Met à jour plusieurs éléments : chaque partie concernée reçoit ses éléments en une seule
+        écriture. Les versions sont vérifiées dans toutes les parties avant la première écriture.
+
+        Raises:
+            ConflictError: Si l'un des éléments enregistrés a changé depuis qu'il a été lu.
+        """
+        with self.locked(), self.lock:
+            parts: Dict[Shard, List[Dict]] = {}
+            moves = []
+            for item in items:
+                shard = self.shard(item.get(self.key))
+                with shard.lock:
+                    shard._load()
+                    holder = self._holder(item)
+                    if holder is not None and holder is not shard:
+                        if shard.get(item.get(self.key)) is not None:
+                            raise ConflictError(f"{shard.file_name} : la clé {item.get(self.key)!r} existe déjà.")
+                        moves.append((holder, shard, item))
+                        continue
+                    shard._check(item)
+                    if shard.get(item.get(self.key)) is not item:
+                        self.items = None
+                parts.setdefault(shard, []).append(item)
+
+            for holder, shard, item in moves:
+                # La clé a été modifiée sur place : l'élément passe dans la partie de sa nouvelle clé
+                holder.delete(holder.keys[holder.positions[id(item)]])
+                shard.adopt(item)
+                self.items = None
+
+            for shard, part in parts.items():
+                shard.update_many(part)
+
+    def delete(self, value) -> bool:
+        with self.locked(), self.lock:
+            deleted = self.shard(value).delete(value)
+            if deleted:
+                self.items = None
+            return deleted
+
+    def next_ids(self, count: int = 1) -> range:
+        """
+        Réserve des ids : la séquence de la collection est relue et réécrite sous son verrou.
+        """
+        with self.locked(), self.lock:
+            first = max(self.sequence, self.read_sequence()) + 1
+            self.sequence = first + count - 1
+            self.write_sequence()
+        return range(first, self.sequence + 1)
+
+    @synchronise
+    def replace(self, data: List[Dict]) -> None:
+        parts = [[] for _ in self.shards]
+        for item in data:
+            parts[shard_index(item.get(self.key), len(self.shards))].append(item)
+        for shard, part in zip(self.shards, parts):
+            shard.replace(part)
+        self.items = None
+        self.sequence = max(self.sequence, max_id(data))
+        self.dirty.add(None)
+
+    def compact(self) -> None:
+        for shard in self.shards:
+            if shard.items is not None:
+                shard.compact()
+        self.write_sequence()
+        self.dirty.clear()
+
+    def flush(self) -> None:
+        """
+        Écrit les parties modifiées par replace (les mises à jour sont déjà dans leurs journaux).
+        """
+        if not self.dirty and not any(shard.dirty for shard in self.shards):
+            return
+        with self.locked(), self.lock:
+            for shard in self.shards:
+                shard.flush()
+            self.write_sequence()
+            self.dirty.clear()
+
+
+def _remplacer_dossier(source: str, destination: str) -> None:
+    # Remplace le dossier `destination` par `source` (l'ancien est supprimé après le renommage)
+    ancien = f"{destination}.ancien"
+    if os.path.exists(destination):
+        os.replace(destination, ancien)
+    os.replace(source, destination)
+    shutil.rmtree(ancien, ignore_errors=True)
+
+
+def partitionner(name: str = "books", key: str = "isbn", parties: int = PARTIES) -> Dict:
+    """
+    Répartit la collection `name` (un seul fichier, ou déjà partagée) en `parties` fichiers.
+
+    Les parties et le manifeste sont écrits dans un dossier temporaire qui remplace ensuite
+    database/<name>/. Le fichier unique et son journal sont supprimés une fois les parties en place.
+
+    Returns:
+        Dict: Le nombre d'éléments et la taille de chaque partie.
+    """
+    source = open_json_repository(name, key, journal=True)
+    with source.locked():
+        items = source.load()
+        sequence = max(source.sequence, max_id(items))
+
+        contenu = [[] for _ in range(parties)]
+        for item in items:
+            contenu[shard_index(item.get(key), parties)].append(item)
+
+        temporaire = f"database/.{name}.tmp"
+        shutil.rmtree(temporaire, ignore_errors=True)
+        os.makedirs(temporaire)
+        for i, partie in enumerate(contenu):
+            atomic_write(f"{temporaire}/{i:03d}.json", partie)
+        if sequence:
+            atomic_write(f"{temporaire}/{name}.seq", sequence)
+        # Le manifeste est écrit en dernier : sans lui, le dossier n'est pas utilisé
+        atomic_write(f"{temporaire}/{MANIFEST}", {"collection": name, "key": key, "shards": parties})
+
+    _remplacer_dossier(temporaire, f"database/{name}")
+    for suffixe in ("json", "snap", "journal", "seq"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"database/{name}.{suffixe}")
+
+    return {"elements": len(items), "parties": [len(partie) for partie in contenu]}
+
+
+def fusionner(name: str = "books", key: str = "isbn") -> Dict:
+    """
+    Réunit les parties de la collection `name` dans le fichier unique database/<name>.json.
+
+    Returns:
+        Dict: Le nombre d'éléments.
+    """
+    source = open_json_repository(name, key, journal=True)
+    if read_manifest(name) is None:
+        return {"elements": len(source.load())}
+
+    with source.locked():
+        items = source.load()
+        atomic_write(f"database/{name}.json", items)
+        if source.sequence:
+            atomic_write(f"database/{name}.seq", source.sequence)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"database/{name}.journal")
+
+    shutil.rmtree(source.directory)
+
+    return {"elements": len(items)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Répartit le catalogue entre plusieurs fichiers.")
+    parser.add_argument("--parties", type=int, default=PARTIES, help=f"nombre de parties (par défaut {PARTIES})")
+    parser.add_argument("--fusionner", action="store_true", help="revient à un seul fichier")
+    args = parser.parse_args()
+
+    if args.fusionner:
+        resultat = fusionner()
+        print(f"{resultat['elements']} livre(s) réunis dans database/books.json")
+    else:
+        if args.parties < 1:
+            parser.error("--parties doit être au moins 1")
+        resultat = partitionner(parties=args.parties)
+        print(
+            f"{resultat['elements']} livre(s) répartis en {args.parties} parties "
+            f"(de {min(resultat['parties'])} à {max(resultat['parties'])} livres)"
+        )
+
+
+if __name__ == "__main__":
+    main()
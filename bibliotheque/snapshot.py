@@ -0,0 +1,186 @@
+"""
+Ce module gère le format binaire des instantanés de la base de données.
+
+Un instantané binaire (database/<name>.snap) remplace le fichier JSON d'une collection : il est
+plus petit, et plus rapide à lire et à écrire que le JSON. Il commence par un en-tête fixe
+(signature, version du format, longueur et CRC32 du contenu) suivi du contenu sérialisé avec
+pickle (protocole 5). Le contenu ne peut contenir que des listes, des dictionnaires et des
+valeurs simples : la lecture refuse toute classe, un fichier modifié ne peut donc pas exécuter
+de code.
+
+Le format se choisit par handler (attribut `binary` de FileHandler) ou avec la variable
+d'environnement BIBLIOTHEQUE_BINAIRE, qui donne les collections à enregistrer en binaire :
+    BIBLIOTHEQUE_BINAIRE=books,etudiants python main.py
+Une collection encore au format JSON est lue depuis son fichier JSON et convertie à la prochaine
+écriture de son instantané (et inversement). Pour convertir tout de suite, ou exporter une
+collection en JSON lisible :
+    python snapshot.py convertir books binaire
+    python snapshot.py exporter books livres.json
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import struct
+import zlib
+from typing import Dict, List
+from journal import atomic_write_bytes
+import metrics
+from records import encode, plain
+
+SIGNATURE = b"BIBSNAP"
+VERSION = 1
+# Signature, version du format, CRC32 et longueur du contenu
+HEADER = struct.Struct("<7sBIQ")
+
+# Collections que la ligne de commande peut convertir ou exporter
+COLLECTIONS = ("books", "etudiants", "admins")
+
+
+class SnapshotError(ValueError):
+    """
+    Levée quand un instantané binaire est illisible (signature, version ou CRC32 invalide).
+    """
+
+
+class _Unpickler(pickle.Unpickler):
+    # Les instantanés ne contiennent que des types de base, qui n'ont pas besoin de find_class
+    def find_class(self, module: str, name: str):
+        raise SnapshotError(f"Classe interdite dans un instantané : {module}.{name}")
+
+
+def snapshot_file(file_name: str) -> str:
+    """
+    Renvoie le nom de l'instantané binaire qui correspond au fichier JSON `file_name`.
+    """
+    return f"{os.path.splitext(file_name)[0]}.snap"
+
+
+def dumps(data: List[Dict]) -> bytes:
+    """
+    Sérialise des données : en-tête puis contenu pickle.
+    """
+    content = pickle.dumps(plain(data), protocol=5)
+    return HEADER.pack(SIGNATURE, VERSION, zlib.crc32(content), len(content)) + content
+
+
+def loads(raw: bytes, file_name: str = "instantané") -> List[Dict]:
+    """
+    Vérifie l'en-tête et le CRC32 d'un instantané puis le désérialise.
+
+    Raises:
+        SnapshotError: Si l'instantané est invalide, tronqué ou abîmé.
+    """
+    if len(raw) < HEADER.size:
+        raise SnapshotError(f"{file_name} : fichier trop court.")
+    signature, version, crc, length = HEADER.unpack_from(raw)
+    if signature != SIGNATURE:
+        raise SnapshotError(f"{file_name} : ce n'est pas un instantané de la bibliothèque.")
+    if version != VERSION:
+        raise SnapshotError(f"{file_name} : version {version} du format non prise en charge.")
+
+    content = memoryview(raw)[HEADER.size:]
+    if len(content) != length or zlib.crc32(content) != crc:
+        raise SnapshotError(f"{file_name} : contenu tronqué ou abîmé (CRC32 invalide).")
+    return _Unpickler(io.BytesIO(content)).load()
+
+
+def dump(file_name: str, data: List[Dict]) -> None:
+    """
+    Écrit un instantané binaire de façon atomique.
+    """
+    atomic_write_bytes(file_name, dumps(data))
+
+
+def load(file_name: str) -> List[Dict]:
+    """
+    Lit un instantané binaire.
+
+    Raises:
+        FileNotFoundError: Si le fichier n'existe pas.
+        SnapshotError: Si l'instantané est invalide.
+    """
+    with open(file_name, "rb") as file:
+        raw = file.read()
+    if metrics.ACTIF:
+        metrics.octets(lus=len(raw))
+    return loads(raw, file_name)
+
+
+def _repository(name: str, binaire: bool):
+    # To avoid circular imports
+    from files import AdminHandler, BookHandler, StudentHandler, open_json_repository
+
+    handlers = dict(zip(COLLECTIONS, (BookHandler, StudentHandler, AdminHandler)))
+    if name not in handlers:
+        raise ValueError(f"Collection inconnue : {name} (collections : {', '.join(COLLECTIONS)}).")
+    handler = handlers[name]
+    return open_json_repository(name, handler.key, handler.journal, binaire, handler.record)
+
+
+def convertir(name: str, binaire: bool) -> int:
+    """
+    Réécrit la collection `name` au format binaire ou JSON, journal compris.
+
+    L'instantané est lu dans le format où il se trouve, puis réécrit dans l'autre ; l'ancien
+    fichier est supprimé (voir Repository.compact).
+
+    Returns:
+        int: Le nombre d'éléments convertis.
+    """
+    repository = _repository(name, binaire)
+    with repository.locked(), repository.lock:
+        # Le Repository a pu être ouvert avant avec l'autre format
+        repository.binary = binaire
+        items = repository.load()
+        repository.compact()
+    return len(items)
+
+
+def exporter(name: str, fichier: str = None) -> int:
+    """
+    Écrit la collection `name` (quel que soit son format) en JSON indenté, lisible par un humain.
+
+    Args:
+        name (str): La collection.
+        fichier (str, optional): Le fichier JSON à écrire. Par défaut la sortie standard.
+
+    Returns:
+        int: Le nombre d'éléments exportés.
+    """
+    items = _repository(name, False).load()
+    texte = json.dumps(items, ensure_ascii=False, indent=2, default=encode)
+    if fichier is None:
+        print(texte)
+    else:
+        with open(fichier, "w", encoding="utf-8") as file:
+            file.write(texte + "\n")
+    return len(items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convertit ou exporte les instantanés de la base.")
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    conversion = actions.add_parser("convertir", help="change le format d'une collection")
+    conversion.add_argument("collection", choices=COLLECTIONS)
+    conversion.add_argument("format", choices=("binaire", "json"))
+
+    export = actions.add_parser("exporter", help="écrit une collection en JSON indenté")
+    export.add_argument("collection", choices=COLLECTIONS)
+    export.add_argument("fichier", nargs="?", help="fichier JSON (par défaut la sortie standard)")
+    args = parser.parse_args()
+
+    if args.action == "convertir":
+        nombre = convertir(args.collection, args.format == "binaire")
+        print(f"{args.collection} : {nombre} élément(s) enregistré(s) au format {args.format}")
+    else:
+        nombre = exporter(args.collection, args.fichier)
+        if args.fichier:
+            print(f"{args.collection} : {nombre} élément(s) exporté(s) dans {args.fichier}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Ce module fournit un stockage SQLite pour le système de gestion de bibliothèque.
+
+Il s'utilise à la place des fichiers JSON en définissant la variable d'environnement
+BIBLIOTHEQUE_BACKEND=sqlite. Les handlers de files.py gardent le même contrat
+(load_data / save_data / update) : seul le Repository change.
+
+Pour migrer les fichiers JSON existants vers la base SQLite :
+    python sqlite_backend.py
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional
+from files import Repository
+
+DB_FILE = "database/bibliotheque.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS livres (
+    isbn TEXT PRIMARY KEY,
+    id INTEGER,
+    titre TEXT,
+    auteur TEXT,
+    editeur TEXT,
+    nbr_ex INTEGER,
+    annee TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS emprunter_par (
+    parent TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    login TEXT,
+    nom TEXT,
+    prenom TEXT,
+    date TEXT,
+    date_rendu TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS emprunter_par_isbn ON emprunter_par (parent);
+CREATE INDEX IF NOT EXISTS emprunter_par_login ON emprunter_par (login);
+CREATE INDEX IF NOT EXISTS emprunter_par_date ON emprunter_par (date);
+
+CREATE TABLE IF NOT EXISTS etudiants (
+    id INTEGER PRIMARY KEY,
+    nom TEXT,
+    prenom TEXT,
+    login TEXT UNIQUE,
+    mdp TEXT,
+    email TEXT,
+    suspendu INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS etudiants_email ON etudiants (email);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    collection TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS versions (
+    collection TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS emprunts (
+    parent INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    isbn TEXT,
+    titre TEXT,
+    date TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS emprunts_etudiant ON emprunts (parent);
+CREATE INDEX IF NOT EXISTS emprunts_isbn ON emprunts (isbn);
+CREATE INDEX IF NOT EXISTS emprunts_date ON emprunts (date);
+
+CREATE TABLE IF NOT EXISTS demandes (
+    parent INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    isbn TEXT,
+    titre TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS demandes_etudiant ON demandes (parent);
+CREATE INDEX IF NOT EXISTS demandes_isbn ON demandes (isbn);
+
+CREATE TABLE IF NOT EXISTS admins (
+    login TEXT PRIMARY KEY,
+    id INTEGER,
+    nom TEXT,
+    prenom TEXT,
+    mdp TEXT,
+    extra TEXT
+);
+"""
+
+
+class Collection:
+    """
+    Décrit comment une collection JSON est répartie entre ses tables SQLite.
+
+    Args:
+        table (str): La table principale.
+        key (str): La clé primaire de la collection.
+        columns (List[str]): Les colonnes de la table principale, dans l'ordre des clés JSON.
+        children (Dict[str, List[str]]): Pour chaque liste imbriquée, les colonnes de sa table.
+        booleans (set): Les colonnes à reconvertir en bool.
+    """
+
+    def __init__(self, table, key, columns, children=None, booleans=None):
+        self.table = table
+        self.key = key
+        self.columns = columns
+        self.children = children or {}
+        self.booleans = booleans or set()
+
+
+COLLECTIONS = {
+    "books": Collection(
+        "livres",
+        "isbn",
+        ["id", "titre", "auteur", "editeur", "isbn", "nbr_ex", "annee"],
+        {"emprunter_par": ["login", "nom", "prenom", "date", "date_rendu"]},
+    ),
+    "etudiants": Collection(
+        "etudiants",
+        "id",
+        ["id", "nom", "prenom", "login", "mdp", "email", "suspendu"],
+        {"emprunts": ["titre", "isbn", "date"], "demandes": ["titre", "isbn"]},
+        {"suspendu"},
+    ),
+    "admins": Collection("admins", "login", ["id", "nom", "prenom", "login", "mdp"]),
+}
+
+
+class Database:
+    """
+    Connexion partagée à la base SQLite.
+    """
+
+    def __init__(self, file_name: str):
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.RLock()
+
+
+_databases: Dict[str, Database] = {}
+
+
+def get_database(file_name: str = DB_FILE) -> Database:
+    if file_name not in _databases:
+        _databases[file_name] = Database(file_name)
+    return _databases[file_name]
+
+
+def _split(item: Dict, columns: List[str], ignored=()) -> tuple:
+    """
+    Sépare un dictionnaire en valeurs de colonnes et en attributs supplémentaires (JSON).
+    """
+    values = [item.get(col) for col in columns]
+    extra = {k: v for k, v in item.items() if k not in columns and k not in ignored}
+    return values, json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+def _join(columns: List[str], row, booleans=()) -> Dict:
+    """
+    Reconstruit un dictionnaire à partir d'une ligne (colonnes puis `extra`).
+    """
+    item = {}
+    for col, value in zip(columns, row):
+        if value is not None:
+            item[col] = bool(value) if col in booleans else value
+    if row[len(columns)]:
+        item.update(json.loads(row[len(columns)]))
+    return item
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository dont les modifications sont écrites dans SQLite, une transaction par appel.
+    """
+
+    def __init__(self, name: str, key: str, file_name: str = DB_FILE, record: Optional[type] = None):
+        super().__init__(file_name, key, record=record)
+        self.collection = COLLECTIONS[name]
+        self.database = get_database(file_name)
+
+    def _select(self, where: str = "", params=()) -> List[Dict]:
+        collection = self.collection
+        conn = self.database.connection
+
+        items = []
+        by_key = {}
+        for row in conn.execute(
+            f"SELECT {', '.join(collection.columns)}, extra FROM {collection.table} {where}",
+            params,
+        ):
+            item = _join(collection.columns, row, collection.booleans)
+            for child in collection.children:
+                item[child] = []
+            items.append(item)
+            by_key[item[collection.key]] = item
+
+        for child, columns in collection.children.items():
+            child_where = "WHERE parent = ?" if where else ""
+            for row in conn.execute(
+                f"SELECT parent, {', '.join(columns)}, extra FROM {child} {child_where} ORDER BY parent, position",
+                params if where else (),
+            ):
+                parent = by_key.get(row[0])
+                if parent is not None:
+                    parent[child].append(_join(columns, row[1:]))
+
+        return items
+
+    def read(self) -> List[Dict]:
+        with self.database.lock:
+            return self._select()
+
+    def stream(self) -> Iterator[Dict]:
+        return iter(self.read())
+
+    def get(self, value) -> Optional[Dict]:
+        # Tant que la collection n'est pas chargée, on utilise l'index de SQLite
+        if self.items is None:
+            with self.database.lock:
+                items = self._select(f"WHERE {self.collection.key} = ?", (value,))
+            return self._record(items[0]) if items else None
+        return super().get(value)
+
+    def _delete(self, value) -> None:
+        conn = self.database.connection
+        conn.execute(f"DELETE FROM {self.collection.table} WHERE {self.collection.key} = ?", (value,))
+        for child in self.collection.children:
+            conn.execute(f"DELETE FROM {child} WHERE parent = ?", (value,))
+
+    def _insert(self, item: Dict) -> None:
+        collection = self.collection
+        conn = self.database.connection
+        value = item.get(collection.key)
+
+        values, extra = _split(item, collection.columns, collection.children)
+        conn.execute(
+            f"INSERT INTO {collection.table} ({', '.join(collection.columns)}, extra) "
+            f"VALUES ({', '.join('?' * (len(collection.columns) + 1))})",
+            values + [extra],
+        )
+        for child, columns in collection.children.items():
+            rows = []
+            for position, elem in enumerate(item.get(child) or []):
+                child_values, child_extra = _split(elem, columns)
+                rows.append([value, position] + child_values + [child_extra])
+            conn.executemany(
+                f"INSERT INTO {child} (parent, position, {', '.join(columns)}, extra) "
+                f"VALUES ({', '.join('?' * (len(columns) + 3))})",
+                rows,
+            )
+
+    @property
+    def lock_file(self) -> str:
+        # Un verrou par collection : les collections partagent le fichier de la base
+        return f"{os.path.splitext(self.file_name)[0]}.{self.collection.table}.lock"
+
+    def stat(self) -> tuple:
+        # Version de la collection (voir _bump_version) : une écriture dans une autre collection
+        # ne la change pas, contrairement à PRAGMA data_version qui vaut pour toute la base
+        with self.database.lock:
+            row = self.database.connection.execute(
+                "SELECT valeur FROM versions WHERE collection = ?", (self.collection.table,)
+            ).fetchone()
+        return (row[0] if row else 0,)
+
+    def _bump_version(self) -> None:
+        # Dans la transaction de l'écriture : les autres processus voient les nouvelles données et
+        # la nouvelle version en même temps
+        self.database.connection.execute(
+            "INSERT INTO versions (collection, valeur) VALUES (?, 1) "
+            "ON CONFLICT (collection) DO UPDATE SET valeur = valeur + 1",
+            (self.collection.table,),
+        )
+
+    def read_sequence(self) -> int:
+        with self.database.lock:
+            row = self.database.connection.execute(
+                "SELECT valeur FROM sequences WHERE collection = ?", (self.collection.table,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _write_sequence(self, value: int) -> None:
+        self.database.connection.execute(
+            "INSERT OR REPLACE INTO sequences (collection, valeur) VALUES (?, ?)", (self.collection.table, value)
+        )
+
+    def write_sequence(self) -> None:
+        if self.sequence:
+            with self.database.lock, self.database.connection:
+                self._write_sequence(self.sequence)
+
+    def log(self, records: List[Dict]) -> None:
+        with self.database.lock, self.database.connection:
+            for record in records:
+                if record["op"] == "del":
+                    self._delete(record["key"])
+                elif record["op"] == "seq":
+                    self._write_sequence(record["value"])
+                else:
+                    self._delete(record["item"].get(self.key))
+                    self._insert(record["item"])
+            self._bump_version()
+        # Écrit sous le verrou de la collection : la nouvelle version est la nôtre, pas besoin de relire
+        self.signature = self.stat()
+
+    def write(self, data: List[Dict]) -> int:
+        """
+        Remplace tout le contenu des tables de la collection en une seule transaction.
+
+        Comme pour l'index du Repository, seul le dernier élément d'une clé en double est gardé.
+
+        Args:
+            data (List[Dict]): Les éléments à écrire.
+
+        Returns:
+            int: Le nombre de doublons ignorés.
+        """
+        unique = {item.get(self.key): item for item in data}
+
+        conn = self.database.connection
+        with self.database.lock, conn:
+            conn.execute(f"DELETE FROM {self.collection.table}")
+            for child in self.collection.children:
+                conn.execute(f"DELETE FROM {child}")
+            for item in unique.values():
+                self._insert(item)
+            self._bump_version()
+
+        return len(data) - len(unique)
+
+
+def migrer(db_file: str = DB_FILE) -> None:
+    """
+    Copie les collections JSON (journal compris) dans la base SQLite.
+
+    Args:
+        db_file (str): Le fichier de la base SQLite.
+    """
+    from files import open_json_repository
+
+    for name, collection in COLLECTIONS.items():
+        source = open_json_repository(name, collection.key, journal=True)
+        data = source.load()
+        repository = SQLiteRepository(name, collection.key, db_file)
+        doublons = repository.write(data)
+        # La séquence des ids continue là où elle en était
+        repository.sequence = source.sequence
+        repository.write_sequence()
+        print(f"{name} : {len(data) - doublons} élément(s) migré(s) vers {db_file}")
+        if doublons:
+            print(f"{name} : {doublons} doublon(s) de '{collection.key}' ignoré(s)")
+
+
+if __name__ == "__main__":
+    migrer()
@@ -2,6 +2,9 @@ from dataclasses import dataclass, field
 from files import StudentHandler, AdminHandler
 from admin import Admin
 from etudiant import Etudiant
+import passwords
+from records import Student
+import metrics
 import utils
 
 
@@ -18,6 +21,7 @@ class Utilisateur:
     demandes: list = field(default_factory=list)
 
 
+@metrics.instrumenter()
 class Authentification(Utilisateur):
     student_handler: StudentHandler = StudentHandler()
     admin_handler: AdminHandler = AdminHandler()
@@ -38,19 +42,16 @@ class Authentification(Utilisateur):
         # Enregistrement des informations de l'utilisateur
         self.nom = inputs["Nom"].lower()
         self.prenom = inputs["Prénom"].lower()
-        self.mdp = inputs["Créez un mot de passe"]
+        self.mdp = passwords.hacher(inputs["Créez un mot de passe"])
         self.email = inputs["Entrez votre email"]
 
-        # La liste des etudiants dans la base de donnée
-        etudiants = self.student_handler.load_data()
-
-        if any(etu["email"] == self.email for etu in etudiants):
+        if self.student_handler.find("email", self.email) is not None:
             utils.message(
                 [("Cet email existe deja\nImpossible de creer le compte.", "error")]
             )
             return None
 
-        self.id = len(etudiants) + 1
+        self.id = self.student_handler.next_id()
 
         # Création du login de l'utilisateur
         self.login = (self.prenom + self.nom.capitalize() + str(self.id)).replace(" ", "")
@@ -65,9 +66,9 @@ class Authentification(Utilisateur):
             ]
         )
 
-        etudiant = {
-            attr: getattr(self, attr) for attr in list(Utilisateur.__annotations__)
-        }
+        etudiant = Student(
+            {attr: getattr(self, attr) for attr in list(Utilisateur.__annotations__)}
+        )
         self.student_handler.update(etudiant)
 
         return Etudiant(etudiant) if _type == "Etudiant" else None
@@ -85,27 +86,29 @@ class Authentification(Utilisateur):
         login = inputs["Login"]
         mdp = inputs["Mot de passe"]
 
-        # La liste des admins dans la base de donnée
-        admins = self.admin_handler.load_data()
-
-        # Vérifie si l'utilisateur est un administrateur
-        for idx, user in enumerate(admins):
-            if user["login"] == login and user["mdp"] == mdp:
-                utils.message([("Connexion réussie en tant qu'admin.", "success")])
-                return Admin(user)
-
-        # La liste des etudiants dans la base de donnée
-        etudiants = self.student_handler.load_data()
+        # Vérifie si l'utilisateur est un administrateur (les admins sont indexés sur leur login)
+        user = self.admin_handler.get(login)
+        if user is not None and passwords.verifier(mdp, user["mdp"]):
+            utils.message([("Connexion réussie en tant qu'admin.", "success")])
+            return Admin(user)
 
         # Si l'utilisateur n'est pas un administrateur, vérifie s'il est un étudiant
-        for idx, user in enumerate(etudiants):
-            if user["login"] == login and user["mdp"] == mdp:
-                if user["suspendu"]:
-                    utils.message([("Compte suspendu !", "error")])
-                    return None
-
-                utils.message([("Connexion réussie en tant qu'etudiant.", "success")])
-                return Etudiant(user)
+        etudiant = self.student_handler.find("login", login)
+        if etudiant is None:
+            # Login inconnu : le temps de réponse est le même qu'avec un mauvais mot de passe
+            passwords.verifier_factice(mdp)
+        elif passwords.verifier(mdp, etudiant["mdp"]):
+            if etudiant["suspendu"]:
+                utils.message([("Compte suspendu !", "error")])
+                return None
+
+            # Remplace un mot de passe en clair ou haché avec un ancien coût
+            if passwords.doit_rehacher(etudiant["mdp"]):
+                empreinte = passwords.hacher(mdp)
+                etudiant = self.student_handler.modify(etudiant["id"], lambda e: e.update(mdp=empreinte))
+
+            utils.message([("Connexion réussie en tant qu'etudiant.", "success")])
+            return Etudiant(etudiant)
 
         utils.message([("Identifiant ou mot de passe incorrect!", "error")])
         return None
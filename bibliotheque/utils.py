@@ -4,22 +4,29 @@ Il comprend des fonctions permettant de gérer les entrées de l'utilisateur,
 d'effacer la console, d'afficher les données sous forme de tableau, etc.
 """
 
-import subprocess, platform, builtins
+import subprocess, platform, builtins, threading, time
 from rich.console import Console
+from rich.control import Control
 from rich.theme import Theme
 from rich.table import Table
 from rich.panel import Panel
 from rich.align import Align
 from rich.text import Text
+from rich.segment import Segments
 from rich import box
 from pynput import keyboard
 import re
+from collections.abc import Mapping
+import metrics
 
 custom_theme = Theme(
     {"error": "bold red", "success": "bold green", "repr.number": "dim"}
 )
 console = Console(theme=custom_theme)
 
+# Nombre maximal d'images par seconde pour la boîte de saisie
+IMAGES_PAR_SECONDE = 30
+
 
 def print(prompt, *args, **kwargs):
     """
@@ -104,16 +111,18 @@ def clear(validation: bool = False) -> None:
 
 
 def parse_data(obj):
-    if isinstance(obj, dict):
+    # Les enregistrements (voir records.py) s'affichent comme les dictionnaires
+    if isinstance(obj, Mapping):
         if not obj:
             return "-"
         else:
-            return {k: parse_data(v) for k, v in obj.items()}
+            # Les attributs internes (comme le numéro de version "_version") ne sont pas affichés
+            return {k: parse_data(v) for k, v in obj.items() if not k.startswith("_")}
     elif isinstance(obj, list):
         if not obj:
             return "-"
         else:
-            if all(isinstance(elem, dict) for elem in obj):
+            if all(isinstance(elem, Mapping) for elem in obj):
                 return '\n'.join(['- ' + parse_data(list(elem.values())[0]) for elem in obj])
             else:
                 return [parse_data(elem) for elem in obj]
@@ -127,23 +136,20 @@ def parse_data(obj):
         return obj
 
 
-def json_to_table(data: list[dict], effacer: bool = True, numeroter: bool = False) -> bool:
+def creer_table(data: list[dict], numeroter: bool = False, debut: int = 1) -> Table:
     """
-    Fonction pour afficher des données JSON sous forme de tableau.
+    Fonction pour créer un tableau rich à partir de données déjà converties par parse_data.
 
     Args:
-        data (List[Dict]): Les données à afficher.
-        effacer (bool, optional): Si True, efface la console après l'affichage. Par défaut True.
+        data (List[Dict]): Les lignes du tableau.
+        numeroter (bool, optional): Si True, ajoute une colonne "Numéro". Par défaut False.
+        debut (int, optional): Le numéro de la première ligne. Par défaut 1.
+
+    Returns:
+        Table: Le tableau.
     """
-    data = [parse_data(d) for d in data]
-    
-    # Si data n'est pas vide, obtenir les clés du premier dictionnaire pour les utiliser comme noms de colonnes
-    if len(data):
-        cols = data[0].keys()
-    else:
-        print("Aucune donnée à afficher!", style="error")
-        clear(True)
-        return False
+    # Obtenir les clés du premier dictionnaire pour les utiliser comme noms de colonnes
+    cols = data[0].keys()
 
     table = Table(
         box=box.SQUARE_DOUBLE_HEAD, header_style="bold reverse", show_lines=True
@@ -159,13 +165,32 @@ def json_to_table(data: list[dict], effacer: bool = True, numeroter: bool = Fals
     # Pour chaque dictionnaire dans data, ajouter une ligne au tableau
     # Chaque ligne contient la représentation en chaîne de la valeur pour chaque clé dans cols
     if numeroter:
-        for i, row in enumerate(data, start=1):
-            table.add_row(str(i), *[str(row[col]) for col in cols])
+        for i, row in enumerate(data, start=debut):
+            table.add_row(str(i), *[str(row.get(col)) for col in cols])
     else:
         for row in data:
-            table.add_row(*[str(row[col]) for col in cols])
+            table.add_row(*[str(row.get(col)) for col in cols])
+
+    return table
+
+
+@metrics.mesure("utils.json_to_table")
+def json_to_table(data: list[dict], effacer: bool = True, numeroter: bool = False) -> bool:
+    """
+    Fonction pour afficher des données JSON sous forme de tableau.
 
-    print(table)
+    Args:
+        data (List[Dict]): Les données à afficher.
+        effacer (bool, optional): Si True, efface la console après l'affichage. Par défaut True.
+    """
+    data = [parse_data(d) for d in data]
+    
+    if not len(data):
+        print("Aucune donnée à afficher!", style="error")
+        clear(True)
+        return False
+
+    print(creer_table(data, numeroter))
 
     if effacer:
         clear(True)
@@ -173,6 +198,91 @@ def json_to_table(data: list[dict], effacer: bool = True, numeroter: bool = Fals
     return True
 
 
+def lignes_par_page() -> int:
+    """
+    Fonction pour calculer le nombre de lignes d'un tableau qui tiennent dans la console.
+
+    Returns:
+        int: Le nombre de lignes par page.
+    """
+    # Avec show_lines, chaque ligne prend au moins deux lignes de la console.
+    # On garde de la place pour l'entête du tableau et la barre de navigation.
+    return max(1, (console.size.height - 6) // 2)
+
+
+@metrics.mesure("utils.json_to_pages")
+def json_to_pages(data, effacer: bool = True, numeroter: bool = False, taille_page: int = None) -> bool:
+    """
+    Fonction pour afficher des données JSON sous forme de tableau, page par page.
+
+    Seules les lignes de la page affichée sont converties et rendues. Si data est un générateur,
+    il n'est consommé que jusqu'à la page demandée.
+
+    Args:
+        data (Iterable[Dict]): Les données à afficher (liste ou générateur).
+        effacer (bool, optional): Si True, efface la console en quittant. Par défaut True.
+        numeroter (bool, optional): Si True, numérote les lignes. Par défaut False.
+        taille_page (int, optional): Le nombre de lignes par page. Par défaut lignes_par_page().
+
+    Returns:
+        bool: False s'il n'y a aucune donnée à afficher, True sinon.
+    """
+    taille_page = taille_page or lignes_par_page()
+
+    # Les listes sont lues directement, les générateurs sont mémorisés au fur et à mesure
+    if isinstance(data, (list, tuple)):
+        lignes, source, total = data, None, len(data)
+    else:
+        lignes, source, total = [], iter(data), None
+
+    def charger_jusqua(n):
+        nonlocal source, total
+        while source is not None and len(lignes) < n:
+            try:
+                lignes.append(next(source))
+            except StopIteration:
+                source, total = None, len(lignes)
+
+    page = 0
+    while True:
+        debut = page * taille_page
+        # Une ligne de plus pour savoir s'il y a une page suivante
+        charger_jusqua(debut + taille_page + 1)
+
+        if not lignes:
+            print("Aucune donnée à afficher!", style="error")
+            clear(True)
+            return False
+        if debut >= len(lignes):
+            page = (len(lignes) - 1) // taille_page
+            continue
+
+        clear()
+        print(creer_table([parse_data(d) for d in lignes[debut:debut + taille_page]], numeroter, debut + 1))
+
+        nb_pages = f"/{-(-total // taille_page)}" if total is not None else ""
+        suivante = len(lignes) > debut + taille_page
+        print(f"Page {page + 1}{nb_pages}", style="bold")
+
+        choix = builtins.input(
+            "(s)uivante, (p)récédente, numéro de page, ENTRER pour quitter : "
+        ).strip().lower()
+
+        if choix == "s" and suivante:
+            page += 1
+        elif choix == "p" and page > 0:
+            page -= 1
+        elif choix.isdigit() and int(choix) > 0:
+            page = int(choix) - 1
+        elif choix in ("", "q"):
+            break
+
+    if effacer:
+        clear()
+
+    return True
+
+
 def message(prompts, validation=True):
     """
     Fonction pour imprimer un titre, un sous-titre, une invite et des arguments supplémentaires en utilisant une boîte.
@@ -198,6 +308,15 @@ def message(prompts, validation=True):
 
 
 class InputBox:
+    """
+    Boîte de saisie au clavier.
+
+    Les touches ne dessinent pas la boîte : elles signalent seulement qu'elle a changé. Un fil
+    d'affichage la dessine au plus IMAGES_PAR_SECONDE fois par seconde, donc les touches pressées
+    entre deux images sont dessinées ensemble, et seules les lignes qui ont changé depuis l'image
+    précédente sont réécrites.
+    """
+
     def __init__(self, titre, elements, mask=None):
         self.keys = ""  # Stocke les touches pressées par l'utilisateur
         self.titre = Text(titre, style="reverse")  # Titre de la boîte de saisie
@@ -213,63 +332,70 @@ class InputBox:
         self.caps = 0  # Variable pour gérer la touche Caps Lock
         self.mask = mask if mask else [False] * len(elements)
         self.current_keys = set()
+        self.lignes = []  # Lignes de la dernière image affichée
+        self.taille = None  # Taille de la console lors de la dernière image
+        self.a_dessiner = threading.Event()  # Levé quand la boîte a changé
+        # Protège l'état de la saisie, modifié par le fil du clavier et lu par le fil d'affichage
+        self.verrou = threading.Lock()
+        self.termine = False
 
     # Méthode appelée lorsqu'une touche est pressée
     def on_press(self, key):
         COMBINATION = {keyboard.Key.alt_gr, keyboard.KeyCode.from_char('à')}
-        if key in COMBINATION:
-            self.current_keys.add(key)
-        if COMBINATION.issubset(self.current_keys):
-            self.keys += "@"
-            self.current_keys = set()
-        # Si la touche Backspace est pressée, supprime le dernier caractère
-        elif key == keyboard.Key.backspace and len(self.keys) > 0:
-            self.keys = self.keys[:-1]
-        # Si moins de 20 caractères ont été saisis, ajoute le caractère à la chaîne de touches
-        elif len(self.keys) < 20:
-            try:
-                # Si la touche est un chiffre du pavé numérique, ajoute le chiffre à la chaîne de touches
-                if hasattr(key, "vk") and 96 <= key.vk <= 105:
-                    self.keys += str(key.vk - 96)
-                else:
-                    # Sinon, ajoute le caractère à la chaîne de touches
-                    k = key.char
-                    self.keys += k.upper() if self.caps % 2 != 0 else k.lower()
-            except (AttributeError, TypeError):
-                # Si la touche Caps Lock est pressée, incrémente la variable caps
-                if key == keyboard.Key.caps_lock:
-                    self.caps += 1
-        # Dessine la boîte de saisie
-        self.draw_box()
+        with self.verrou:
+            if key in COMBINATION:
+                self.current_keys.add(key)
+            if COMBINATION.issubset(self.current_keys):
+                self.keys += "@"
+                self.current_keys = set()
+            # Si la touche Backspace est pressée, supprime le dernier caractère
+            elif key == keyboard.Key.backspace and len(self.keys) > 0:
+                self.keys = self.keys[:-1]
+            # Si moins de 20 caractères ont été saisis, ajoute le caractère à la chaîne de touches
+            elif len(self.keys) < 20:
+                try:
+                    # Si la touche est un chiffre du pavé numérique, ajoute le chiffre à la chaîne de touches
+                    if hasattr(key, "vk") and 96 <= key.vk <= 105:
+                        self.keys += str(key.vk - 96)
+                    else:
+                        # Sinon, ajoute le caractère à la chaîne de touches
+                        k = key.char
+                        self.keys += k.upper() if self.caps % 2 != 0 else k.lower()
+                except (AttributeError, TypeError):
+                    # Si la touche Caps Lock est pressée, incrémente la variable caps
+                    if key == keyboard.Key.caps_lock:
+                        self.caps += 1
+        # Demande à redessiner la boîte de saisie
+        self.a_dessiner.set()
 
     # Méthode appelée lorsqu'une touche est relâchée
     def on_release(self, key):
-        self.subtitle = ""
-        # Si la touche Entrée est pressée
-        if key == keyboard.Key.enter:
-            # Si aucun élément n'est actuellement sélectionné, sélectionne le premier élément
-            if self.idx_element == -1:
-                self.idx_element += 1
-            # Si la chaîne de touches est vide, affiche un message d'erreur
-            elif self.keys == "":
-                self.subtitle = Text("L'entrée ne peut pas être vide.", style="error")
-            # Sinon, ajoute la chaîne de touches à l'élément actuellement sélectionné
-            else:
-                if 'email' in self.elements[self.idx_element]:
-                    while not self.is_valid_email(self.keys):
-                        self.subtitle = Text("L'e-mail n'est pas valide. Veuillez réessayer.", style="error")
-                        self.draw_box()
-                        return
-                self.subtitle = ""
-                self.inputs[self.elements[self.idx_element]] = self.keys
-                self.keys = ""
-                self.idx_element += 1
-                # Si tous les éléments ont été remplis, quitte la boucle
-                if self.idx_element >= len(self.elements):
-                    clear()
-                    return False
-        # Dessine la boîte de saisie
-        self.draw_box()
+        with self.verrou:
+            self.subtitle = ""
+            # Si la touche Entrée est pressée
+            if key == keyboard.Key.enter:
+                # Si aucun élément n'est actuellement sélectionné, sélectionne le premier élément
+                if self.idx_element == -1:
+                    self.idx_element += 1
+                # Si la chaîne de touches est vide, affiche un message d'erreur
+                elif self.keys == "":
+                    self.subtitle = Text("L'entrée ne peut pas être vide.", style="error")
+                # Sinon, ajoute la chaîne de touches à l'élément actuellement sélectionné
+                else:
+                    if 'email' in self.elements[self.idx_element]:
+                        while not self.is_valid_email(self.keys):
+                            self.subtitle = Text("L'e-mail n'est pas valide. Veuillez réessayer.", style="error")
+                            self.a_dessiner.set()
+                            return
+                    self.subtitle = ""
+                    self.inputs[self.elements[self.idx_element]] = self.keys
+                    self.keys = ""
+                    self.idx_element += 1
+                    # Si tous les éléments ont été remplis, quitte la boucle
+                    if self.idx_element >= len(self.elements):
+                        return False
+        # Demande à redessiner la boîte de saisie
+        self.a_dessiner.set()
         
     @staticmethod
     def is_valid_email(email):
@@ -279,19 +405,55 @@ class InputBox:
         else:
             return False
 
+    # Méthode exécutée par le fil d'affichage
+    def boucle_affichage(self):
+        while True:
+            self.a_dessiner.wait()
+            # Baissé avant de lire l'état : une touche pressée pendant le dessin sera dans l'image suivante
+            self.a_dessiner.clear()
+            if self.termine:
+                return
+            self.draw_box()
+            time.sleep(1 / IMAGES_PAR_SECONDE)
+
+    # Méthode pour arrêter le fil d'affichage
+    def arreter(self):
+        self.termine = True
+        self.a_dessiner.set()
+
     # Méthode pour dessiner la boîte de saisie
     def draw_box(self):
-        box_content = self.box_content()
+        # Le contenu est copié sous le verrou : une image ne mélange jamais deux états de la saisie
+        with self.verrou:
+            box_content = self.box_content()
 
-        # Si la chaîne de touches contient 20 caractères, affiche un message d'erreur
-        if len(self.keys) == 20:
-            self.subtitle = Text("Vous avez atteint la limite.", style="error")
+            # Si la chaîne de touches contient 20 caractères, affiche un message d'erreur
+            subtitle = self.subtitle
+            if len(self.keys) == 20:
+                subtitle = Text("Vous avez atteint la limite.", style="error")
 
         # Crée un panneau avec le contenu de la boîte
-        panel = Panel(box_content, title=self.titre, subtitle=self.subtitle)
+        panel = Panel(box_content, title=self.titre, subtitle=subtitle)
         aligned_panel = Align.center(panel, vertical="middle")
-        clear()
-        print(aligned_panel)
+
+        # L'image occupe tout l'écran, sauf la dernière ligne (pour ne pas faire défiler la console)
+        taille = console.size
+        options = console.options.update(width=taille.width, height=max(taille.height - 1, 1))
+        lignes = console.render_lines(aligned_panel, options, pad=True)
+
+        # Première image ou console redimensionnée : l'écran est effacé et tout est réécrit
+        if taille != self.taille:
+            clear()
+            console.show_cursor(False)
+            self.lignes, self.taille = [], taille
+
+        # Réécrit seulement les lignes qui ont changé, en une seule écriture
+        with console:
+            for y, ligne in enumerate(lignes):
+                if y >= len(self.lignes) or ligne != self.lignes[y]:
+                    console.control(Control.move_to(0, y))
+                    console.print(Segments(ligne), end="")
+        self.lignes = lignes
 
     # Méthode pour créer le contenu de la boîte de saisie
     def box_content(self):
@@ -318,11 +480,20 @@ class InputBox:
 # Fonction pour créer une boîte de saisie et récupérer les entrées de l'utilisateur
 def box_input(titre: str, elements: list, mask: list = None) -> dict:
     logger = InputBox(titre, elements, mask)
-    with keyboard.Listener(
-        on_press=logger.on_press, on_release=logger.on_release, suppress=True
-    ) as listener:
-        listener.join()
-
-    listener.stop()
+    affichage = threading.Thread(target=logger.boucle_affichage, daemon=True)
+    affichage.start()
+
+    try:
+        with keyboard.Listener(
+            on_press=logger.on_press, on_release=logger.on_release, suppress=True
+        ) as listener:
+            listener.join()
+
+        listener.stop()
+    finally:
+        logger.arreter()
+        affichage.join()
+        console.show_cursor(True)
+        clear()
 
     return logger.inputs
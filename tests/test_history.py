@@ -0,0 +1,80 @@
+"""
+Tests de l'historique des emprunts (history.py).
+"""
+
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bibliotheque"))
+
+ISBN = "9782070408504"
+
+
+class PremiereLectureTest(unittest.TestCase):
+    def setUp(self):
+        # Une base sans historique.jsonl : la première lecture de l'historique le migre
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.mkdir("database")
+        livre = {
+            "id": 1, "titre": "Le Petit Prince", "auteur": "Antoine de Saint-Exupéry", "editeur": "Gallimard",
+            "isbn": ISBN, "nbr_ex": 2, "annee": "1943",
+            "emprunter_par": [{"login": "ancien", "nom": "A", "prenom": "B", "date": "2020-01-01", "date_rendu": "2020-01-10"}],
+        }
+        etudiant = {
+            "id": 1, "nom": "Martin", "prenom": "Léa", "login": "lmartin", "mdp": "x", "email": "lea@exemple.fr",
+            "suspendu": False, "demandes": [],
+            "emprunts": [{"titre": "Le Petit Prince", "isbn": ISBN, "date": datetime.date.today().isoformat()}],
+        }
+        for nom, elements in (("books", [livre]), ("etudiants", [etudiant]), ("admins", [])):
+            with open(f"database/{nom}.json", "w", encoding="utf-8") as file:
+                json.dump(elements, file)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_lecture_et_retour_simultanes(self):
+        # To avoid circular imports
+        from service import BibliothequeService
+
+        service = BibliothequeService()
+        ecriture_prise, lecture_lancee = threading.Event(), threading.Event()
+        resultats = {}
+
+        def retour():
+            # Le retour tient le verrou d'écriture des livres pendant que la lecture démarre
+            with service._ecriture():
+                ecriture_prise.set()
+                lecture_lancee.wait(10)
+                # Laisse la lecture atteindre le verrou des livres avant de rendre le livre
+                time.sleep(0.2)
+                resultats["retour"] = service.retourner_livre(1, 1)
+
+        def lire():
+            ecriture_prise.wait(10)
+            lecture_lancee.set()
+            resultats["lecture"] = service.historique_emprunts(isbn=ISBN)
+
+        lecture = threading.Thread(target=lire, daemon=True)
+        retourneur = threading.Thread(target=retour, daemon=True)
+        retourneur.start()
+        lecture.start()
+        retourneur.join(10)
+        lecture.join(10)
+
+        self.assertFalse(retourneur.is_alive() or lecture.is_alive(), "interblocage")
+        self.assertEqual(resultats["retour"]["isbn"], ISBN)
+        self.assertIn(len(resultats["lecture"]), (1, 2))
+        self.assertEqual(len(service.historique_emprunts(isbn=ISBN)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()